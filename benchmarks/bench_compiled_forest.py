@@ -0,0 +1,68 @@
+"""
+Benchmark: joblib.load + RandomForestClassifier.predict against the CompiledForest arrays, for loading, single-row and
+batch predictions. Uses the given model (.pkl) or, by default, a forest shaped like the apnea model.
+
+Usage: python benchmarks/bench_compiled_forest.py [model.pkl]
+"""
+import os
+import sys
+import time
+import tempfile
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from inferenceModels.compiledForest import CompiledForest
+
+"""
+Forest with the inputs of the apnea model (Age, Gender, BMI, Nasal_Airflow, Snoring)
+"""
+def train_example_forest():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({
+        'Age': rng.integers(20, 80, 5000),
+        'Gender': rng.integers(0, 3, 5000),
+        'BMI': rng.uniform(18, 40, 5000),
+        'Nasal_Airflow': rng.uniform(0.2, 0.5, 5000),
+        'Snoring': rng.random(5000) > 0.5
+    })
+    y = X['Nasal_Airflow'] + 0.01 * X['BMI'] + rng.normal(0, 0.05, 5000) > 0.7
+    return RandomForestClassifier(n_estimators=200, random_state=0).fit(X, y), X
+
+def timeit(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+def run(model_path=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        if model_path is None:
+            forest, X = train_example_forest()
+            model_path = os.path.join(tmp, "model.pkl")
+            joblib.dump(forest, model_path)
+        else:
+            forest = joblib.load(model_path)
+            X = np.random.default_rng(0).random((5000, forest.n_features_in_))
+            if hasattr(forest, "feature_names_in_"):
+                X = pd.DataFrame(X, columns=forest.feature_names_in_)
+
+        arrays_path = os.path.join(tmp, "model.npz")
+        np.savez(arrays_path, **CompiledForest.from_forest(forest).to_arrays())
+
+        load_sklearn, forest = timeit(lambda: joblib.load(model_path), 5)
+        load_compiled, compiled = timeit(lambda: CompiledForest.from_arrays(dict(np.load(arrays_path, allow_pickle=True))), 5)
+        print(f"{len(forest.estimators_)} trees, {len(compiled.feature)} nodes")
+        print(f"{'load':>12}: joblib {load_sklearn * 1e3:9.2f} ms | compiled {load_compiled * 1e3:9.2f} ms")
+
+        row = X.iloc[:1] if hasattr(X, "iloc") else X[:1]
+        for name, batch, repeat in (("single row", row, 50), ("5000 rows", X, 3)):
+            sklearn_time, expected = timeit(lambda: forest.predict_proba(batch), repeat)
+            compiled_time, proba = timeit(lambda: compiled.predict_proba(batch), repeat)
+            identical = np.array_equal(proba, expected)
+            print(f"{name:>12}: sklearn {sklearn_time * 1e3:9.3f} ms | compiled {compiled_time * 1e3:9.3f} ms | identical: {identical}")
+
+if __name__ == "__main__":
+    run(*sys.argv[1:])
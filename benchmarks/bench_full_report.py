@@ -0,0 +1,54 @@
+"""
+Benchmark: time to prepare the sessions of the full report (tables and charts) the first time and again after one new
+night, against rendering a single night. The PDF assembly is not included.
+
+Usage: python benchmarks/bench_full_report.py [nights]
+"""
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from utils.session_store import SessionStore
+from reportGeneration.sessionSummary import materialize_summary
+from reportGeneration.reportFragments import session_fragment
+
+SEGMENTS_PER_NIGHT = 8 * 3600 // 5
+
+def night_rows(session, rng):
+    n = SEGMENTS_PER_NIGHT
+    return pd.DataFrame({
+        'Sleep_Session': session, 'Start_Time': np.arange(n) * 5, 'End_Time': np.arange(n) * 5 + 5,
+        'Age': 40, 'Gender': 0, 'BMI': 27.5, 'Snoring_Intensity': rng.random(n), 'Snoring': rng.random(n) > 0.7,
+        'Nasal_Airflow': rng.uniform(0.2, 0.5, n), 'Spectral_Centroid': rng.uniform(500, 2000, n),
+        'Snore_Energy': rng.random(n), 'Decibel_Level_dB': rng.uniform(-60, -10, n),
+        'Has_Apnea': rng.random(n) > 0.95, 'Treatment_Required': False
+    })
+
+def prepare(store, session_ids, fragment_dir):
+    start = time.perf_counter()
+    for session_id in session_ids:
+        session_fragment(session_id, store, fragment_dir)
+    return time.perf_counter() - start
+
+def run(nights=30):
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(os.path.join(tmp, "sessions.db"), os.path.join(tmp, "export.csv"))
+        fragment_dir = os.path.join(tmp, "fragments")
+        for night in range(1, nights + 1):
+            store.append_session(night_rows(night, rng), export=False)
+            materialize_summary(night, store)
+
+        first_s = prepare(store, store.session_ids(), fragment_dir)
+        store.append_session(night_rows(nights + 1, rng), export=False)
+        materialize_summary(nights + 1, store)
+        next_s = prepare(store, store.session_ids(), fragment_dir)
+        single_s = prepare(store, [1], os.path.join(tmp, "single"))
+        print(f"{nights} nights, first report: {first_s:.2f} s | after one new night: {next_s:.2f} s | one night: {single_s:.2f} s")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 30)
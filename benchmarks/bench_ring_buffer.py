@@ -0,0 +1,62 @@
+"""
+Microbenchmark: segment assembly with the old list-of-arrays buffer against the AudioRingBuffer.
+Simulates the sounddevice callback delivering blocks at 44.1 kHz and the processor taking 10 s segments.
+
+Usage: python benchmarks/bench_ring_buffer.py [minutes] [block_size]
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from dataAcquisition.ringBuffer import AudioRingBuffer
+
+SAMPLE_RATE = 44100
+SEGMENT_SAMPLES = 10 * SAMPLE_RATE
+
+"""
+Previous approach: copy every block into a list, re-sum its length and concatenate twice per segment
+"""
+def list_of_arrays(blocks):
+    buffer = []
+    segments = 0
+    for indata in blocks:
+        buffer.append(indata.copy())
+        total_samples = sum(c.shape[0] for c in buffer)
+        if total_samples >= SEGMENT_SAMPLES:
+            segment_np = np.concatenate(buffer, axis=0)[:SEGMENT_SAMPLES]
+            segments += 1
+            remaining = np.concatenate(buffer, axis=0)[SEGMENT_SAMPLES:]
+            buffer = [remaining] if remaining.size > 0 else []
+    return segments
+
+"""
+Ring buffer: one copy into preallocated storage, segments read as views
+"""
+def ring_buffer(blocks):
+    ring = AudioRingBuffer(SEGMENT_SAMPLES * 6)
+    reader = ring.reader()
+    segments = 0
+    for indata in blocks:
+        ring.write(indata)
+        while reader.available() >= SEGMENT_SAMPLES:
+            segment_np = reader.peek(SEGMENT_SAMPLES)
+            segments += 1
+            reader.advance(SEGMENT_SAMPLES)
+    return segments
+
+def run(minutes=10, block_size=512):
+    rng = np.random.default_rng(0)
+    block = rng.standard_normal((block_size, 1)).astype(np.float32)
+    blocks = [block] * (minutes * 60 * SAMPLE_RATE // block_size)
+    print(f"{minutes} min of audio, {len(blocks)} blocks of {block_size} frames")
+
+    for name, assemble in (("list of arrays", list_of_arrays), ("ring buffer", ring_buffer)):
+        start = time.perf_counter()
+        segments = assemble(blocks)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>15}: {elapsed:8.3f} s  ({segments} segments, {elapsed / len(blocks) * 1e6:.2f} us per block)")
+
+if __name__ == "__main__":
+    run(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,69 @@
+"""
+Benchmark: time to save one night (8 h of 5 s segments) as the history grows, with the session store against the old
+read-concatenate-rewrite of the whole CSV dataset, then the time to delete one night (tombstone, and compaction in the
+background) against the old read-filter-rewrite of the CSV.
+
+Usage: python benchmarks/bench_session_store.py [nights]
+"""
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from utils.session_store import SessionStore
+
+SEGMENTS_PER_NIGHT = 8 * 3600 // 5
+
+def night_rows(session, rng):
+    n = SEGMENTS_PER_NIGHT
+    return pd.DataFrame({
+        'Sleep_Session': session, 'Start_Time': np.arange(n) * 5, 'End_Time': np.arange(n) * 5 + 5,
+        'Age': 40, 'Gender': 0, 'BMI': 27.5, 'Snoring_Intensity': rng.random(n), 'Snoring': rng.random(n) > 0.7,
+        'Nasal_Airflow': rng.uniform(0.2, 0.5, n), 'Spectral_Centroid': rng.uniform(500, 2000, n),
+        'Snore_Energy': rng.random(n), 'Decibel_Level_dB': rng.uniform(-60, -10, n),
+        'Has_Apnea': rng.random(n) > 0.95, 'Treatment_Required': False
+    })
+
+def save_csv_rewrite(path, df_new):
+    if os.path.exists(path):
+        df_new = pd.concat([pd.read_csv(path), df_new], ignore_index=True)
+    df_new.to_csv(path, index=False)
+
+def delete_csv_rewrite(path, session):
+    df = pd.read_csv(path)
+    df[df["Sleep_Session"] != session].to_csv(path, index=False)
+
+def run(nights=100):
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(os.path.join(tmp, "sessions.db"), os.path.join(tmp, "export.csv"))
+        legacy_csv = os.path.join(tmp, "legacy.csv")
+        for night in range(1, nights + 1):
+            rows = night_rows(night, rng)
+            start = time.perf_counter()
+            store.append_session(rows)
+            store_s = time.perf_counter() - start
+            start = time.perf_counter()
+            save_csv_rewrite(legacy_csv, rows)
+            csv_s = time.perf_counter() - start
+            if night in (1, 10, nights) or night % 50 == 0:
+                print(f"night {night:4d}: session store {store_s * 1e3:8.1f} ms | CSV rewrite {csv_s * 1e3:8.1f} ms")
+
+        session = nights // 2 or 1
+        start = time.perf_counter()
+        store.delete_session(session)
+        delete_s = time.perf_counter() - start
+        start = time.perf_counter()
+        store.compact()
+        compact_s = time.perf_counter() - start
+        start = time.perf_counter()
+        delete_csv_rewrite(legacy_csv, session)
+        csv_s = time.perf_counter() - start
+        print(f"delete night {session}: tombstone {delete_s * 1e3:8.1f} ms (background compaction {compact_s * 1e3:8.1f} ms) | "
+              f"CSV rewrite {csv_s * 1e3:8.1f} ms")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -0,0 +1,68 @@
+"""
+Benchmark: application startup. Shows the import cost of every screen (with -X importtime, by top-level package) and
+measures the time from launching the interpreter to the first window drawn, which must stay under the budget.
+The first window needs a display; without one only the import costs are shown.
+
+Usage: python benchmarks/bench_startup.py [budget in seconds]
+"""
+import os
+import sys
+import time
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.append(SRC_DIR)
+from utils.import_report import importtime_profile
+
+# Time to first window allowed, in seconds
+DEFAULT_BUDGET = 2.0
+# Libraries that must not be imported before the first window
+HEAVY_MODULES = ("librosa", "scipy", "mediapipe", "cv2", "pygame", "sounddevice", "matplotlib", "reportlab", "pandas", "simpleaudio", "sklearn")
+
+# Creates the application, draws the first window and reports the heavy modules already imported
+FIRST_WINDOW = f"""
+import sys
+import customtkinter as ctk
+from ui.app import App
+app = App()
+app.update()
+print("ready", ",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules), flush=True)
+app.destroy()
+"""
+
+def screen_costs():
+    from ui.app import SCREENS
+    for container, (module_name, _) in SCREENS.items():
+        try:
+            total, packages = importtime_profile(module_name, cwd=SRC_DIR)
+        except ImportError as e:
+            print(f"{container:>25}: not importable here ({e})")
+            continue
+        top = ", ".join(f"{name} {seconds:.2f}" for name, seconds in list(packages.items())[:5])
+        print(f"{container:>25}: {total:6.2f} s | {top}")
+
+def time_to_first_window():
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", FIRST_WINDOW], cwd=SRC_DIR, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    for line in result.stdout.splitlines():
+        if line.startswith("ready"):
+            heavy = line[len("ready"):].strip()
+            return elapsed, [m for m in heavy.split(",") if m]
+    print(f"First window not measured: {result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'no output'}")
+    return None, None
+
+def run(budget=DEFAULT_BUDGET):
+    print("Import cost by screen (seconds, slowest packages):")
+    screen_costs()
+
+    elapsed, heavy = time_to_first_window()
+    if elapsed is None:
+        return 0
+    print(f"Time to first window: {elapsed:.2f} s (budget {budget:.2f} s), heavy modules loaded: {', '.join(heavy) or 'none'}")
+    assert not heavy, f"Heavy modules imported before the first window: {heavy}"
+    assert elapsed <= budget, f"First window took {elapsed:.2f} s, budget is {budget:.2f} s"
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run(float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET))
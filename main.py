@@ -4,13 +4,9 @@ import os
 import json
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from src.ui.start_screen import StartScreen
-from src.ui.profile_form import ProfileForm
-from src.ui.recording_screen import RecordingScreen
-from src.ui.data_visualization import DataVisualization
-from src.ui.terms_screen import TermsAndConditionsScreen
 from src.utils.data_utils import is_profile_complete
 from src.ui.paths import TERMS_PATH
+from src.ui.screens import PRELOAD_DELAY_MS, load_screen, preload_screens
 
 """
 This is the main method of the application
@@ -37,6 +33,8 @@ class App(ctk.CTk):
             self.show_frame("StartScreen")
 
         self.after(0, self.center_window)
+        # The heavy screens are imported in the background once the first window is shown
+        self.after(PRELOAD_DELAY_MS, preload_screens)
 
     """
     Verifies if the user already accepted terms and conditions.
@@ -60,18 +58,11 @@ class App(ctk.CTk):
     """
     def show_frame(self, container):
         if container not in self.frames:
-            if container == "StartScreen":
-                frame = StartScreen(self)
-            elif container == "ProfileForm":
-                frame = ProfileForm(self)
-            elif container == "RecordingScreen":
-                frame = RecordingScreen(self)
-            elif container == "DataVisualization":
-                frame = DataVisualization(self)
-            elif container == "TermsAndConditionsScreen":
-                frame = TermsAndConditionsScreen(self, on_accept_callback=self.on_terms_accepted)
+            screen = load_screen(container)
+            if container == "TermsAndConditionsScreen":
+                frame = screen(self, on_accept_callback=self.on_terms_accepted)
             else:
-                raise ValueError(f"Unknown frame: {container}")
+                frame = screen(self)
 
             self.frames[container] = frame
             frame.grid(row=0, column=0, sticky="nsew")
@@ -81,7 +72,6 @@ class App(ctk.CTk):
         if hasattr(frame, "on_show"):
             frame.on_show()
 
-
     """
     Callback that is called when user accept terms and coditions.
     """
@@ -7,16 +7,33 @@ import time
 import pygame
 from datetime import datetime
 from dataAcquisition.microphoneInput import get_next_session_number, get_next_photo_number, increment_photo_number
+from dataAcquisition.cameraService import get_camera_service
 
 # Where to find the alarm sounds
 ALARM_SOUNDS_DIR = "assets/alarm_sounds"
 
 '''
 # Function to get an image and send it to the sleeping pose detection model
-# Return true for a bad position or false for a good one.
-# Return the actual sleeping position
+# Uses the latest frame of the given (or the running) camera service, or opens the camera just for this photo.
+# Returns the path of the saved image
 '''
-def takePhoto():
+def takePhoto(camera=None):
+    camera = camera or get_camera_service()
+    if camera is not None:
+        frame, _ = camera.snapshot()
+        if frame is None:
+            print("[INFO]: Couldn't get the frame")
+            return None
+    else:
+        frame = grabSingleFrame()
+        if frame is None:
+            return None
+    return savePhoto(frame)
+
+'''
+Opens the camera, waits for it to be ready and returns one frame (None if it couldn't be taken)
+'''
+def grabSingleFrame():
     # Use webcam
     cap = cv2.VideoCapture("/dev/video0") #use video0 or video2
 
@@ -36,11 +53,16 @@ def takePhoto():
         cap.read()
 
     ret, frame = cap.read()
+    cap.release()
     if not ret:
         print("[INFO]: Couldn't get the frame")
-        cap.release()
         return None
+    return frame
 
+'''
+Writes the date and time on the frame and saves it in the images folder of the actual session
+'''
+def savePhoto(frame):
     # Get date and time
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -73,8 +95,6 @@ def takePhoto():
 
     # Increment photo index
     increment_photo_number()
-    cap.release()
-    cv2.destroyAllWindows()
 
     # Return image route
     return file_path
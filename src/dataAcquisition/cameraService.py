@@ -0,0 +1,220 @@
+"""
+This module keeps the camera open during the whole recording session. A background thread reads the device continuously
+and keeps the latest frames in a small ring, so a photo can be taken without waiting for the camera to open and warm up.
+"""
+import os
+import time
+import threading
+from collections import deque
+import cv2
+import numpy as np
+
+'''
+Fake video source that cycles through the images of a folder. Has the same interface as cv2.VideoCapture.
+'''
+class DirectoryFrameSource:
+    # Source configuration
+    def __init__(self, folder, fps=30):
+        extensions = (".jpg", ".jpeg", ".png", ".bmp")
+        self.files = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(extensions))
+        self.fps = fps
+        self.index = 0
+        self.frame = None
+        self.opened = len(self.files) > 0
+
+    def isOpened(self):
+        return self.opened
+
+    def set(self, prop, value):
+        return False
+
+    def grab(self):
+        if not self.opened:
+            return False
+        if self.fps:
+            time.sleep(1 / self.fps)
+        self.frame = self.files[self.index % len(self.files)]
+        self.index += 1
+        return True
+
+    def retrieve(self):
+        if self.frame is None:
+            return False, None
+        frame = cv2.imread(self.frame)
+        return frame is not None, frame
+
+    def read(self):
+        return self.retrieve() if self.grab() else (False, None)
+
+    def release(self):
+        self.opened = False
+
+'''
+Fake video source that generates frames with the frame number drawn on them. Has the same interface as cv2.VideoCapture.
+'''
+class SyntheticFrameSource:
+    # Source configuration
+    def __init__(self, width=640, height=480, fps=30):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_number = 0
+        self.opened = True
+
+    def isOpened(self):
+        return self.opened
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            self.width = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            self.height = int(value)
+        else:
+            return False
+        return True
+
+    def grab(self):
+        if not self.opened:
+            return False
+        if self.fps:
+            time.sleep(1 / self.fps)
+        self.frame_number += 1
+        return True
+
+    def retrieve(self):
+        frame = np.full((self.height, self.width, 3), self.frame_number % 256, dtype=np.uint8)
+        cv2.putText(frame, str(self.frame_number), (10, self.height // 2), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+        return True, frame
+
+    def read(self):
+        return self.retrieve() if self.grab() else (False, None)
+
+    def release(self):
+        self.opened = False
+
+'''
+Long-lived camera capture. The device is read continuously (so its buffer never holds stale frames) and a decoded frame
+is stored in the ring at most frame_rate times per second.
+'''
+class CameraService:
+    # Service configuration
+    def __init__(self, source="/dev/video0", width=1920, height=1080, frame_rate=2, ring_size=4, warmup_frames=15):
+        self.source = source
+        self.width = width
+        self.height = height
+        self.frame_rate = frame_rate
+        self.warmup_frames = warmup_frames
+        self.frames = deque(maxlen=ring_size)      # (timestamp, frame) of the latest decoded frames
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.running = False
+        self.capture = None
+        self.thread = None
+        self.frames_grabbed = 0
+        self.read_errors = 0
+
+    '''
+    Opens the video source and starts the capture thread. Returns False if the source couldn't be opened.
+    The source can be a device path or index, or an object with the cv2.VideoCapture interface.
+    '''
+    def start(self):
+        if self.running:
+            return True
+        if isinstance(self.source, (str, int)):
+            self.capture = cv2.VideoCapture(self.source)
+        else:
+            self.capture = self.source
+        if not self.capture.isOpened():
+            print("[INFO]: Couldn't open external camera.")
+            return False
+
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return True
+
+    '''
+    Returns a copy of the latest frame and its timestamp, or (None, None) if the camera isn't ready within the timeout
+    or the service was stopped
+    '''
+    def snapshot(self, timeout=5):
+        if not self.ready.wait(timeout):
+            return None, None
+        # stop() may have emptied the ring since ready was set
+        with self.lock:
+            if not self.frames:
+                return None, None
+            timestamp, frame = self.frames[-1]
+        return frame.copy(), timestamp
+
+    '''
+    Stops the capture thread and releases the device
+    '''
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.thread.join()
+        self.capture.release()
+        with self.lock:
+            self.ready.clear()
+            self.frames.clear()
+
+    '''
+    Capture thread: grabs every frame and decodes the ones that go into the ring
+    '''
+    def _run(self):
+        last_decoded = 0.0
+        while self.running:
+            if not self.capture.grab():
+                self.read_errors += 1
+                time.sleep(0.1)
+                continue
+            self.frames_grabbed += 1
+            if self.frames_grabbed < self.warmup_frames:
+                continue
+
+            now = time.time()
+            if self.frame_rate and now - last_decoded < 1 / self.frame_rate and self.ready.is_set():
+                continue
+            ret, frame = self.capture.retrieve()
+            if not ret:
+                self.read_errors += 1
+                continue
+            last_decoded = now
+            with self.lock:
+                self.frames.append((now, frame))
+            self.ready.set()
+
+# Camera service shared by the whole application while a session is recorded
+_service = None
+
+'''
+Starts the shared camera service. Returns the service, or None if the camera couldn't be opened.
+'''
+def start_camera_service(source="/dev/video0", **kwargs):
+    global _service
+    if _service is not None:
+        return _service
+    service = CameraService(source, **kwargs)
+    if not service.start():
+        return None
+    _service = service
+    return _service
+
+'''
+Returns the running shared camera service, or None
+'''
+def get_camera_service():
+    return _service
+
+'''
+Stops the shared camera service
+'''
+def stop_camera_service():
+    global _service
+    if _service is not None:
+        _service.stop()
+        _service = None
@@ -0,0 +1,122 @@
+"""
+This module decides when a breathing problem should trigger a photo. Without it every snoring or apnea segment takes a
+photo (and may sound the alarm), which for a heavy snorer means a capture every few seconds all night.
+"""
+import time
+import threading
+from collections import deque
+
+# Reasons for not taking a photo
+SUPPRESSION_REASONS = ("hysteresis", "cooldown", "posture_unchanged", "rate_limit", "busy")
+
+'''
+Capture policy with hysteresis, cooldown, a maximum number of photos per hour and a "posture unchanged" short-circuit.
+The short-circuit doesn't apply to the alert postures (those that sound the alarm), so the alarm can repeat while the
+patient stays in them.
+Thread-safe: segments are observed from the analysis thread and postures recorded from the capture workers.
+'''
+class CapturePolicy:
+    # Policy configuration
+    def __init__(self, cooldown=120, trigger_segments=2, release_segments=3, max_per_hour=12, unchanged_cooldown=600,
+                 alert_postures=("supine",)):
+        self.cooldown = cooldown                        # seconds between photos
+        self.trigger_segments = trigger_segments        # consecutive flagged segments needed to start an episode
+        self.release_segments = release_segments        # consecutive clean segments needed to end it
+        self.max_per_hour = max_per_hour
+        self.unchanged_cooldown = unchanged_cooldown    # seconds between photos when the last two had the same posture
+        self.alert_postures = set(alert_postures)
+        self.lock = threading.Lock()
+        self.reset()
+
+    '''
+    Forgets the state and counters (for a new session)
+    '''
+    def reset(self):
+        with self.lock:
+            self.active = False
+            self.flagged_run = 0
+            self.clean_run = 0
+            self.last_capture = None
+            self.capture_times = deque()
+            self.postures = deque(maxlen=2)
+            self.posture_source = None      # optional function returning the actual posture (continuous tracking)
+            self.executed = 0
+            self.suppressed = {reason: 0 for reason in SUPPRESSION_REASONS}
+
+    '''
+    Registers an analyzed segment (flagged if it had snoring or apnea) and returns True if a photo must be taken now.
+    now is in seconds (monotonic clock by default).
+    '''
+    def observe(self, flagged, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if not flagged:
+                self.flagged_run = 0
+                self.clean_run += 1
+                if self.active and self.clean_run >= self.release_segments:
+                    self.active = False
+                return False
+
+            self.clean_run = 0
+            self.flagged_run += 1
+            if not self.active and self.flagged_run >= self.trigger_segments:
+                self.active = True
+
+            reason = self._suppression_reason(now)
+            if reason is not None:
+                self.suppressed[reason] += 1
+                return False
+
+            self.executed += 1
+            self.last_capture = now
+            self.capture_times.append(now)
+            return True
+
+    '''
+    Takes back the last photo allowed by observe, when it couldn't be taken
+    '''
+    def cancel_capture(self, reason="busy"):
+        with self.lock:
+            if not self.capture_times:
+                return
+            self.capture_times.pop()
+            self.last_capture = self.capture_times[-1] if self.capture_times else None
+            self.executed -= 1
+            self.suppressed[reason] += 1
+
+    '''
+    Registers the posture predicted on the last photo
+    '''
+    def record_posture(self, posture):
+        with self.lock:
+            self.postures.append(posture)
+
+    '''
+    Returns the number of photos taken and suppressed (by reason)
+    '''
+    def stats(self):
+        with self.lock:
+            return {"executed": self.executed, "suppressed": dict(self.suppressed)}
+
+    def _suppression_reason(self, now):
+        if not self.active:
+            return "hysteresis"
+
+        alert = bool(self.postures) and self.postures[-1] in self.alert_postures
+        unchanged = len(self.postures) == 2 and self.postures[0] == self.postures[1] and not alert
+        if self.last_capture is not None:
+            elapsed = now - self.last_capture
+            if elapsed < self.cooldown:
+                return "cooldown"
+            if unchanged and elapsed < self.unchanged_cooldown:
+                return "posture_unchanged"
+
+        while self.capture_times and now - self.capture_times[0] >= 3600:
+            self.capture_times.popleft()
+        if len(self.capture_times) >= self.max_per_hour:
+            return "rate_limit"
+
+        # The continuous tracking already knows the posture: no photo while it is the one of the last photo
+        if self.posture_source is not None and self.postures and not alert and self.posture_source() == self.postures[-1]:
+            return "posture_unchanged"
+        return None
@@ -0,0 +1,138 @@
+"""
+This module provides a preallocated ring buffer for the captured audio. The audio callback writes blocks into it and the
+consumers (segment analysis, recorder) read complete windows as zero-copy views.
+"""
+import threading
+import numpy as np
+
+'''
+Fixed-size ring buffer with a single writer and any number of readers.
+The storage is mirrored (every frame is kept twice, capacity frames apart), so any window of up to capacity frames
+is always contiguous and can be returned as a view without concatenating.
+'''
+class AudioRingBuffer:
+    # Buffer configuration
+    def __init__(self, capacity, channels=1, dtype=np.float32):
+        self.capacity = capacity
+        self.channels = channels
+        self.data = np.zeros((2 * capacity, channels), dtype=dtype)
+        self.write_position = 0     # total frames written since the buffer was created
+        self.closed = False
+        self.condition = threading.Condition()
+
+    '''
+    Copies a block of frames (frames, channels) into the buffer. Never blocks.
+    '''
+    def write(self, block):
+        n = len(block)
+        if n > self.capacity:
+            # Only the last capacity frames can be kept
+            skipped = n - self.capacity
+            block = block[skipped:]
+            n = self.capacity
+        else:
+            skipped = 0
+
+        start = (self.write_position + skipped) % self.capacity
+        self.data[start:start + n] = block
+        # Mirror the block in the other half of the storage
+        first = min(n, self.capacity - start)
+        self.data[start + self.capacity:start + self.capacity + first] = block[:first]
+        if n > first:
+            self.data[:n - first] = block[first:]
+
+        with self.condition:
+            self.write_position += skipped + n
+            self.condition.notify_all()
+
+    '''
+    Marks the end of the stream. Readers get the remaining frames and then stop waiting.
+    '''
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    '''
+    Creates a reader that starts at the current write position
+    '''
+    def reader(self):
+        return RingReader(self)
+
+'''
+Read cursor over an AudioRingBuffer. Views returned by peek stay valid until the writer laps them,
+that is, while the reader is less than capacity frames behind.
+'''
+class RingReader:
+    # Reader configuration
+    def __init__(self, ring):
+        self.ring = ring
+        self.position = ring.write_position
+        self.lost_frames = 0
+
+    '''
+    Number of frames written and not yet consumed by this reader
+    '''
+    def available(self):
+        return self.ring.write_position - self.position
+
+    '''
+    Waits until n frames are available and returns them as a (n, channels) view without consuming them.
+    At most capacity frames are returned: asking for more (e.g. everything available after an overrun) returns the
+    frames that were not overwritten. Returns None on timeout or when the stream was closed with fewer than n frames left.
+    '''
+    def peek(self, n, timeout=None):
+        ring = self.ring
+        n = min(n, ring.capacity)
+        with ring.condition:
+            if not ring.condition.wait_for(lambda: self.available() >= n or ring.closed, timeout):
+                return None
+            self._check_overrun()
+            if self.available() < n:
+                return None
+        start = self.position % ring.capacity
+        return ring.data[start:start + n]
+
+    '''
+    Waits until there is at least one frame and returns up to max_frames of them as a view without consuming them.
+    Returns None on timeout or when the stream is closed and fully read.
+    '''
+    def peek_available(self, max_frames, timeout=None):
+        ring = self.ring
+        with ring.condition:
+            if not ring.condition.wait_for(lambda: self.available() > 0 or ring.closed, timeout):
+                return None
+            self._check_overrun()
+            n = min(self.available(), max_frames, ring.capacity)
+        if n == 0:
+            return None
+        start = self.position % ring.capacity
+        return ring.data[start:start + n]
+
+    '''
+    True if the writer has overwritten frames from the read position on since they were peeked: the data of the views
+    returned by peek is no longer the audio that was captured there
+    '''
+    def overrun(self):
+        return self.available() > self.ring.capacity
+
+    '''
+    Consumes n frames
+    '''
+    def advance(self, n):
+        self.position += n
+
+    '''
+    True when the stream was closed and every frame was consumed
+    '''
+    def finished(self):
+        return self.ring.closed and self.available() == 0
+
+    '''
+    Skips the frames that were overwritten before this reader could consume them
+    '''
+    def _check_overrun(self):
+        behind = self.available() - self.ring.capacity
+        if behind > 0:
+            self.lost_frames += behind
+            self.position += behind
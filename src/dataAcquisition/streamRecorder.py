@@ -0,0 +1,62 @@
+"""
+This module writes the recorded audio to disk while the session is running, so the whole night never has to be kept in memory
+"""
+import threading
+import soundfile as sf
+
+'''
+Class that writes the audio of a ring buffer incrementally to an open sound file from a background thread
+'''
+class StreamRecorder:
+    # Recorder configuration
+    def __init__(self, path, samplerate, channels=1, subtype="PCM_16"):
+        self.path = path
+        self.samplerate = samplerate
+        self.channels = channels
+        self.subtype = subtype
+        self.frames_written = 0
+        self.overruns = 0
+        self.reader = None
+        self.thread = None
+
+    '''
+    Opens the output file and starts the writer thread, which takes the audio from the given ring buffer reader.
+    The format (WAV, FLAC, ...) is taken from the file extension.
+    '''
+    def start(self, reader):
+        self.reader = reader
+        self.file = sf.SoundFile(self.path, mode="w", samplerate=self.samplerate, channels=self.channels, subtype=self.subtype)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    '''
+    Writes the pending audio, closes the file and stops the writer thread. The ring buffer must be closed first.
+    '''
+    def stop(self):
+        if self.thread is None:
+            return
+        self.thread.join()
+        self.thread = None
+        if self.reader.lost_frames:
+            print(f"[WARN] {self.reader.lost_frames} audio frames could not be written to {self.path}")
+        if self.overruns:
+            print(f"[WARN] {self.overruns} audio blocks were overwritten while being written to {self.path}")
+
+    '''
+    Writer thread: writes whatever is available until the buffer is closed and drained
+    '''
+    def _run(self):
+        try:
+            while True:
+                view = self.reader.peek_available(self.samplerate, timeout=0.5)
+                if view is None:
+                    if self.reader.finished():
+                        break
+                    continue
+                self.file.write(view)
+                if self.reader.overrun():
+                    self.overruns += 1
+                self.frames_written += len(view)
+                self.reader.advance(len(view))
+        finally:
+            self.file.close()
@@ -1,17 +1,54 @@
 """
 This module is in charged of analyse and process each taken picture 
 """
+import time
 import cv2
 import mediapipe as mp
-import joblib
 import numpy as np
+from inferenceModels.modelRegistry import registry
 
-# Load trained model
-clf = joblib.load("data/models/pose_classifier_rf.pkl")
+# Tiers of the pose cascade: (MediaPipe model complexity, JPEG decode reduction factor: 1, 2, 4 or 8), cheapest first
+POSE_TIERS = [(1, 2), (2, 1)]
+# Classifier confidence below which the next tier is tried
+POSE_CONFIDENCE_THRESHOLD = 0.6
+# Latency budget of the live predictions, in seconds
+POSE_LATENCY_BUDGET = 2.0
 
-# Initialize MediaPipe Pose
+# Message returned when no person is found in the image
+NO_JOINTS = "No se detectaron joints"
+
+# OpenCV flags to decode a reduced version of the image directly
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+# Trained model and MediaPipe Pose graphs by complexity, loaded on first use (see load_models)
+clf = None
+pose_models = {}
 mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(static_image_mode=True, model_complexity=2)
+
+# Estimated time taken by each tier of the cascade, used to respect the latency budget
+tier_costs = {}
+# Weight of the last run in the estimate of a tier
+TIER_COST_SMOOTHING = 0.3
+# Factor applied to the estimate of a tier every time the budget skips it, so a slow run doesn't disable it for good
+TIER_COST_AGING = 0.8
+# Complexities whose graph already ran once in this process (the first run includes the graph initialization)
+warm_graphs = set()
+
+'''
+Loads the trained classifier and initializes MediaPipe Pose with the given complexities, once per process
+'''
+def load_models(complexities=(2,)):
+    global clf
+    if clf is None:
+        clf = registry.get("pose")
+    for complexity in complexities:
+        if complexity not in pose_models:
+            pose_models[complexity] = mp_pose.Pose(static_image_mode=True, model_complexity=complexity)
 
 '''
 This method requires an image to be processed and gives the predicted Sleeping Position'''
@@ -20,29 +57,101 @@ def predict_posture(img_path):
     image = cv2.imread(img_path)
     if image is None:
         raise ValueError(f"No se pudo cargar la imagen: {img_path}")
+    return predict_posture_image(image)
+
+'''
+Gives the predicted Sleeping Position for an image already in memory (BGR array, as read by OpenCV)
+'''
+def predict_posture_image(image):
+    pred, proba, _, _ = classify_image(image, 2)
+    if proba is not None:
+        print(f"The prediction probability is: {proba}")
+    return pred
+
+'''
+Runs MediaPipe with the given complexity and the classifier on an image.
+Returns (prediction, class probabilities, landmarks, timings); the probabilities and the (33, 4) landmarks are None if no joints were found.
+'''
+def classify_image(image, complexity):
+    load_models((complexity,))
+    timings = {}
 
     # Convert to RGB
     rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
     # Process with MediaPipe
-    results = pose.process(rgb)
+    start = time.perf_counter()
+    results = pose_models[complexity].process(rgb)
+    timings["pose"] = time.perf_counter() - start
 
     if not results.pose_landmarks:
-        return "No se detectaron joints"
+        return NO_JOINTS, None, None, timings
 
+    start = time.perf_counter()
+    pred, proba, landmarks = classify_landmarks(results.pose_landmarks)
+    timings["classify"] = time.perf_counter() - start
+    return pred, proba, landmarks, timings
+
+'''
+Classifies the pose landmarks found by MediaPipe. Returns (prediction, class probabilities, (33, 4) landmarks).
+'''
+def classify_landmarks(pose_landmarks):
     # Extract 33 joints (x, y, z, visibility)
-    landmarks = results.pose_landmarks.landmark
     row = []
-    for lm in landmarks:
+    for lm in pose_landmarks.landmark:
         row.extend([lm.x, lm.y, lm.z, lm.visibility])
 
     # Convert to array for the model
     modelArray = np.array(row).reshape(1, -1)
 
-    # Prediction
-    pred = clf.predict(modelArray)[0]
-    # Prediction probability
+    # Prediction probability, the prediction is its most likely class
     proba = clf.predict_proba(modelArray)[0]
-    print("The prediction probability is: " + proba)
-    
-    return pred
\ No newline at end of file
+    pred = clf.classes_[np.argmax(proba)]
+    return pred, proba, modelArray.reshape(33, 4)
+
+'''
+Predicts the Sleeping Position with the tiered cascade: the image is first decoded at reduced resolution and processed
+with a light MediaPipe model, and the next tier is only tried when no joints were found or the classifier isn't confident.
+A tier is not started if its estimated cost doesn't fit in the remaining budget (seconds, None for no limit); the first one always runs.
+The estimate of a tier is a moving average of its runs that leaves out the first run of each graph, and it decreases
+every time the tier is skipped, so the tier is eventually tried and measured again.
+Returns a dict with the prediction, its confidence, its landmarks, the tier that answered and the time spent in each stage.
+'''
+def predict_posture_tiered(img_path, tiers=None, threshold=POSE_CONFIDENCE_THRESHOLD, budget=None):
+    tiers = tiers or POSE_TIERS
+    start = time.perf_counter()
+    result = {"prediction": NO_JOINTS, "confidence": 0.0, "landmarks": None, "tier": None, "complexity": None,
+              "budget_exceeded": False, "timings": {}}
+
+    for tier, (complexity, reduction) in enumerate(tiers):
+        elapsed = time.perf_counter() - start
+        if tier > 0 and budget is not None and elapsed + tier_costs.get(tier, 0.0) > budget:
+            if tier in tier_costs:
+                tier_costs[tier] *= TIER_COST_AGING
+            result["budget_exceeded"] = True
+            break
+
+        tier_start = time.perf_counter()
+        image = cv2.imread(img_path, REDUCED_DECODE_FLAGS[reduction])
+        if image is None:
+            raise ValueError(f"No se pudo cargar la imagen: {img_path}")
+        result["timings"][f"tier{tier}_decode"] = time.perf_counter() - tier_start
+
+        pred, proba, landmarks, timings = classify_image(image, complexity)
+        for stage, seconds in timings.items():
+            result["timings"][f"tier{tier}_{stage}"] = seconds
+        cost = time.perf_counter() - tier_start
+        if complexity in warm_graphs:
+            previous = tier_costs.get(tier)
+            tier_costs[tier] = cost if previous is None else TIER_COST_SMOOTHING * cost + (1 - TIER_COST_SMOOTHING) * previous
+        else:
+            warm_graphs.add(complexity)
+
+        confidence = float(proba.max()) if proba is not None else 0.0
+        if proba is not None and (result["tier"] is None or confidence >= result["confidence"]):
+            result.update(prediction=pred, confidence=confidence, landmarks=landmarks, tier=tier, complexity=complexity)
+        if confidence >= threshold:
+            break
+
+    result["timings"]["total"] = time.perf_counter() - start
+    return result
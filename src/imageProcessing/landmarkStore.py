@@ -0,0 +1,132 @@
+"""
+This module keeps the pose landmarks found in the photos of each session, so the sleeping positions can be classified
+again with a new model without running MediaPipe on the images.
+"""
+import os
+import glob
+import numpy as np
+from inferenceModels.modelRegistry import registry
+from utils.timeline_store import SessionTimeline, TIMELINE_DIR
+
+# Name of the landmark file inside each session folder
+LANDMARKS_FILE = "pose_landmarks.bin"
+
+# One fixed-size record per photo: capture time, photo index, classifier confidence, predicted label and the 33 joints (x, y, z, visibility)
+LANDMARK_RECORD = np.dtype([
+    ("timestamp", "<f8"),
+    ("photo_index", "<i4"),
+    ("confidence", "<f4"),
+    ("label", "S32"),
+    ("landmarks", "<f4", (33, 4))
+])
+
+'''
+Append-only binary file with the landmark records of one session
+'''
+class LandmarkStore:
+    # Store configuration
+    def __init__(self, path):
+        self.path = path
+
+    '''
+    Appends the record of one photo. landmarks is the (33, 4) array of joints, or the flat 132 values.
+    '''
+    def append(self, timestamp, photo_index, confidence, label, landmarks):
+        record = np.zeros(1, dtype=LANDMARK_RECORD)
+        record["timestamp"] = timestamp
+        record["photo_index"] = photo_index
+        record["confidence"] = confidence
+        record["label"] = _encode_label(label)
+        record["landmarks"] = np.asarray(landmarks, dtype=np.float32).reshape(33, 4)
+        with open(self.path, "ab") as f:
+            f.write(record.tobytes())
+
+    '''
+    Returns all the records as a structured array (empty if the session has none)
+    '''
+    def read(self):
+        if not os.path.exists(self.path):
+            return np.zeros(0, dtype=LANDMARK_RECORD)
+        # Ignore a record cut by an interrupted write
+        count = os.path.getsize(self.path) // LANDMARK_RECORD.itemsize
+        return np.fromfile(self.path, dtype=LANDMARK_RECORD, count=count)
+
+    '''
+    Replaces the file with the given records
+    '''
+    def write(self, records):
+        tmp_path = self.path + ".tmp"
+        records.astype(LANDMARK_RECORD).tofile(tmp_path)
+        os.replace(tmp_path, self.path)
+
+'''
+Returns the landmark store of a session
+'''
+def session_store(session_num, raw_dir=os.path.join("data", "raw")):
+    return LandmarkStore(os.path.join(raw_dir, f"Session{session_num}", LANDMARKS_FILE))
+
+'''
+Classifies again the stored landmarks of the given sessions with a single call to the classifier.
+Returns a dict: session number -> (records, predictions, confidences).
+With apply=True the new labels are saved in the stores and in the session timelines (read by the reports), and the
+images are renamed to <prediction>_<index>.
+'''
+def reclassify_sessions(session_nums, clf=None, raw_dir=os.path.join("data", "raw"), apply=False, timeline_dir=TIMELINE_DIR):
+    if clf is None:
+        clf = registry.get("pose")
+
+    stores = {session: session_store(session, raw_dir) for session in session_nums}
+    records = {session: store.read() for session, store in stores.items()}
+    all_records = np.concatenate([records[session] for session in session_nums]) if session_nums else np.zeros(0, dtype=LANDMARK_RECORD)
+    if len(all_records) == 0:
+        return {session: (records[session], np.array([]), np.array([])) for session in session_nums}
+
+    # One vectorized prediction for every photo of every session
+    features = all_records["landmarks"].reshape(len(all_records), -1).astype(np.float64)
+    proba = clf.predict_proba(features)
+    predictions = clf.classes_[np.argmax(proba, axis=1)]
+    confidences = proba.max(axis=1)
+
+    results = {}
+    offset = 0
+    for session in session_nums:
+        n = len(records[session])
+        session_predictions = predictions[offset:offset + n]
+        session_confidences = confidences[offset:offset + n]
+        results[session] = (records[session], session_predictions, session_confidences)
+        if apply and n:
+            apply_labels(stores[session], records[session], session_predictions, session_confidences,
+                         SessionTimeline(session, timeline_dir))
+        offset += n
+    return results
+
+'''
+Saves new labels for the records of a session and renames its images accordingly. The postures of the session
+timeline are matched by capture time.
+'''
+def apply_labels(store, records, predictions, confidences, timeline=None):
+    # Checked before any image is renamed
+    labels = [_encode_label(p) for p in predictions]
+    images_dir = os.path.join(os.path.dirname(store.path), "Images")
+    for photo_index, prediction in zip(records["photo_index"], predictions):
+        for old_path in glob.glob(os.path.join(images_dir, f"*_{photo_index}.*")):
+            extension = os.path.splitext(old_path)[1]
+            new_path = os.path.join(images_dir, f"{prediction}_{photo_index}{extension}")
+            if old_path != new_path:
+                os.rename(old_path, new_path)
+
+    updated = records.copy()
+    updated["label"] = labels
+    updated["confidence"] = confidences
+    store.write(updated)
+    if timeline is not None:
+        timeline.relabel_postures({float(t): (str(p), float(c)) for t, p, c in zip(records["timestamp"], predictions, confidences)})
+
+'''
+Encodes a label for a record. Labels that don't fit are an error, never cut.
+'''
+def _encode_label(label):
+    encoded = str(label).encode()
+    if len(encoded) > LANDMARK_RECORD["label"].itemsize:
+        raise ValueError(f"Landmark label too long: {label}")
+    return encoded
@@ -0,0 +1,114 @@
+"""
+This module runs the sleeping position prediction in separate worker processes, each one with its own MediaPipe graph and
+classifier loaded, so the pose inference doesn't compete with the audio capture and the UI for the interpreter.
+"""
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from imageProcessing import ImageProcessingModule
+
+'''
+Worker initializer: loads the models before the first image arrives
+'''
+def _init_worker():
+    ImageProcessingModule.load_models(sorted({2} | {complexity for complexity, _ in ImageProcessingModule.POSE_TIERS}))
+
+def _warm_up():
+    return True
+
+def _predict_path(img_path):
+    return ImageProcessingModule.predict_posture(img_path)
+
+def _predict_tiered(img_path, budget):
+    return ImageProcessingModule.predict_posture_tiered(img_path, budget=budget)
+
+'''
+Predicts on a frame placed in shared memory by the parent process
+'''
+def _predict_shared(name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return ImageProcessingModule.predict_posture_image(np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+    finally:
+        shm.close()
+
+'''
+Pool of pose inference processes. Every method returns a concurrent.futures.Future with the predicted position.
+'''
+class PoseWorkerPool:
+    # Pool configuration
+    def __init__(self, workers=1):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"), initializer=_init_worker)
+
+    '''
+    Starts the worker processes and loads their models in the background
+    '''
+    def warm_up(self):
+        return [self.executor.submit(_warm_up) for _ in range(self.workers)]
+
+    '''
+    Predicts the position on an image file
+    '''
+    def submit(self, img_path):
+        return self.executor.submit(_predict_path, img_path)
+
+    '''
+    Predicts the position on an image file with the tiered cascade. The future gives the result dict of predict_posture_tiered.
+    '''
+    def submit_tiered(self, img_path, budget=None):
+        return self.executor.submit(_predict_tiered, img_path, budget)
+
+    '''
+    Predicts the position on a BGR frame. The frame is copied once into shared memory, which is freed when the prediction ends.
+    '''
+    def submit_frame(self, frame):
+        frame = np.ascontiguousarray(frame)
+        shm = shared_memory.SharedMemory(create=True, size=max(frame.nbytes, 1))
+        np.ndarray(frame.shape, dtype=frame.dtype, buffer=shm.buf)[:] = frame
+        try:
+            future = self.executor.submit(_predict_shared, shm.name, frame.shape, frame.dtype.str)
+        except Exception:
+            shm.close()
+            shm.unlink()
+            raise
+
+        def release(_):
+            shm.close()
+            shm.unlink()
+        future.add_done_callback(release)
+        return future
+
+    '''
+    Stops the worker processes
+    '''
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+# Pose workers shared by the whole application while a session is recorded
+_workers = None
+
+'''
+Starts the shared pose workers and begins loading their models
+'''
+def start_pose_workers(workers=1):
+    global _workers
+    if _workers is None:
+        _workers = PoseWorkerPool(workers)
+        _workers.warm_up()
+    return _workers
+
+'''
+Returns the running shared pose workers, or None
+'''
+def get_pose_workers():
+    return _workers
+
+'''
+Stops the shared pose workers
+'''
+def stop_pose_workers(wait=True):
+    global _workers
+    if _workers is not None:
+        _workers.shutdown(wait=wait)
+        _workers = None
@@ -0,0 +1,115 @@
+"""
+This module follows the sleeping position during the whole session. Frames from the camera service are processed at a
+low rate with MediaPipe in tracking mode, which reuses the pose found in the previous frame instead of searching for
+the person again, and every period with the same position is written to the session timeline as an interval.
+"""
+import time
+import threading
+import cv2
+from imageProcessing import ImageProcessingModule
+
+'''
+Continuous posture tracking from a CameraService into a SessionTimeline
+'''
+class ContinuousPostureTracker:
+    # Tracker configuration
+    def __init__(self, camera, timeline, fps=1.0, complexity=1, stable_frames=2):
+        self.camera = camera
+        self.timeline = timeline
+        self.fps = fps
+        self.complexity = complexity
+        self.stable_frames = stable_frames     # frames with a new position needed to start a new interval
+        self.pose = None
+        self.running = False
+        self.thread = None
+        self.frames_processed = 0
+        self.intervals_written = 0
+
+        # Actual interval: position, start, time of its last frame and confidences
+        self.label = None
+        self.start = None
+        self.last_seen = None
+        self.confidences = []
+        # Position that differs from the actual one, waiting to be confirmed
+        self.candidate = None
+        self.candidate_start = None
+        self.candidate_count = 0
+
+    '''
+    Loads the models and starts the tracking thread
+    '''
+    def start(self):
+        if self.running:
+            return
+        ImageProcessingModule.load_models(())
+        self.pose = ImageProcessingModule.mp_pose.Pose(static_image_mode=False, model_complexity=self.complexity)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    '''
+    Stops the tracking and writes the last interval
+    '''
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.thread.join()
+        self._close_interval(self.last_seen)
+        self.pose.close()
+        print(f"[INFO] Posture tracking: {self.frames_processed} frames, {self.intervals_written} intervals")
+
+    '''
+    Returns (position, confidence) for a frame; the position is None if no person was found
+    '''
+    def classify(self, frame):
+        results = self.pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if not results.pose_landmarks:
+            return None, 0.0
+        pred, proba, _ = ImageProcessingModule.classify_landmarks(results.pose_landmarks)
+        return pred, float(proba.max())
+
+    '''
+    Adds the position found at time t. A new interval starts when the new position was seen in stable_frames frames in a row.
+    '''
+    def update(self, t, label, confidence):
+        self.frames_processed += 1
+        if label == self.label:
+            self.last_seen = t
+            self.confidences.append(confidence)
+            self.candidate, self.candidate_count = None, 0
+            return
+
+        if self.candidate_count == 0 or label != self.candidate:
+            self.candidate, self.candidate_start, self.candidate_count = label, t, 0
+        self.candidate_count += 1
+        if self.candidate_count >= self.stable_frames or self.label is None:
+            self._close_interval(self.candidate_start)
+            self.label, self.start, self.last_seen = self.candidate, self.candidate_start, t
+            self.confidences = [confidence]
+            self.candidate, self.candidate_count = None, 0
+
+    '''
+    Writes the actual interval, ending at t_end. Periods without a person are not written.
+    '''
+    def _close_interval(self, t_end):
+        if self.label is not None and t_end is not None:
+            self.timeline.append_interval(self.start, t_end, self.label, sum(self.confidences) / len(self.confidences))
+            self.intervals_written += 1
+        self.label = None
+
+    '''
+    Tracking thread: processes one frame every 1 / fps seconds
+    '''
+    def _run(self):
+        period = 1 / self.fps
+        next_frame = time.monotonic()
+        while self.running:
+            frame, timestamp = self.camera.snapshot(timeout=period)
+            if frame is not None:
+                try:
+                    self.update(timestamp, *self.classify(frame))
+                except Exception as e:
+                    print(f"[ERROR] Posture tracking failed: {e}")
+            next_frame += period
+            time.sleep(max(0.0, next_frame - time.monotonic()))
@@ -0,0 +1,151 @@
+"""
+This module flattens a fitted scikit-learn RandomForestClassifier into contiguous numpy arrays and evaluates it without
+going through sklearn, so predicting one row takes microseconds instead of milliseconds. The results are bit-identical
+to the ones of the original forest.
+"""
+import numpy as np
+
+'''
+RandomForestClassifier stored as flat arrays. The nodes of every tree are concatenated and leaves point to themselves,
+so all the trees of all the samples are walked together, one level at a time.
+'''
+class CompiledForest:
+    # Forest configuration (use from_forest or from_arrays to build one)
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, max_depth, classes, n_features, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value              # normalized class probabilities of every node
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.n_features = int(n_features)
+        self.feature_names = feature_names
+
+    '''
+    Builds the arrays from a fitted RandomForestClassifier (single output)
+    '''
+    @classmethod
+    def from_forest(cls, forest):
+        if getattr(forest, "n_outputs_", 1) != 1:
+            raise ValueError("Only single output forests can be compiled")
+
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            nodes = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+
+            # Same normalization done by DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :forest.n_classes_]
+            normalizer = value.sum(axis=1)
+            normalizer[normalizer == 0.0] = 1.0
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            missing.append(np.asarray(getattr(tree, "missing_go_to_left", np.zeros(n_nodes)), dtype=bool))
+            values.append(value / normalizer[:, None])
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        feature_names = getattr(forest, "feature_names_in_", None)
+        return cls(
+            np.concatenate(features).astype(np.intp),
+            np.concatenate(thresholds).astype(np.float64),
+            np.concatenate(lefts).astype(np.intp),
+            np.concatenate(rights).astype(np.intp),
+            np.concatenate(missing),
+            np.concatenate(values).astype(np.float64),
+            np.array(roots, dtype=np.intp),
+            max_depth,
+            forest.classes_,
+            forest.n_features_in_,
+            None if feature_names is None else np.asarray(feature_names)
+        )
+
+    '''
+    Returns the arrays of the forest by name (to be saved with numpy)
+    '''
+    def to_arrays(self):
+        arrays = {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "left": self.left,
+            "right": self.right,
+            "missing_left": self.missing_left,
+            "value": self.value,
+            "roots": self.roots,
+            "max_depth": np.array(self.max_depth),
+            "classes": self.classes_,
+            "n_features": np.array(self.n_features)
+        }
+        if self.feature_names is not None:
+            arrays["feature_names"] = self.feature_names
+        return arrays
+
+    '''
+    Builds a forest from the arrays returned by to_arrays
+    '''
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays["feature"], arrays["threshold"], arrays["left"], arrays["right"], arrays["missing_left"],
+                   arrays["value"], arrays["roots"], arrays["max_depth"], arrays["classes"], arrays["n_features"],
+                   arrays.get("feature_names"))
+
+    '''
+    Class probabilities, like RandomForestClassifier.predict_proba. X is a 2-D array, a single row or a DataFrame.
+    '''
+    def predict_proba(self, X):
+        X = self._as_array(X)
+        n_samples, n_trees = X.shape[0], len(self.roots)
+
+        # One path per (sample, tree); each level moves the paths not yet on a leaf one step down
+        nodes = np.tile(self.roots, n_samples)
+        samples = np.repeat(np.arange(n_samples), n_trees)
+        active = np.arange(len(nodes))
+        for _ in range(self.max_depth):
+            node = nodes[active]
+            x = X[samples[active], self.feature[node]]
+            go_left = x <= self.threshold[node]
+            missing = np.isnan(x)
+            if missing.any():
+                go_left = np.where(missing, self.missing_left[node], go_left)
+            child = np.where(go_left, self.left[node], self.right[node])
+            nodes[active] = child
+            # Leaves point to themselves
+            active = active[child != self.left[child]]
+            if len(active) == 0:
+                break
+        nodes = nodes.reshape(n_samples, n_trees)
+
+        # sklearn adds the probabilities of the trees one after the other, then divides by the number of trees
+        proba = np.cumsum(self.value[nodes], axis=1)[:, -1]
+        proba /= len(self.roots)
+        return proba
+
+    '''
+    Predicted classes, like RandomForestClassifier.predict
+    '''
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    '''
+    Converts the input to a 2-D float32 array (sklearn evaluates trees on float32), with the columns in training order
+    '''
+    def _as_array(self, X):
+        if self.feature_names is not None and hasattr(X, "columns"):
+            X = X[list(self.feature_names)]
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[1]} features, but the forest expects {self.n_features}")
+        return X
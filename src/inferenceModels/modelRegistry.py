@@ -0,0 +1,196 @@
+"""
+This module loads the trained models on first use instead of at import time. Random forests are compiled once into flat
+arrays (see compiledForest) that are cached next to the pickle as .npy files and memory-mapped read-only, so every process
+that uses a model shares the same pages of the file instead of unpickling its own copy.
+"""
+import os
+import json
+import time
+import shutil
+import threading
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from inferenceModels.compiledForest import CompiledForest
+
+# Trained models by name
+MODEL_PATHS = {
+    "apnea": "data/models/apnea-prediction-model.pkl",
+    "treatment": "data/models/treatment_required_model.pkl",
+    "pose": "data/models/pose_classifier_rf.pkl"
+}
+# Folder of the compiled forests, one subfolder per model
+COMPILED_DIR = "data/models/compiled"
+# Arrays of a compiled forest that are memory-mapped (the rest are small and loaded in memory)
+MAPPED_ARRAYS = ("feature", "threshold", "left", "right", "missing_left", "value")
+# File with the size and modification time of the pickle the cache was built from
+SOURCE_FILE = "source.json"
+
+'''
+Returns the resident memory of the process in bytes (None if it can't be read on this system)
+'''
+def _resident_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+'''
+Lazy, thread-safe registry of the trained models
+'''
+class ModelRegistry:
+    # Registry configuration
+    def __init__(self, paths=None, compiled_dir=COMPILED_DIR, use_compiled=True):
+        self.paths = dict(MODEL_PATHS if paths is None else paths)
+        self.compiled_dir = compiled_dir
+        self.use_compiled = use_compiled    # evaluate random forests with CompiledForest
+        self.models = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.locks = {name: threading.Lock() for name in self.paths}
+
+    '''
+    Returns a model by name, loading it the first time
+    '''
+    def get(self, name):
+        model = self.models.get(name)
+        if model is not None:
+            return model
+        if name not in self.paths:
+            raise KeyError(f"Unknown model: {name}")
+
+        # One lock per model, so loading one model doesn't wait for another
+        with self.locks[name]:
+            if name not in self.models:
+                rss_before = _resident_bytes()
+                start = time.perf_counter()
+                model, source = self._load(name)
+                rss_after = _resident_bytes()
+                with self.lock:
+                    self.models[name] = model
+                    self.stats[name] = {
+                        "source": source,
+                        "load_s": time.perf_counter() - start,
+                        "mapped_bytes": sum(a.nbytes for a in model.to_arrays().values()) if isinstance(model, CompiledForest) else 0,
+                        "resident_bytes": None if rss_before is None else rss_after - rss_before
+                    }
+            return self.models[name]
+
+    '''
+    Loads the given models (all by default), in a daemon thread if background is True. Returns the thread, or None.
+    '''
+    def warm_up(self, names=None, background=True):
+        names = list(self.paths) if names is None else list(names)
+
+        def load():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"[ERROR] Could not load model {name}: {e}")
+
+        if not background:
+            load()
+            return None
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
+        return thread
+
+    '''
+    Returns True if the model is already loaded
+    '''
+    def is_loaded(self, name):
+        return name in self.models
+
+    '''
+    Prints and returns the load statistics of the loaded models: source, load time, mapped bytes and resident memory added
+    '''
+    def report(self):
+        with self.lock:
+            stats = {name: dict(values) for name, values in self.stats.items()}
+        for name, values in stats.items():
+            resident = "unknown" if values["resident_bytes"] is None else f"{values['resident_bytes'] / 1e6:+.1f} MB"
+            print(f"[INFO] Model {name}: {values['source']}, {values['load_s']:.3f} s, "
+                  f"{values['mapped_bytes'] / 1e6:.1f} MB mapped, {resident} resident")
+        return stats
+
+    '''
+    Forgets the loaded models (they are loaded again on the next get)
+    '''
+    def clear(self):
+        with self.lock:
+            self.models.clear()
+            self.stats.clear()
+
+    def _load(self, name):
+        path = self.paths[name]
+        if self.use_compiled:
+            forest = self._load_compiled(name, path)
+            if forest is not None:
+                return forest, "compiled cache"
+
+        # Uncompressed joblib pickles keep their arrays in place, so they can be memory-mapped too
+        model = joblib.load(path, mmap_mode="r")
+        if self.use_compiled and isinstance(model, RandomForestClassifier) and getattr(model, "n_outputs_", 1) == 1:
+            forest = CompiledForest.from_forest(model)
+            self._save_compiled(name, path, forest)
+            # Use the mapped copy, shared with the other processes
+            mapped = self._load_compiled(name, path)
+            return (forest, "compiled") if mapped is None else (mapped, "compiled")
+        return model, "pickle"
+
+    '''
+    Loads the compiled forest of a model from the cache. Returns None if there is no cache or it is older than the pickle.
+    '''
+    def _load_compiled(self, name, path):
+        folder = os.path.join(self.compiled_dir, name)
+        try:
+            with open(os.path.join(folder, SOURCE_FILE)) as f:
+                source = json.load(f)
+            if source != self._source_signature(path):
+                return None
+            arrays = {}
+            for file in os.listdir(folder):
+                array_name, extension = os.path.splitext(file)
+                if extension != ".npy":
+                    continue
+                file_path = os.path.join(folder, file)
+                if array_name in MAPPED_ARRAYS:
+                    arrays[array_name] = np.load(file_path, mmap_mode="r")
+                else:
+                    # classes and feature names may be strings stored as objects
+                    arrays[array_name] = np.load(file_path, allow_pickle=True)
+            return CompiledForest.from_arrays(arrays)
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"[WARN] Compiled cache of model {name} not usable, rebuilding it: {e}")
+            return None
+
+    '''
+    Writes the compiled forest of a model to the cache. The folder is replaced at once, so other processes never read half of it.
+    '''
+    def _save_compiled(self, name, path, forest):
+        folder = os.path.join(self.compiled_dir, name)
+        tmp_folder = f"{folder}.tmp{os.getpid()}"
+        try:
+            os.makedirs(tmp_folder, exist_ok=True)
+            for array_name, array in forest.to_arrays().items():
+                np.save(os.path.join(tmp_folder, f"{array_name}.npy"), array, allow_pickle=array.dtype == object)
+            with open(os.path.join(tmp_folder, SOURCE_FILE), "w") as f:
+                json.dump(self._source_signature(path), f)
+            if os.path.isdir(folder):
+                shutil.rmtree(folder)
+            os.replace(tmp_folder, folder)
+        except OSError as e:
+            # Another process may have written the cache first; this one keeps its copy in memory
+            print(f"[WARN] Could not cache compiled model {name}: {e}")
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+
+    @staticmethod
+    def _source_signature(path):
+        info = os.stat(path)
+        return {"size": info.st_size, "mtime_ns": info.st_mtime_ns}
+
+# Registry shared by the whole process
+registry = ModelRegistry()
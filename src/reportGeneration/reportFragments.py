@@ -0,0 +1,132 @@
+"""
+This module keeps a rendered fragment of the report of every session: the chart images and the data of the summary and
+descriptive statistics tables. A fragment is saved with the hash of the rows of the session it was made from, so the
+full report only renders again the sessions that are new or whose rows changed.
+"""
+
+import os
+import json
+import shutil
+import matplotlib.pyplot as plt
+from reportGeneration.sessionSummary import load_summary
+from utils.session_store import SessionStore
+
+# Folder of the fragments, one folder per session
+FRAGMENT_DIR = "data/processed/report_fragments"
+FRAGMENT_FILE = "fragment.json"
+SIGNAL_CHART = "sleep_session_summary.png"
+PIE_CHART = "apnea_pie_chart.png"
+
+# Column names of the descriptive statistics table
+DESCRIPTIVE_COLUMNS = {
+    "Snoring_Intensity": "Snoring\nIntensity",
+    "Nasal_Airflow": "Nasal\nAirflow",
+    "Spectral_Centroid": "Spectral\nCentroid",
+    "Decibel_Level_dB": "Decibel\nLevel (dB)"
+}
+
+"""
+Plots the per-minute signal evolution and the apnea time pie chart of a session summary.
+"""
+def plot_sleep_session(result, signal_chart=SIGNAL_CHART, pie_chart=PIE_CHART):
+    interval_summary = result["interval_summary"]
+    stats = result["session_stats"]
+
+    # Sumarized graphs
+    plt.figure(figsize=(10, 4))
+    plt.plot(interval_summary["Interval"], interval_summary["Snoring_Intensity"], label="Snoring Intensity (avg)")
+    plt.plot(interval_summary["Interval"], interval_summary["Nasal_Airflow"], label="Nasal Airflow (avg)")
+    plt.plot(interval_summary["Interval"], interval_summary["Decibel_Level_dB"], label="Decibel Level (avg)")
+    plt.xlabel("Intervalo (minutos)")
+    plt.ylabel("Promedio")
+    plt.title("Evolución de señales por minuto")
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(signal_chart)
+    plt.close()
+
+    # Pie chart
+    apnea_ratio = [
+        stats["total_apneas"],
+        stats["segments"] - stats["total_apneas"]
+    ]
+    labels = ["Time with AOS", "Without Apnea"]
+    plt.figure(figsize=(5, 5))
+    plt.pie(apnea_ratio, labels=labels, autopct='%1.1f%%', colors=["#ff9999", "#99ff99"], startangle=90)
+    plt.title("Apnea time pie chart")
+    plt.tight_layout()
+    plt.savefig(pie_chart)
+    plt.close()
+
+"""
+Returns the rows (header first) of the session summary table of a session summary.
+"""
+def summary_table_data(result):
+    data = [["Duration\n(h)", "Total\nApneas", "Mean\nSnoring", "Snoring\nVariability",
+             "Max\nDecibel", "Apnea\nRate (/h)", "Treatment\nRequired"]]
+    for _, row in result["session_summary_row"].iterrows():
+        data.append([
+            row["Duration_h"], row["Total_Apneas"], row["Snoring_Mean"],
+            row["Snoring_Variability"], row["Decibel_Max"],
+            row["Apnea_Rate_hr"], "Yes" if row["Treatment_Required"] else "No"
+        ])
+    return data
+
+"""
+Returns the rows (header first) of the descriptive statistics table of a session summary.
+"""
+def descriptive_table_data(result):
+    desc = result["descriptive_table"].round(2).reset_index()
+    desc = desc.rename(columns={col: DESCRIPTIVE_COLUMNS.get(col, col) for col in desc.columns})
+    return [desc.columns.tolist()] + desc.values.tolist()
+
+"""
+Returns the report fragment of a session (table data and paths of the charts), rendering it only if there is none
+for the current rows of the session. Returns None if the session has no rows.
+"""
+def session_fragment(session_id, store=None, fragment_dir=FRAGMENT_DIR):
+    store = store or SessionStore()
+    folder = os.path.join(fragment_dir, f"Session{session_id}")
+    fragment_path = os.path.join(folder, FRAGMENT_FILE)
+    # The hash is read before the summary: if the rows change in between, the saved fragment is already out of date
+    rows_hash = store.rows_hash(session_id)
+
+    fragment = _read_fragment(fragment_path)
+    if fragment is not None and rows_hash is not None and fragment["rows_hash"] == rows_hash \
+            and all(os.path.exists(fragment[chart]) for chart in ("signal_chart", "pie_chart")):
+        return fragment
+
+    result = load_summary(session_id, store)
+    if result is None:
+        return None
+    os.makedirs(folder, exist_ok=True)
+    fragment = {
+        "rows_hash": rows_hash,
+        "summary_data": summary_table_data(result),
+        "descriptive_data": descriptive_table_data(result),
+        "signal_chart": os.path.join(folder, SIGNAL_CHART),
+        "pie_chart": os.path.join(folder, PIE_CHART)
+    }
+    plot_sleep_session(result, fragment["signal_chart"], fragment["pie_chart"])
+
+    # Written last, so a fragment whose charts were not saved is never read
+    tmp_path = fragment_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(fragment, f, default=lambda value: value.item())
+    os.replace(tmp_path, fragment_path)
+    return fragment
+
+"""
+Removes the report fragment of a session.
+"""
+def remove_fragment(session_id, fragment_dir=FRAGMENT_DIR):
+    folder = os.path.join(fragment_dir, f"Session{session_id}")
+    if os.path.exists(folder):
+        shutil.rmtree(folder)
+
+def _read_fragment(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
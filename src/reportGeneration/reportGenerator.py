@@ -4,8 +4,6 @@ This module is in charged of generating PDF reports based in the analyzed audio
 
 import os
 import json
-import pandas as pd
-import matplotlib.pyplot as plt
 import tkinter as tk
 from tkinter import filedialog
 from reportlab.lib.pagesizes import A4
@@ -13,11 +11,13 @@ from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, Table, Tab
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib import colors
 from recommendation.recommendation_engine import generate_recommendations
-from dataAcquisition.cameraInput import getPhotoDatetime, getFileNames
+from utils.timeline_store import session_positions
+from utils.session_store import SessionStore
+from reportGeneration.sessionSummary import summarize_session
+from reportGeneration.reportFragments import plot_sleep_session, session_fragment
 
-# Constants for data paths and output directory
+# Constants for data paths and output directory (the sessions are read from the session store)
 JSON_PATH = "data/patientData/patient_data.json"
-CSV_PATH = "data/processed/processed_patient_data.csv"
 OUTPUT_DIR = "docs"
 AUDIO_FOLDER = "data/raw"
 
@@ -34,17 +34,15 @@ def generate_report(session_number):
     with open(JSON_PATH, "r") as f:
         patient_data = json.load(f)["patient"]
 
-    # Load processed data
-    df = pd.read_csv(CSV_PATH)
-    df["Session"] = df.groupby((df['Start_Time'] == 0).cumsum()).ngroup() + 1
-    session_df = df[df["Session"] == session_number]
-
-    # Analyze the session 
-    result = analyze_sleep_session(session_df)
+    # Report fragment of the session (tables and charts), rendered only if its rows changed since the last report
+    fragment = session_fragment(session_number, SessionStore())
+    if fragment is None:
+        print(f"[ERROR] Session {session_number} not found.")
+        return
 
     # Add image predictions as table 
     imagesPath = os.path.join(AUDIO_FOLDER, f"Session{session_number}", "Images")
-    imagesNameList = getFileNames(imagesPath)
+    positions = session_positions(session_number, imagesPath)
 
     # Save path dialog
     root = tk.Tk()
@@ -94,18 +92,7 @@ def generate_report(session_number):
     elements.append(Spacer(1, 20))
 
     # Session Summary Table
-    session_summary = result["session_summary_row"]
-    session_table_data = [["Duration\n(h)", "Total\nApneas", "Mean\nSnoring", "Snoring\nVariability", 
-                           "Max\nDecibel", "Apnea\nRate (/h)", "Treatment\nRequired"]]
-
-    for _, row in session_summary.iterrows():
-        session_table_data.append([
-            row["Duration_h"], row["Total_Apneas"], row["Snoring_Mean"],
-            row["Snoring_Variability"], row["Decibel_Max"],
-            row["Apnea_Rate_hr"], "Yes" if row["Treatment_Required"] else "No"
-        ])
-
-    session_table = Table(session_table_data, hAlign="LEFT")
+    session_table = Table(fragment["summary_data"], hAlign="LEFT")
     session_table.setStyle(TableStyle([
         ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#4A4A6A")),
         ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
@@ -119,22 +106,8 @@ def generate_report(session_number):
     
 
     # Descriptive Statistics
-    desc = result["descriptive_table"].round(2).reset_index()
-
-    # Define column names
-    column_mapping = {
-        "Snoring_Intensity": "Snoring\nIntensity",
-        "Nasal_Airflow": "Nasal\nAirflow",
-        "Spectral_Centroid": "Spectral\nCentroid",
-        "Decibel_Level_dB": "Decibel\nLevel (dB)"
-    }
-
-    # Rename columns if they exist
-    desc = desc.rename(columns={col: column_mapping.get(col, col) for col in desc.columns})
-
-    # Build table
-    desc_data = [desc.columns.tolist()] + desc.values.tolist()
-    desc_table = Table(desc_data, hAlign="LEFT", colWidths=[80] + [60] * (len(desc.columns) - 1))
+    desc_data = fragment["descriptive_data"]
+    desc_table = Table(desc_data, hAlign="LEFT", colWidths=[80] + [60] * (len(desc_data[0]) - 1))
     desc_table.setStyle(TableStyle([
         ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#4A4A6A")),
         ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
@@ -155,15 +128,9 @@ def generate_report(session_number):
     headers = ["Date and Time", "Sleeping Position Detected"]
     data = [headers]
 
-    # Add rows for captured images
-    for image_name in imagesNameList:
-        image_path = os.path.join(imagesPath, image_name)
-
-        # Get date and time of the file
-        dt = getPhotoDatetime(image_path)
-        name_only, _ = os.path.splitext(image_name)
-
-        data.append([dt, name_only])
+    # Add rows for captured images, from the session timeline
+    for dt, position in positions:
+        data.append([dt, position])
 
     # Create table
     img_table = Table(data, hAlign="LEFT", colWidths=[180, 180])
@@ -181,16 +148,14 @@ def generate_report(session_number):
 
 
 
-    # Include Graphs
-    if os.path.exists("apnea_pie_chart.png"):
-        elements.append(Paragraph("Apnea Time Distribution", styles["Heading3"]))
-        elements.append(Image("apnea_pie_chart.png", width=200, height=200))
-        elements.append(Spacer(1, 20))
-    
-    if os.path.exists("sleep_session_summary.png"):
-        elements.append(Paragraph("Signal Evolution Summary", styles["Heading3"]))
-        elements.append(Image("sleep_session_summary.png", width=400, height=180))
-        elements.append(Spacer(1, 20))
+    # Include Graphs (the charts of the session fragment)
+    elements.append(Paragraph("Apnea Time Distribution", styles["Heading3"]))
+    elements.append(Image(fragment["pie_chart"], width=200, height=200))
+    elements.append(Spacer(1, 20))
+
+    elements.append(Paragraph("Signal Evolution Summary", styles["Heading3"]))
+    elements.append(Image(fragment["signal_chart"], width=400, height=180))
+    elements.append(Spacer(1, 20))
 
     # Recommendations
     recommendations = generate_recommendations(
@@ -219,26 +184,18 @@ def generate_report(session_number):
     print(f"[INFO] Report saved to: {file_path}")
     root.destroy()
 
-    # Delete temporary pie chart
-    if os.path.exists("apnea_pie_chart.png"):
-        os.remove("apnea_pie_chart.png")
-    if os.path.exists("sleep_session_summary.png"):
-        os.remove("sleep_session_summary.png")
-
 """
 Generates a complete PDF report containing data from all recorded sleep sessions.
 """
 def generate_full_report():
     
-    # Ensure CSV exists
-    if not os.path.exists(CSV_PATH):
-        print("[ERROR] CSV file not found.")
+    # Ensure there are sessions
+    store = SessionStore()
+    session_ids = store.session_ids()
+    if not session_ids:
+        print("[ERROR] No sleep sessions recorded.")
         return
 
-    # Load data
-    df = pd.read_csv(CSV_PATH)
-    df["Session"] = df.groupby((df['Start_Time'] == 0).cumsum()).ngroup() + 1
-
     with open(JSON_PATH, "r") as f:
         patient_data = json.load(f)["patient"]
 
@@ -287,25 +244,17 @@ def generate_full_report():
     elements.append(patient_table)
     elements.append(Spacer(1, 20))
 
-    # Analyze all sessions
-    for session_id, session_df in df.groupby("Session"):
-        result = analyze_sleep_session(session_df)
+    # Report fragments (tables and charts) of all sessions; only new sessions or those whose rows changed are rendered
+    for session_id in session_ids:
+        fragment = session_fragment(session_id, store)
+        if fragment is None:
+            continue
 
         elements.append(Paragraph(f"<b>Sleep Session {session_id}</b>", styles["Heading2"]))
         elements.append(Spacer(1, 10))
 
         # Session Summary Table
-        summary = result["session_summary_row"]
-        summary_data = [["Duration\n(h)", "Total\nApneas", "Mean\nSnoring", "Snoring\nVariability",
-                         "Max\nDecibel", "Apnea\nRate (/h)", "Treatment\nRequired"]]
-        for _, row in summary.iterrows():
-            summary_data.append([
-                row["Duration_h"], row["Total_Apneas"], row["Snoring_Mean"],
-                row["Snoring_Variability"], row["Decibel_Max"],
-                row["Apnea_Rate_hr"], "Yes" if row["Treatment_Required"] else "No"
-            ])
-
-        session_table = Table(summary_data, hAlign="LEFT")
+        session_table = Table(fragment["summary_data"], hAlign="LEFT")
         session_table.setStyle(TableStyle([
             ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#4A4A6A")),
             ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
@@ -318,17 +267,8 @@ def generate_full_report():
         elements.append(Spacer(1, 15))
 
         # Descriptive Statistics
-        desc = result["descriptive_table"].round(2).reset_index()
-        column_mapping = {
-            "Snoring_Intensity": "Snoring\nIntensity",
-            "Nasal_Airflow": "Nasal\nAirflow",
-            "Spectral_Centroid": "Spectral\nCentroid",
-            "Decibel_Level_dB": "Decibel\nLevel (dB)"
-        }
-        desc = desc.rename(columns={col: column_mapping.get(col, col) for col in desc.columns})
-
-        desc_data = [desc.columns.tolist()] + desc.values.tolist()
-        desc_table = Table(desc_data, hAlign="LEFT", colWidths=[80] + [60]*(len(desc.columns)-1))
+        desc_data = fragment["descriptive_data"]
+        desc_table = Table(desc_data, hAlign="LEFT", colWidths=[80] + [60]*(len(desc_data[0])-1))
         desc_table.setStyle(TableStyle([
             ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#4A4A6A")),
             ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
@@ -339,16 +279,14 @@ def generate_full_report():
         elements.append(desc_table)
         elements.append(Spacer(1, 20))
 
-        # Add charts to PDF
-        if os.path.exists("apnea_pie_chart.png"):
-            elements.append(Paragraph("Apnea Time Distribution", styles["Heading3"]))
-            elements.append(Image("apnea_pie_chart.png", width=200, height=200))
-            elements.append(Spacer(1, 20))
+        # Add the charts of the session to PDF (each session has its own files)
+        elements.append(Paragraph("Apnea Time Distribution", styles["Heading3"]))
+        elements.append(Image(fragment["pie_chart"], width=200, height=200))
+        elements.append(Spacer(1, 20))
 
-        if os.path.exists("sleep_session_summary.png"):
-            elements.append(Paragraph("Signal Evolution Summary", styles["Heading3"]))
-            elements.append(Image("sleep_session_summary.png", width=400, height=180))
-            elements.append(Spacer(1, 20))
+        elements.append(Paragraph("Signal Evolution Summary", styles["Heading3"]))
+        elements.append(Image(fragment["signal_chart"], width=400, height=180))
+        elements.append(Spacer(1, 20))
 
     # Recommendations
     recommendations = generate_recommendations(
@@ -378,85 +316,10 @@ def generate_full_report():
     print(f"[INFO] Full report saved to: {file_path}")
     root.destroy()
 
-    # Delete temporary pie chart
-    if os.path.exists("apnea_pie_chart.png"):
-        os.remove("apnea_pie_chart.png")
-    if os.path.exists("sleep_session_summary.png"):
-        os.remove("sleep_session_summary.png")
-
 """
 Analyzes and summarizes a complete sleep session with statistics and plots.
 """
 def analyze_sleep_session(session_df, interval_seconds=60, sample_window=5):
-    
-    rows_per_interval = int(interval_seconds / sample_window)
-    session_df = session_df.copy()
-    session_df["Interval"] = (session_df.index // rows_per_interval)
-
-    interval_summary = session_df.groupby("Interval").agg({
-        "Snoring_Intensity": "mean",
-        "Nasal_Airflow": "mean",
-        "Spectral_Centroid": "mean",
-        "Snore_Energy": "mean",
-        "Decibel_Level_dB": "mean",
-        "Has_Apnea": "sum",
-        "Treatment_Required": "max"
-    }).reset_index()
-
-    # General stats
-    stats = {}
-    stats["duration_hours"] = len(session_df) * sample_window / 3600
-    stats["total_apneas"] = session_df["Has_Apnea"].sum()
-    stats["total_snoring_events"] = (session_df["Snoring_Intensity"] > 0.3).sum()
-    stats["mean_snoring"] = session_df["Snoring_Intensity"].mean()
-    stats["max_decibel"] = session_df["Decibel_Level_dB"].max()
-    stats["snoring_variability"] = session_df["Snoring_Intensity"].std() / (stats["mean_snoring"] + 1e-6)
-    stats["apnea_rate_hr"] = stats["total_apneas"] / stats["duration_hours"]
-
-    # Descriptive stats
-    desc = session_df[["Snoring_Intensity", "Nasal_Airflow", "Spectral_Centroid", "Decibel_Level_dB"]].describe()
-    desc.loc["cv"] = desc.loc["std"] / (desc.loc["mean"] + 1e-6)
-
-    # Sumarized graphs
-    plt.figure(figsize=(10, 4))
-    plt.plot(interval_summary["Interval"], interval_summary["Snoring_Intensity"], label="Snoring Intensity (avg)")
-    plt.plot(interval_summary["Interval"], interval_summary["Nasal_Airflow"], label="Nasal Airflow (avg)")
-    plt.plot(interval_summary["Interval"], interval_summary["Decibel_Level_dB"], label="Decibel Level (avg)")
-    plt.xlabel("Intervalo (minutos)")
-    plt.ylabel("Promedio")
-    plt.title("Evolución de señales por minuto")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig("sleep_session_summary.png")
-    plt.close()
-
-    # Pie chart
-    apnea_ratio = [
-        session_df["Has_Apnea"].sum(),
-        len(session_df) - session_df["Has_Apnea"].sum()
-    ]
-    labels = ["Time with AOS", "Without Apnea"]
-    plt.figure(figsize=(5, 5))
-    plt.pie(apnea_ratio, labels=labels, autopct='%1.1f%%', colors=["#ff9999", "#99ff99"], startangle=90)
-    plt.title("Apnea time pie chart")
-    plt.tight_layout()
-    plt.savefig("apnea_pie_chart.png")
-    plt.close()
-
-    resume_sesion = pd.DataFrame([{
-        "Sleep_Session": 1,
-        "Duration_h": round(stats["duration_hours"], 2),
-        "Total_Apneas": int(stats["total_apneas"]),
-        "Snoring_Mean": round(stats["mean_snoring"], 3),
-        "Snoring_Variability": round(stats["snoring_variability"], 3),
-        "Decibel_Max": round(stats["max_decibel"], 2),
-        "Apnea_Rate_hr": round(stats["apnea_rate_hr"], 2),
-        "Treatment_Required": int(session_df["Treatment_Required"].max())
-    }])
-
-    return {
-        "interval_summary": interval_summary,
-        "session_stats": stats,
-        "descriptive_table": desc,
-        "session_summary_row": resume_sesion
-    }
+    result = summarize_session(session_df, interval_seconds, sample_window)
+    plot_sleep_session(result)
+    return result
@@ -0,0 +1,110 @@
+"""
+This module computes the summary of a sleep session (per-minute rollups, general stats, descriptive statistics and the
+session summary row) and keeps it in the session store next to the rows of the session. The summary is computed once
+when the session is saved and only computed again if the rows of the session change, so the reports don't read the
+rows of every session.
+"""
+
+import pandas as pd
+from utils.session_store import SessionStore
+
+# Parts of the summary that are tables
+SUMMARY_FRAMES = ("interval_summary", "descriptive_table", "session_summary_row")
+
+"""
+Computes the summary of a complete sleep session from its rows. The session id of the summary row is taken from the
+rows if it isn't given.
+"""
+def summarize_session(session_df, interval_seconds=60, sample_window=5, session_id=None):
+    if session_id is None:
+        session_id = int(session_df["Sleep_Session"].iloc[0])
+
+    rows_per_interval = int(interval_seconds / sample_window)
+    session_df = session_df.reset_index(drop=True)
+    session_df["Interval"] = (session_df.index // rows_per_interval)
+
+    interval_summary = session_df.groupby("Interval").agg({
+        "Snoring_Intensity": "mean",
+        "Nasal_Airflow": "mean",
+        "Spectral_Centroid": "mean",
+        "Snore_Energy": "mean",
+        "Decibel_Level_dB": "mean",
+        "Has_Apnea": "sum",
+        "Treatment_Required": "max"
+    }).reset_index()
+
+    # General stats
+    stats = {}
+    stats["segments"] = len(session_df)
+    stats["duration_hours"] = len(session_df) * sample_window / 3600
+    stats["total_apneas"] = session_df["Has_Apnea"].sum()
+    stats["total_snoring_events"] = (session_df["Snoring_Intensity"] > 0.3).sum()
+    stats["mean_snoring"] = session_df["Snoring_Intensity"].mean()
+    stats["max_decibel"] = session_df["Decibel_Level_dB"].max()
+    stats["snoring_variability"] = session_df["Snoring_Intensity"].std() / (stats["mean_snoring"] + 1e-6)
+    stats["apnea_rate_hr"] = stats["total_apneas"] / stats["duration_hours"]
+
+    # Descriptive stats
+    desc = session_df[["Snoring_Intensity", "Nasal_Airflow", "Spectral_Centroid", "Decibel_Level_dB"]].describe()
+    desc.loc["cv"] = desc.loc["std"] / (desc.loc["mean"] + 1e-6)
+
+    resume_sesion = pd.DataFrame([{
+        "Sleep_Session": int(session_id),
+        "Duration_h": round(stats["duration_hours"], 2),
+        "Total_Apneas": int(stats["total_apneas"]),
+        "Snoring_Mean": round(stats["mean_snoring"], 3),
+        "Snoring_Variability": round(stats["snoring_variability"], 3),
+        "Decibel_Max": round(stats["max_decibel"], 2),
+        "Apnea_Rate_hr": round(stats["apnea_rate_hr"], 2),
+        "Treatment_Required": int(session_df["Treatment_Required"].max())
+    }])
+
+    return {
+        "interval_summary": interval_summary,
+        "session_stats": stats,
+        "descriptive_table": desc,
+        "session_summary_row": resume_sesion
+    }
+
+"""
+Computes the summary of a stored session and saves it in the session store. Returns None if the session has no rows.
+"""
+def materialize_summary(session_id, store=None):
+    store = store or SessionStore()
+    # The hash is read before the rows: if they change in between, the saved summary is already out of date
+    rows_hash = store.rows_hash(session_id)
+    session_df = store.read(session_id)
+    if session_df.empty:
+        return None
+    summary = summarize_session(session_df, session_id=session_id)
+    store.save_summary(session_id, rows_hash, encode_summary(summary))
+    return summary
+
+"""
+Returns the summary of a stored session, computing it only if it wasn't saved or the rows changed since.
+Returns None if the session has no rows.
+"""
+def load_summary(session_id, store=None):
+    store = store or SessionStore()
+    saved = store.summary(session_id)
+    if saved is not None:
+        return decode_summary(saved)
+    return materialize_summary(session_id, store)
+
+"""
+Converts a summary to JSON serializable values.
+"""
+def encode_summary(summary):
+    encoded = {name: summary[name].to_dict(orient="split") for name in SUMMARY_FRAMES}
+    # numpy scalars to Python values
+    encoded["session_stats"] = {key: value.item() if hasattr(value, "item") else value
+                                for key, value in summary["session_stats"].items()}
+    return encoded
+
+"""
+Rebuilds a summary from the values given by encode_summary.
+"""
+def decode_summary(encoded):
+    summary = {name: pd.DataFrame(**encoded[name]) for name in SUMMARY_FRAMES}
+    summary["session_stats"] = dict(encoded["session_stats"])
+    return summary
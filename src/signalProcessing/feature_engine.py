@@ -0,0 +1,154 @@
+"""
+This module computes the acoustic features of every audio segment at once, working over strided 2-D views of the filtered signal
+instead of calling librosa once per segment.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import get_window
+
+# Frame configuration used by librosa's defaults in extract_features
+RMS_FRAME_LENGTH = 2048
+RMS_HOP_LENGTH = 512
+ZCR_FRAME_LENGTH = 512
+ZCR_HOP_LENGTH = 256
+STFT_N_FFT = 2048
+STFT_HOP_LENGTH = 512
+ZCR_THRESHOLD = 1e-10
+
+# Snore band limits (Hz)
+SNORE_BAND = (100, 500)
+
+# Segments processed together by compute_segment_features
+FEATURE_BLOCK_SEGMENTS = 32
+
+"""
+Frames an audio signal into a (segments, samples_per_segment) view. Incomplete trailing samples are left out.
+"""
+def frame_segments(audio, samples_per_segment):
+    n_segments = len(audio) // samples_per_segment
+    return np.asarray(audio)[:n_segments * samples_per_segment].reshape(n_segments, samples_per_segment)
+
+"""
+Scales every segment (row) by its peak absolute value, as done before extracting the features of a segment.
+"""
+def normalize_segments(segments):
+    return segments / np.max(np.abs(segments), axis=1, keepdims=True)
+
+"""
+Sums consecutive windows of a (segments, samples) array using a cumulative sum. Returns a (segments, frames) array.
+"""
+def _window_sums(values, frame_length, hop_length):
+    cumulative = np.zeros((values.shape[0], values.shape[1] + 1))
+    np.cumsum(values, axis=1, out=cumulative[:, 1:])
+    starts = np.arange(0, values.shape[1] - frame_length + 1, hop_length)
+    return cumulative[:, starts + frame_length] - cumulative[:, starts]
+
+"""
+Mean framewise RMS of each segment (librosa.feature.rms with centered, zero padded frames).
+"""
+def _rms(segments):
+    pad = RMS_FRAME_LENGTH // 2
+    padded = np.pad(segments, ((0, 0), (pad, pad)), mode="constant")
+    power = _window_sums(padded ** 2, RMS_FRAME_LENGTH, RMS_HOP_LENGTH) / RMS_FRAME_LENGTH
+    return np.mean(np.sqrt(power), axis=1)
+
+"""
+Mean framewise zero crossing rate of each segment (librosa.feature.zero_crossing_rate with frame_length=512, hop_length=256).
+"""
+def _zero_crossing_rate(segments):
+    pad = ZCR_FRAME_LENGTH // 2
+    padded = np.pad(segments, ((0, 0), (pad, pad)), mode="edge")
+    signs = np.signbit(np.where(np.abs(padded) <= ZCR_THRESHOLD, 0.0, padded))
+    crossings = signs[:, 1:] != signs[:, :-1]
+    # The first sample of every frame is never counted as a crossing
+    counts = _window_sums(crossings, ZCR_FRAME_LENGTH - 1, ZCR_HOP_LENGTH)
+    return np.mean(counts / ZCR_FRAME_LENGTH, axis=1)
+
+"""
+Mean framewise spectral centroid of each segment (librosa.feature.spectral_centroid with a centered Hann STFT).
+"""
+def _spectral_centroid(segments, sample_rate):
+    pad = STFT_N_FFT // 2
+    padded = np.pad(segments, ((0, 0), (pad, pad)), mode="constant")
+    frames = sliding_window_view(padded, STFT_N_FFT, axis=1)[:, ::STFT_HOP_LENGTH]
+    window = get_window("hann", STFT_N_FFT, fftbins=True)
+    magnitude = np.abs(np.fft.rfft(frames * window, axis=-1))
+    freqs = np.fft.rfftfreq(STFT_N_FFT, 1 / sample_rate)
+
+    total = np.sum(magnitude, axis=-1)
+    total[total < np.finfo(magnitude.dtype).tiny] = 1.0
+    centroid = np.sum(magnitude * freqs, axis=-1) / total
+    return np.mean(centroid, axis=1)
+
+"""
+Energy of the snore band (100-500 Hz) of each segment, from the real FFT of the whole segment.
+"""
+def _snore_energy(segments, sample_rate):
+    magnitude = np.abs(np.fft.rfft(segments, axis=1))
+    freqs = np.fft.rfftfreq(segments.shape[1], 1 / sample_rate)
+    return _band_energy(magnitude, freqs)
+
+def _band_energy(magnitude, freqs):
+    band = (freqs >= SNORE_BAND[0]) & (freqs <= SNORE_BAND[1])
+    return np.sum(magnitude[:, band], axis=1)
+
+"""
+dB level of each segment from the RMS of the whole segment. Silent segments get -inf.
+"""
+def _decibels(segments):
+    rms = np.sqrt(np.mean(segments ** 2, axis=1))
+    with np.errstate(divide="ignore"):
+        return np.where(rms == 0, -np.inf, 20 * np.log10(rms))
+
+"""
+Computes the acoustic features for a (segments, samples) array of already normalized segments.
+Returns a touple of arrays (RMS, ZCR, Spectral centroid, Snore energy, dB level), one value per segment.
+The ZCR is returned without rescaling.
+"""
+def compute_segment_features(segments, sample_rate, block_segments=FEATURE_BLOCK_SEGMENTS):
+    segments = np.atleast_2d(segments)
+    n_segments = segments.shape[0]
+    rms = np.empty(n_segments)
+    zcr = np.empty(n_segments)
+    spectral_centroid = np.empty(n_segments)
+    snore_energy = np.empty(n_segments)
+    decibel_level = np.empty(n_segments)
+
+    # Work in blocks of segments so the STFT frames of a whole night never live in memory at once
+    for start in range(0, n_segments, block_segments):
+        block = slice(start, start + block_segments)
+        rows = segments[block]
+        rms[block] = _rms(rows)
+        zcr[block] = _zero_crossing_rate(rows)
+        spectral_centroid[block] = _spectral_centroid(rows, sample_rate)
+        snore_energy[block] = _snore_energy(rows, sample_rate)
+        decibel_level[block] = _decibels(rows)
+
+    return rms, zcr, spectral_centroid, snore_energy, decibel_level
+
+"""
+Cheap silence test for (segments, samples) arrays of filtered, not normalized, segments: a segment is silent when both
+its RMS and its peak stay close to the noise floor (RMS estimated at the beginning of the recording).
+Returns a boolean array, one value per segment.
+"""
+def silence_mask(segments, noise_threshold, rms_ratio=1.5, peak_ratio=6.0):
+    segments = np.atleast_2d(segments)
+    rms = np.sqrt(np.mean(np.square(segments, dtype=np.float64), axis=1))
+    peak = np.max(np.abs(segments), axis=1)
+    return (rms <= rms_ratio * noise_threshold) & (peak <= peak_ratio * noise_threshold)
+
+"""
+Computes the features of already normalized segments found silent, without the STFT: same touple as
+compute_segment_features. RMS, ZCR, snore energy and dB level are the same values; the spectral centroid is estimated
+from the FFT of the whole segment (already needed for the snore energy) instead of averaged over the STFT frames.
+"""
+def compute_fast_features(segments, sample_rate):
+    segments = np.atleast_2d(segments)
+    magnitude = np.abs(np.fft.rfft(segments, axis=1))
+    freqs = np.fft.rfftfreq(segments.shape[1], 1 / sample_rate)
+
+    total = np.sum(magnitude, axis=1)
+    total[total < np.finfo(magnitude.dtype).tiny] = 1.0
+    spectral_centroid = np.sum(magnitude * freqs, axis=1) / total
+    return _rms(segments), _zero_crossing_rate(segments), spectral_centroid, _band_energy(magnitude, freqs), _decibels(segments)
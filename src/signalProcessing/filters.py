@@ -0,0 +1,40 @@
+"""
+This module provides the Butterworth bandpass filter used on the recordings, designed once per configuration in second-order
+sections (SOS) and able to filter a recording chunk by chunk.
+"""
+
+from functools import lru_cache
+import numpy as np
+from scipy.signal import butter, sosfilt
+
+"""
+Designs a Butterworth bandpass filter and returns its second-order sections. Designs are cached per (fs, band, order).
+"""
+@lru_cache(maxsize=None)
+def design_bandpass_sos(lowcut, highcut, fs, order=5):
+    nyq = 0.5 * fs
+    # The cached design is shared between filters, so it must not be modified
+    return butter(order, [lowcut / nyq, highcut / nyq], btype='band', output='sos')
+
+'''
+Bandpass filter that keeps its internal state (zi) between calls, so filtering a recording in successive chunks
+gives the same output as filtering it at once
+'''
+class BandpassFilter:
+    # Filter configuration
+    def __init__(self, lowcut=20, highcut=3000, fs=16000, order=5):
+        self.sos = design_bandpass_sos(lowcut, highcut, fs, order)
+        self.reset()
+
+    '''
+    Clears the filter state, as at the beginning of a recording
+    '''
+    def reset(self):
+        self.zi = np.zeros((self.sos.shape[0], 2))
+
+    '''
+    Filters the next chunk of the signal and returns the filtered samples
+    '''
+    def process(self, chunk):
+        filtered, self.zi = sosfilt(self.sos, chunk, zi=self.zi)
+        return filtered
@@ -0,0 +1,47 @@
+"""
+This module keeps the journal of a recording session: the dataset rows produced by the live analysis are appended to a
+CSV file inside the session folder as soon as each segment is labeled, so the session can be saved without processing it again.
+"""
+
+import os
+import csv
+import pandas as pd
+
+# Name of the journal file inside each session folder
+JOURNAL_FILE = "segments_journal.csv"
+
+'''
+Append-only journal of the labeled segments of one session
+'''
+class SegmentJournal:
+    # Journal configuration
+    def __init__(self, path):
+        self.path = path
+
+    '''
+    Appends the given rows (dicts with the dataset columns) to the journal
+    '''
+    def append(self, rows):
+        if not rows:
+            return
+        is_new = not os.path.exists(self.path)
+        with open(self.path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            if is_new:
+                writer.writeheader()
+            writer.writerows(rows)
+
+    '''
+    Returns all the journaled rows as a DataFrame (empty if nothing was journaled)
+    '''
+    def read(self):
+        if not os.path.exists(self.path):
+            return pd.DataFrame()
+        return pd.read_csv(self.path)
+
+    '''
+    Removes the journal file
+    '''
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,80 @@
+"""
+This module extracts the segment features of a long recording on several processes. The recording is split into chunks
+aligned to segment boundaries and filtered chunk by chunk in the calling process, carrying the filter state from one chunk
+to the next, into shared memory; every filtered chunk is handed at once to a worker that extracts its features, so the
+workers run while the rest of the recording is being filtered. The results are the same as filtering the recording at once.
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from signalProcessing.filters import BandpassFilter
+from signalProcessing.feature_engine import frame_segments, normalize_segments, compute_segment_features, FEATURE_BLOCK_SEGMENTS
+
+# Band of the bandpass filter applied to the recordings
+LOWCUT = 20
+HIGHCUT = 3000
+# Chunks per worker, so a slow chunk doesn't leave the other workers waiting at the end
+CHUNKS_PER_WORKER = 4
+
+"""
+Worker: returns the features of the segments of the samples [start, end) of the filtered recording in shared memory
+"""
+def _chunk_features(name, length, start, end, sample_rate, samples_per_segment):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        filtered = np.ndarray((length,), dtype=np.float64, buffer=shm.buf)
+        segments = normalize_segments(frame_segments(filtered[start:end], samples_per_segment))
+        features = compute_segment_features(segments, sample_rate)
+        # The views must be released before closing the shared memory
+        del filtered, segments
+    finally:
+        shm.close()
+    return features
+
+"""
+Returns the (start, end) samples of at most n_chunks chunks of whole segments, with a multiple of block segments each.
+Trailing samples that don't make a segment are left out, as in frame_segments.
+"""
+def chunk_bounds(n_samples, samples_per_segment, n_chunks, block=1):
+    n_segments = n_samples // samples_per_segment
+    if n_segments == 0:
+        return []
+    segments_per_chunk = -(-n_segments // max(1, n_chunks))
+    segments_per_chunk = -(-segments_per_chunk // block) * block
+    return [(first * samples_per_segment, min(first + segments_per_chunk, n_segments) * samples_per_segment)
+            for first in range(0, n_segments, segments_per_chunk)]
+
+"""
+Computes the features of every complete segment of a raw (not filtered) recording on a pool of processes.
+Returns the same touple of arrays (RMS, ZCR, Spectral centroid, Snore energy, dB level) as compute_segment_features
+on the filtered recording.
+"""
+def parallel_segment_features(audio, sample_rate, samples_per_segment, workers=None):
+    workers = workers or os.cpu_count() or 1
+    # numpy reductions may round differently for blocks of different size, so the chunks are made of the same blocks
+    # of segments that compute_segment_features uses on the whole recording
+    bounds = chunk_bounds(len(audio), samples_per_segment, workers * CHUNKS_PER_WORKER, FEATURE_BLOCK_SEGMENTS)
+    if not bounds:
+        return tuple(np.empty(0) for _ in range(5))
+
+    length = bounds[-1][1]
+    shm = shared_memory.SharedMemory(create=True, size=length * np.dtype(np.float64).itemsize)
+    filtered = np.ndarray((length,), dtype=np.float64, buffer=shm.buf)
+    bandpass = BandpassFilter(LOWCUT, HIGHCUT, sample_rate)
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(bounds)), mp_context=get_context("spawn")) as executor:
+            futures = []
+            for start, end in bounds:
+                # The filter runs in order here, so every chunk starts from the exact state left by the previous one
+                filtered[start:end] = bandpass.process(audio[start:end])
+                futures.append(executor.submit(_chunk_features, shm.name, length, start, end, sample_rate, samples_per_segment))
+            # Chunks are merged in recording order
+            results = [future.result() for future in futures]
+    finally:
+        del filtered
+        shm.close()
+        shm.unlink()
+
+    return tuple(np.concatenate([result[i] for result in results]) for i in range(5))
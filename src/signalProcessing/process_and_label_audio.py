@@ -7,15 +7,22 @@ import numpy as np
 import pandas as pd
 import os
 import json
-import joblib
-from scipy.signal import butter, lfilter
-from imageProcessing.ImageProcessingModule import predict_posture
+import threading
+import time
+from scipy.signal import butter
+from signalProcessing.filters import BandpassFilter
+from signalProcessing.feature_engine import frame_segments, normalize_segments, compute_segment_features
+from signalProcessing.parallel_features import parallel_segment_features
+from imageProcessing.ImageProcessingModule import predict_posture_tiered, POSE_LATENCY_BUDGET, NO_JOINTS
+from imageProcessing.poseWorkers import get_pose_workers
+from imageProcessing.landmarkStore import LandmarkStore, LANDMARKS_FILE
 from dataAcquisition.cameraInput import takePhoto, triggerEmergencyAlarm
-from dataAcquisition.microphoneInput import get_next_photo_number
-
-# Cargar modelos previamente entrenados
-apnea_model = joblib.load("data/models/apnea-prediction-model.pkl")
-treatment_model = joblib.load("data/models/treatment_required_model.pkl")
+from dataAcquisition.microphoneInput import get_next_photo_number, get_next_session_number
+from dataAcquisition.capturePolicy import CapturePolicy
+from utils.timeline_store import SessionTimeline
+from utils.session_store import SessionStore
+from reportGeneration.sessionSummary import materialize_summary
+from inferenceModels.modelRegistry import registry
 
 # Ruta del archivo CSV acumulativo 
 output_csv = "data/processed/processed_patient_data.csv"
@@ -39,8 +46,7 @@ def butter_bandpass(lowcut, highcut, fs, order=5):
 Apply bandpass filter to an audio signal. Returns fitered signal
 """
 def bandpass_filter(data, lowcut=20, highcut=3000, fs=16000, order=5):
-    b, a = butter_bandpass(lowcut, highcut, fs, order=order)
-    return lfilter(b, a, data)
+    return BandpassFilter(lowcut, highcut, fs, order).process(data)
 
 """
 Estimates noise level (RMS) of the first 5 seconds of the recording
@@ -99,23 +105,30 @@ def extract_features(segment, sample_rate):
     return rms, zcr_rescaled, spectral_centroid, snore_energy, decibel_level
 
 """
-Process audio in WAV format, extracts features, predicts apnea and treatment, and updates user's dataset
+Predicts apnea and treatment required for a batch of segments, calling each model only once.
+Returns a touple of arrays (Has_Apnea, Treatment_Required) with one value per segment.
 """
-def process_audio_and_update_dataset(wav_path, finished, sample_rate=16000, segment_duration=5):
-    
-    # load audio segment
-    print(f"[INFO] Loading audio from {wav_path}")
-    audio, sr = librosa.load(wav_path, sr=sample_rate)
-    # Segments per audio
-    samples_per_segment = segment_duration * sample_rate
-
-    audio = bandpass_filter(audio, lowcut=20, highcut=3000, fs=sample_rate)
-
-    noise_threshold = estimate_noise(audio, sample_rate)
-    print(f"[INFO] Estimated RMS noise threshold: {noise_threshold:.5f}")
-
-    all_rows = []
+def predict_segments(age, gender, bmi, nasal_airflow, snoring):
+    if len(nasal_airflow) == 0:
+        return np.array([], dtype=bool), np.array([], dtype=bool)
+
+    input_data = pd.DataFrame({
+        'Age': [age] * len(nasal_airflow),
+        'Gender': [gender] * len(nasal_airflow),
+        'BMI': [bmi] * len(nasal_airflow),
+        'Nasal_Airflow': nasal_airflow,
+        'Snoring': snoring
+    })
+
+    # Models are loaded on first use (compiled forests, memory-mapped)
+    apnea_predictions = np.array([bool(p) for p in registry.get("apnea").predict(input_data)], dtype=bool)
+    treatment_predictions = np.array([bool(p) for p in registry.get("treatment").predict(input_data)], dtype=bool)
+    return apnea_predictions, treatment_predictions
 
+"""
+Reads the patient's profile. Returns a touple (age, gender, BMI, session number) with the gender encoded for the models.
+"""
+def load_patient_profile():
     with open(json_path, "r") as file:
         data = json.load(file)
         patient_data = data["patient"]
@@ -126,90 +139,166 @@ def process_audio_and_update_dataset(wav_path, finished, sample_rate=16000, segm
     session = int(patient_data["recordedSessions"])
 
     gender = 1 if gender_str.lower() == "female" else 0 if gender_str.lower() == "male" else 2
+    return age, gender, bmi, session
+
+# Decides which breathing problems trigger a photo
+capture_policy = CapturePolicy()
+
+# Serializes the camera, the photo numbering and the in-process pose model between the segment workers
+capture_lock = threading.Lock()
+
+"""
+Takes a picture after a breathing problem is detected and predicts the sleeping position on it.
+The prediction runs on the pose worker processes when they are started, otherwise in this process.
+Triggers the emergency alarm and returns True in case of a bad position.
+"""
+def handle_breathing_event():
+    with capture_lock:
+        # call module to take a photo
+        print("[INFO]: Breathing problems detected. \nTaking a picture...")
+        img_dir = takePhoto()
+        if img_dir is None:
+            return False
+        captured_at = time.time()
+
+        # Get actual image index
+        imgIdx = get_next_photo_number() - 1 # minus 1 because the given is for the nex image
+
+    # call Image processing module/predict posture
+    pose_workers = get_pose_workers()
+    if pose_workers is not None:
+        result = pose_workers.submit_tiered(img_dir, POSE_LATENCY_BUDGET).result()
+    else:
+        with capture_lock:
+            result = predict_posture_tiered(img_dir, budget=POSE_LATENCY_BUDGET)
+    prediction = result["prediction"]
+    capture_policy.record_posture(prediction)
+    timings = ", ".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in result["timings"].items())
+    print(f"[INFO]: Posture answered by tier {result['tier']} (confidence {result['confidence']:.2f}): {timings}")
+
+    # Add the photo and its position to the session timeline (no position if nobody was found on it)
+    posture = None if prediction == NO_JOINTS else prediction
+    SessionTimeline(get_next_session_number()).append_posture(captured_at, posture, result["confidence"])
+
+    # Keep the landmarks, so the session can be classified again without MediaPipe
+    if result["landmarks"] is not None:
+        session_dir = os.path.dirname(os.path.dirname(img_dir))
+        LandmarkStore(os.path.join(session_dir, LANDMARKS_FILE)).append(captured_at, imgIdx, result["confidence"], prediction, result["landmarks"])
+
+    # Rename the taken image
+    renameImage(img_dir, prediction + "_" + str(imgIdx))
+
+    # in case it is a bad position
+    if prediction == "supine":
+        # call method to trigger emergency alarm
+        print("[INFO]: Bad position detected: ", prediction)
+        triggerEmergencyAlarm()
+        return True
+
+    print("[INFO]: No bad positions detected.\nThe prediction is: ", prediction)
+    return False
+
+"""
+Appends the rows of a finished session to the user's dataset (session store and CSV export) and saves the summary
+of the session used by the reports. Saving the same session again replaces its rows, so a session whose save failed
+after its rows were stored is never duplicated when it is recovered.
+"""
+def save_session_rows(rows):
+    store = SessionStore(csv_path=output_csv)
+    saved = store.append_session(rows, replace=True)
+    print(f"[INFO] Dataset Updated: {saved} rows saved, exported to {output_csv}")
+    if saved:
+        for session_id in pd.DataFrame(rows)["Sleep_Session"].unique():
+            materialize_summary(int(session_id), store)
+
+"""
+Process audio in WAV format, extracts features, predicts apnea and treatment, and updates user's dataset.
+With workers > 1 the features are extracted on that many processes (see parallel_features), with the same results.
+"""
+def process_audio_and_update_dataset(wav_path, finished, sample_rate=16000, segment_duration=5, workers=1):
+    
+    # load audio segment
+    print(f"[INFO] Loading audio from {wav_path}")
+    audio, sr = librosa.load(wav_path, sr=sample_rate)
+    # Segments per audio
+    samples_per_segment = segment_duration * sample_rate
+
+    if workers == 1:
+        audio = bandpass_filter(audio, lowcut=20, highcut=3000, fs=sample_rate)
+        noise_threshold = estimate_noise(audio, sample_rate)
+    else:
+        # The filter is causal: filtering only the beginning gives the same noise estimate
+        noise_threshold = estimate_noise(bandpass_filter(audio[:3 * sample_rate], lowcut=20, highcut=3000, fs=sample_rate), sample_rate)
+    print(f"[INFO] Estimated RMS noise threshold: {noise_threshold:.5f}")
+
+    all_rows = []
+
+    age, gender, bmi, session = load_patient_profile()
 
     print(f"[INFO] Processing audio in segments of {segment_duration} seconds...")
     positionList = []
+    # The file is processed much faster than it was recorded: the capture policy follows the time of the segments in
+    # the recording (from the moment the processing started, so it keeps increasing from one file to the next)
+    policy_clock = time.monotonic()
+
+    # Extract the features of every complete segment at once (filtered and extracted by chunks on several processes if workers > 1)
+    if workers == 1:
+        segments = normalize_segments(frame_segments(audio, samples_per_segment))
+        rms_values, zcr_values, centroid_values, energy_values, decibel_values = compute_segment_features(segments, sample_rate)
+    else:
+        rms_values, zcr_values, centroid_values, energy_values, decibel_values = parallel_segment_features(audio, sample_rate, samples_per_segment, workers)
+    segment_starts = range(0, len(rms_values) * samples_per_segment, samples_per_segment)
+    segment_features = []
+    for snoring_rms, zcr, spectral_centroid, snore_energy, decibel_level in zip(rms_values, zcr_values, centroid_values, energy_values, decibel_values):
+        nasal_airflow = rescale_zcr(zcr)
+        has_snoring = detect_snoring(snoring_rms, snore_energy, noise_threshold, decibel_level)
+        segment_features.append((snoring_rms, nasal_airflow, spectral_centroid, snore_energy, decibel_level, has_snoring))
+    print(f"[INFO] Extracted features of {len(segment_features)} segments")
+
+    # Prediction models for apnea episodes and treatment required (one call per model for the whole audio)
+    apnea_predictions, treatment_predictions = predict_segments(
+        age, gender, bmi,
+        [features[1] for features in segment_features],
+        [features[5] for features in segment_features]
+    )
 
     # Process user's (audio) data
-    for i in range(0, len(audio), samples_per_segment):
-        segment = audio[i:i + samples_per_segment]
-        if len(segment) == samples_per_segment:
-            segment = segment / np.max(np.abs(segment))
-
-            snoring_rms, nasal_airflow, spectral_centroid, snore_energy, decibel_level = extract_features(segment, sample_rate)
-            print(f"[DEBUG] Decibel level: {decibel_level:.2f} dB")
-            has_snoring = detect_snoring(snoring_rms, snore_energy, noise_threshold, decibel_level)
+    for i, features, has_apnea, needs_treatment in zip(segment_starts, segment_features, apnea_predictions, treatment_predictions):
+        snoring_rms, nasal_airflow, spectral_centroid, snore_energy, decibel_level, has_snoring = features
+        has_apnea = bool(has_apnea)
+        needs_treatment = bool(needs_treatment)
 
+        # Determination of sleeping position. In case snoring or apnea is detected, the capture policy decides whether to take a picture
+        if (not finished) and (has_snoring or has_apnea):
+            if capture_policy.observe(True, policy_clock + i / sample_rate) and handle_breathing_event():
+                positionList.append(True)
 
-            input_data = pd.DataFrame([{
+        # In case there is nothing to worry about, just add the data to the CSV
+        else:
+            if not finished:
+                capture_policy.observe(False, policy_clock + i / sample_rate)
+            row = {
+                'Sleep_Session': session,
+                'Start_Time': i // sample_rate,
+                'End_Time': (i + samples_per_segment) // sample_rate,
                 'Age': age,
                 'Gender': gender,
                 'BMI': bmi,
+                'Snoring_Intensity': snoring_rms,
+                'Snoring': has_snoring,
                 'Nasal_Airflow': nasal_airflow,
-                'Snoring': has_snoring
-            }])
-
-            # Prediction models for apnea episodes and treatment required
-            has_apnea = bool(apnea_model.predict(input_data)[0])
-            needs_treatment = bool(treatment_model.predict(input_data)[0])
-
-            # Determination of sleeping position. In case snoring or apnea is detected, call the module to take a picture
-            if (not finished) and (has_snoring or has_apnea):
-                # call module to take a photo
-                print("[INFO]: Breathing problems detected. \nTaking a picture...")
-                img_dir = takePhoto()
-                # call Image processing module/predict posture
-                prediction = predict_posture(img_dir)
-                
-                # Get actual image index
-                imgIdx = get_next_photo_number() - 1 # minus 1 because the given is for the nex image
-                
-                # Rename the taken image
-                renameImage(img_dir, prediction + "_" + str(imgIdx))
-
-                # in case it is a bad position
-                if prediction == "supine":
-                    # call method to trigger emergency alarm
-                    print("[INFO]: Bad position detected: ", prediction)
-                    positionList.append(True)
-                    triggerEmergencyAlarm()
-                else:
-                    print("[INFO]: No bad positions detected.\nThe prediction is: ", prediction)
-
-            # In case there is nothing to worry about, just add the data to the CSV
-            else:
-                row = {
-                    'Sleep_Session': session,
-                    'Start_Time': i // sample_rate,
-                    'End_Time': (i + samples_per_segment) // sample_rate,
-                    'Age': age,
-                    'Gender': gender,
-                    'BMI': bmi,
-                    'Snoring_Intensity': snoring_rms,
-                    'Snoring': has_snoring,
-                    'Nasal_Airflow': nasal_airflow,
-                    'Spectral_Centroid': spectral_centroid,
-                    'Snore_Energy': snore_energy,
-                    'Decibel_Level_dB': decibel_level,
-                    'Has_Apnea': has_apnea,
-                    'Treatment_Required': needs_treatment
-                }
-
-                all_rows.append(row)
+                'Spectral_Centroid': spectral_centroid,
+                'Snore_Energy': snore_energy,
+                'Decibel_Level_dB': decibel_level,
+                'Has_Apnea': has_apnea,
+                'Treatment_Required': needs_treatment
+            }
+
+            all_rows.append(row)
 
     # In case the session is finished, save the processed data 
     if finished:
-        df_new = pd.DataFrame(all_rows)
-
-        # Save new data
-        if os.path.exists(output_csv):
-            df_existing = pd.read_csv(output_csv)
-            df_updated = pd.concat([df_existing, df_new], ignore_index=True)
-        else:
-            df_updated = df_new
-
-        df_updated.to_csv(output_csv, index=False)
-        print(f"[INFO] Dataset Updated: {output_csv}")
+        save_session_rows(all_rows)
     
     # In case there is a bad position detected
     if len(positionList) > 0:
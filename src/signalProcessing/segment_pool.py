@@ -0,0 +1,133 @@
+"""
+This module runs the slow stages triggered by the live segments (photo, posture prediction, alarm) on a bounded pool of
+worker threads, so they never stall the acoustic analysis of the following segments. Results are delivered in submission order.
+"""
+
+import queue
+import threading
+import time
+
+'''
+Bounded pool of worker threads with ordered results, queue backpressure and lag metrics
+'''
+class SegmentWorkerPool:
+    # Pool configuration
+    def __init__(self, workers=2, max_pending=4, on_result=None):
+        self.on_result = on_result
+        self.tasks = queue.Queue(maxsize=max_pending)
+        self.lock = threading.Lock()
+        self.delivery_lock = threading.Lock()
+        self.next_sequence = 0
+        self.next_delivery = 0
+        self.ready = {}
+        self.stats = {
+            "submitted": 0,
+            "rejected": 0,
+            "cancelled": 0,
+            "completed": 0,
+            "failed": 0,
+            "max_queue_depth": 0,
+            "total_wait_s": 0.0,
+            "max_wait_s": 0.0,
+            "total_run_s": 0.0,
+            "max_run_s": 0.0
+        }
+        self.threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    '''
+    Queues fn(*args) for the given segment. Never blocks: returns False (and counts a rejection) when the queue is full.
+    '''
+    def submit(self, segment_index, fn, *args):
+        with self.lock:
+            task = (self.next_sequence, segment_index, fn, args, time.monotonic())
+            try:
+                self.tasks.put_nowait(task)
+            except queue.Full:
+                self.stats["rejected"] += 1
+                return False
+            self.next_sequence += 1
+            self.stats["submitted"] += 1
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self.tasks.qsize())
+        return True
+
+    '''
+    Stops the workers. Queued tasks are run first, unless cancel_pending is True.
+    '''
+    def shutdown(self, wait=True, cancel_pending=False):
+        if cancel_pending:
+            while True:
+                try:
+                    task = self.tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if task is not None:
+                    self._store(task[0], None)
+                    with self.lock:
+                        self.stats["cancelled"] += 1
+            self._deliver()
+        for _ in self.threads:
+            self.tasks.put(None)
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+    '''
+    Returns a copy of the pool statistics, with the current queue depth and mean wait and run times
+    '''
+    def metrics(self):
+        with self.lock:
+            metrics = dict(self.stats)
+        finished = metrics["completed"] + metrics["failed"]
+        metrics["queue_depth"] = self.tasks.qsize()
+        metrics["mean_wait_s"] = metrics["total_wait_s"] / finished if finished else 0.0
+        metrics["mean_run_s"] = metrics["total_run_s"] / finished if finished else 0.0
+        return metrics
+
+    '''
+    Worker thread: runs tasks until the end marker arrives
+    '''
+    def _work(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            sequence, segment_index, fn, args, submitted_at = task
+            started = time.monotonic()
+            try:
+                result, error = fn(*args), None
+            except Exception as e:
+                result, error = None, e
+            finished = time.monotonic()
+
+            with self.lock:
+                wait, run = started - submitted_at, finished - started
+                self.stats["failed" if error else "completed"] += 1
+                self.stats["total_wait_s"] += wait
+                self.stats["max_wait_s"] = max(self.stats["max_wait_s"], wait)
+                self.stats["total_run_s"] += run
+                self.stats["max_run_s"] = max(self.stats["max_run_s"], run)
+            self._store(sequence, (segment_index, result, error))
+            self._deliver()
+
+    '''
+    Keeps a finished (or cancelled, None) task until every earlier task was delivered
+    '''
+    def _store(self, sequence, outcome):
+        with self.lock:
+            self.ready[sequence] = outcome
+
+    '''
+    Calls on_result for every consecutive finished task, in submission order
+    '''
+    def _deliver(self):
+        with self.delivery_lock:
+            outcomes = []
+            with self.lock:
+                while self.next_delivery in self.ready:
+                    outcomes.append(self.ready.pop(self.next_delivery))
+                    self.next_delivery += 1
+            for outcome in outcomes:
+                if outcome is not None and self.on_result is not None:
+                    self.on_result(*outcome)
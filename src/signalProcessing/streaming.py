@@ -0,0 +1,149 @@
+"""
+This module analyzes the live recording in memory: audio chunks coming from the capture queue are resampled, filtered and
+split in segments, and every complete segment is labeled without writing or reading WAV files.
+"""
+
+import numpy as np
+import soxr
+from signalProcessing.filters import BandpassFilter
+from signalProcessing.feature_engine import normalize_segments, compute_segment_features, compute_fast_features, silence_mask
+from signalProcessing.process_and_label_audio import (estimate_noise, rescale_zcr, detect_snoring,
+                                                      predict_segments, load_patient_profile)
+
+'''
+Class that keeps the resampler, filter and noise state of a recording between chunks and emits one row per complete segment.
+By default every segment gets the same features as the offline processing. The silence gate (opt-in) lets segments whose
+RMS and peak stay near the noise floor skip the STFT: their spectral centroid is then an estimate, so the rows differ from
+the offline ones (the other features and the snoring label are exact); verify_gate computes the STFT anyway, keeps the
+full results and records the largest relative error of the estimated centroids.
+'''
+class StreamingSegmentAnalyzer:
+    # Analyzer configuration
+    def __init__(self, input_rate=44100, sample_rate=16000, segment_duration=5, noise_duration=3,
+                 lowcut=20, highcut=3000, patient_profile=None, silence_gate=False, verify_gate=False):
+        self.input_rate = input_rate
+        self.sample_rate = sample_rate
+        self.segment_duration = segment_duration
+        self.samples_per_segment = segment_duration * sample_rate
+        self.noise_samples = noise_duration * sample_rate
+
+        # Same resampling quality used by librosa.load (soxr_hq)
+        self.resampler = soxr.ResampleStream(input_rate, sample_rate, 1, dtype="float32", quality="HQ")
+
+        # Bandpass filter whose state is carried between chunks
+        self.filter = BandpassFilter(lowcut, highcut, sample_rate)
+
+        self.noise_threshold = None
+        self.pending = np.empty(0)
+        self.segment_index = 0
+
+        self.silence_gate = silence_gate
+        self.verify_gate = verify_gate
+        self.gate_stats = {"segments": 0, "gated": 0, "verified": 0, "max_centroid_error": 0.0}
+
+        self.age, self.gender, self.bmi, self.session = patient_profile or load_patient_profile()
+
+    '''
+    Adds a chunk of raw audio (input_rate, mono or (frames, 1)) and returns the rows of the segments completed by it
+    '''
+    def push(self, chunk):
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        return self._process(self.resampler.resample_chunk(chunk))
+
+    '''
+    Ends the stream and returns the rows of the remaining complete segments. Incomplete segments are discarded.
+    '''
+    def flush(self):
+        rows = self._process(self.resampler.resample_chunk(np.empty(0, dtype=np.float32), last=True))
+        if self.noise_threshold is None and len(self.pending) > 0:
+            self.noise_threshold = estimate_noise(self.pending, self.sample_rate)
+        return rows
+
+    '''
+    Filters the resampled samples and labels every segment that is complete
+    '''
+    def _process(self, resampled):
+        if len(resampled) > 0:
+            self.pending = np.concatenate((self.pending, self.filter.process(resampled)))
+
+        # Noise level is estimated once, from the beginning of the recording
+        if self.noise_threshold is None:
+            if len(self.pending) < self.noise_samples:
+                return []
+            self.noise_threshold = estimate_noise(self.pending, self.sample_rate)
+            print(f"[INFO] Estimated RMS noise threshold: {self.noise_threshold:.5f}")
+
+        n_segments = len(self.pending) // self.samples_per_segment
+        if n_segments == 0:
+            return []
+
+        segments = self.pending[:n_segments * self.samples_per_segment].reshape(n_segments, self.samples_per_segment)
+        self.pending = self.pending[n_segments * self.samples_per_segment:]
+        return self.label_segments(segments)
+
+    '''
+    Returns the fraction of segments that skipped the STFT
+    '''
+    def skip_rate(self):
+        return self.gate_stats["gated"] / self.gate_stats["segments"] if self.gate_stats["segments"] else 0.0
+
+    '''
+    Extracts features and predictions for complete segments and builds their dataset rows
+    '''
+    def label_segments(self, segments):
+        n_segments = len(segments)
+        normalized = normalize_segments(segments)
+        gated = silence_mask(segments, self.noise_threshold) if self.silence_gate else np.zeros(n_segments, dtype=bool)
+        full = ~gated | self.verify_gate
+        self.gate_stats["segments"] += n_segments
+        self.gate_stats["gated"] += int(np.count_nonzero(gated))
+
+        # Silent segments: features without the STFT
+        rms_values = np.empty(n_segments)
+        zcr_values = np.empty(n_segments)
+        centroid_values = np.empty(n_segments)
+        energy_values = np.empty(n_segments)
+        decibel_values = np.empty(n_segments)
+        (rms_values[gated], zcr_values[gated], centroid_values[gated],
+         energy_values[gated], decibel_values[gated]) = compute_fast_features(normalized[gated], self.sample_rate)
+        estimated_centroids = centroid_values[gated]
+
+        # Other segments (and all of them in verify mode): full feature extraction
+        if np.any(full):
+            (rms_values[full], zcr_values[full], centroid_values[full],
+             energy_values[full], decibel_values[full]) = compute_segment_features(normalized[full], self.sample_rate)
+            if self.verify_gate and np.any(gated):
+                # Compare the estimated centroids with the full results, then keep the full results
+                self.gate_stats["verified"] += int(np.count_nonzero(gated))
+                error = np.abs(estimated_centroids - centroid_values[gated]) / np.maximum(centroid_values[gated], 1e-6)
+                self.gate_stats["max_centroid_error"] = max(self.gate_stats["max_centroid_error"], float(np.max(error)))
+
+        # Snoring uses the exact features, so the gate never changes it
+        has_snoring = [bool(detect_snoring(rms, energy, self.noise_threshold, decibel))
+                       for rms, energy, decibel in zip(rms_values, energy_values, decibel_values)]
+
+        # The models run for every segment: apnea (no breathing) is usually silent
+        nasal_airflow = [rescale_zcr(zcr) for zcr in zcr_values]
+        apnea_predictions, treatment_predictions = predict_segments(self.age, self.gender, self.bmi, nasal_airflow, has_snoring)
+
+        rows = []
+        for idx in range(len(segments)):
+            start = self.segment_index * self.segment_duration
+            rows.append({
+                'Sleep_Session': self.session,
+                'Start_Time': start,
+                'End_Time': start + self.segment_duration,
+                'Age': self.age,
+                'Gender': self.gender,
+                'BMI': self.bmi,
+                'Snoring_Intensity': rms_values[idx],
+                'Snoring': has_snoring[idx],
+                'Nasal_Airflow': nasal_airflow[idx],
+                'Spectral_Centroid': centroid_values[idx],
+                'Snore_Energy': energy_values[idx],
+                'Decibel_Level_dB': decibel_values[idx],
+                'Has_Apnea': bool(apnea_predictions[idx]),
+                'Treatment_Required': bool(treatment_predictions[idx])
+            })
+            self.segment_index += 1
+        return rows
@@ -1,7 +1,6 @@
 import customtkinter as ctk
 import tkinter as tk
 import tkinter.messagebox as messagebox
-import pandas as pd
 import json
 import os
 import wave
@@ -10,15 +9,26 @@ import simpleaudio as sa
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from reportGeneration.reportGenerator import generate_report, generate_full_report
-from dataAcquisition.cameraInput import getPhotoDatetime, getFileNames
+from reportGeneration.reportFragments import remove_fragment
+from utils.timeline_store import SessionTimeline, session_positions, session_photo_count
+from utils.session_store import SessionStore
 import numpy as np
 import shutil
 
-# Paths to JSON, CSV, and audio data
+# Paths to JSON and audio data (the sessions are read from the session store)
 JSON_PATH = "data/patientData/patient_data.json"
-CSV_PATH = "data/processed/processed_patient_data.csv"
 AUDIO_FOLDER = "data/raw"
 
+"""
+Remove the raw folder (audio and images), the timeline and the report fragment of a deleted session. Called by the session store compaction.
+"""
+def remove_session_files(session_id):
+    session_folder = os.path.join(AUDIO_FOLDER, f"Session{session_id}")
+    if os.path.exists(session_folder):
+        shutil.rmtree(session_folder)
+    SessionTimeline(session_id).clear()
+    remove_fragment(session_id)
+
 """
 Window frame to visualize patient data and sleep history.
 """
@@ -82,6 +92,9 @@ class DataVisualization(ctk.CTkFrame):
         self.load_patient_info()    # Load patient info section
         self.load_sleep_sessions()  # Load sleep sessions section
 
+        # Reclaim the sessions deleted in a previous run that weren't compacted yet
+        SessionStore().compact_in_background(remove_session_files)
+
     """
     Update scroll region when frame size changes.
     """
@@ -157,16 +170,12 @@ class DataVisualization(ctk.CTkFrame):
         generate_report_button.pack(pady=(10, 5))
 
     """
-    Load and display all sleep session data from CSV.
+    Load and display all sleep sessions from the session store.
     """
     def load_sleep_sessions(self):
-        if not os.path.exists(CSV_PATH):
-            return
-        
-        df = pd.read_csv(CSV_PATH)
-        df["Session"] = df.groupby((df['Start_Time'] == 0).cumsum()).ngroup() + 1
+        store = SessionStore()
 
-        for session_id, session_df in df.groupby("Session"):
+        for session_id in store.session_ids():
             # Create session frame
             session_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="#2C2C3E", corner_radius=15)
             session_frame.pack(fill="x", padx=20, pady=15)
@@ -184,8 +193,10 @@ class DataVisualization(ctk.CTkFrame):
             )
             session_title.pack(side="left")
 
-            # Count session's images
-            image_count = self.count_session_images(session_id)
+            # Sleeping positions detected on the session's images
+            imagesPath = os.path.join(AUDIO_FOLDER, f"Session{session_id}", "Images")
+            positions = session_positions(session_id, imagesPath)
+            image_count = session_photo_count(session_id, imagesPath)
 
             image_count_label = ctk.CTkLabel(
                 header_frame,
@@ -236,8 +247,8 @@ class DataVisualization(ctk.CTkFrame):
             )
             see_images_button.pack(side="right", padx=10)
 
-            # Apnea events table or 'No events' label
-            apnea_events = session_df[session_df['Has_Apnea'] == True]
+            # Apnea events table or 'No events' label (only the apnea rows of the session are read)
+            apnea_events = store.read(session_id, apnea_only=True)
 
             if not apnea_events.empty:
                 # Apnea events found
@@ -286,11 +297,7 @@ class DataVisualization(ctk.CTkFrame):
                 )
                 no_apnea_label.pack(pady=(10, 5))
             
-            # Get the taken images
-            imagesPath = os.path.join(AUDIO_FOLDER, f"Session{session_id}", "Images")
-            imagesNameList = getFileNames(imagesPath)
-            
-            if len(imagesNameList) > 0: # show the list of detected positions with date and time according to the taken images
+            if len(positions) > 0: # show the list of detected positions with date and time according to the taken images
                 # Title
                 title_label = ctk.CTkLabel(
                     session_frame,
@@ -316,14 +323,9 @@ class DataVisualization(ctk.CTkFrame):
                     header_label = ctk.CTkLabel(table_frame, text=header, font=header_font, text_color="white")
                     header_label.grid(row=0, column=i, padx=10, pady=6)
 
-                # Table rows: iterate through images
-                for row_idx, image_name in enumerate(imagesNameList, start=1):
-                    image_path = os.path.join(imagesPath, image_name)
-
-                    # Get date and time for the picture
-                    dt = getPhotoDatetime(image_path)
-                    name_only, ext = os.path.splitext(image_name)
-                    values = [dt, name_only]
+                # Table rows: iterate through the timeline positions
+                for row_idx, (dt, position) in enumerate(positions, start=1):
+                    values = [dt, position]
 
                     for col_idx, value in enumerate(values):
                         value_label = ctk.CTkLabel(table_frame, text=value, font=cell_font, text_color="white")
@@ -404,16 +406,6 @@ class DataVisualization(ctk.CTkFrame):
                 )
                 play_button_2.pack(side="left", padx=5)
 
-    """
-    Counts how many images (JPG and PNG) in the folder.
-    """
-    def count_session_images(self, session_id):
-        session_dir = os.path.join(AUDIO_FOLDER, f"Session{session_id}","Images")
-        if not os.path.exists(session_dir):
-            return 0
-        return len([f for f in os.listdir(session_dir) if f.lower().endswith((".jpg", ".png"))])
-
-
     """
     Opens the folder for the captured images.
     """
@@ -490,7 +482,8 @@ class DataVisualization(ctk.CTkFrame):
             self.after(100, self._check_audio_finished)
 
     """
-    Delete session data and audio files.
+    Delete a session. The session is only marked as deleted, so it disappears at once; its rows, audio files and
+    the CSV export are cleaned up in the background.
     """
     def delete_session(self, session_id):
         confirm = messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete Session {session_id}?")
@@ -498,17 +491,9 @@ class DataVisualization(ctk.CTkFrame):
             return
 
         try:
-            # Remove session from CSV
-            df = pd.read_csv(CSV_PATH)
-            df["Session"] = df.groupby((df['Start_Time'] == 0).cumsum()).ngroup() + 1
-            df = df[df["Session"] != session_id]
-            df.drop(columns=["Session"], inplace=True)
-            df.to_csv(CSV_PATH, index=False)
-
-            # Remove session audio folder
-            session_audio_folder = os.path.join(AUDIO_FOLDER, f"Session{session_id}")
-            if os.path.exists(session_audio_folder):
-                shutil.rmtree(session_audio_folder)
+            store = SessionStore()
+            store.delete_session(session_id)
+            store.compact_in_background(remove_session_files)
 
             messagebox.showinfo("Deleted", f"Session {session_id} has been deleted.")
             self.on_show()
@@ -1,8 +1,6 @@
 import os
-import queue
 import threading
 import customtkinter as ctk
-import soundfile as sf
 import time
 import sounddevice as sd
 import traceback
@@ -10,13 +8,25 @@ import numpy as np
 import pygame
 from tkinter import messagebox
 from dataAcquisition.microphoneInput import get_next_session_number, increment_session_number, reset_photo_number
+from dataAcquisition.streamRecorder import StreamRecorder
+from dataAcquisition.ringBuffer import AudioRingBuffer
+from dataAcquisition.cameraService import start_camera_service, stop_camera_service
+from imageProcessing.poseWorkers import start_pose_workers, stop_pose_workers
+from imageProcessing.postureTracker import ContinuousPostureTracker
 from utils.custom_messagebox import CustomMessageBox
 from utils.custom_selectionbox import CustomTwoButtonMessageBox
-from signalProcessing.process_and_label_audio import process_audio_and_update_dataset
+from signalProcessing.process_and_label_audio import save_session_rows, handle_breathing_event, capture_policy
+from signalProcessing.streaming import StreamingSegmentAnalyzer
+from signalProcessing.journal import SegmentJournal, JOURNAL_FILE
+from signalProcessing.segment_pool import SegmentWorkerPool
+from utils.timeline_store import SessionTimeline
+from inferenceModels.modelRegistry import registry
 
 # Paths for patient data and alarm sounds directory
 DB_PATH = "data/patientData/patient_data.json"
 ALARM_SOUNDS_DIR = "assets/alarm_sounds"
+# Time to wait for the live analysis of the last segments when a session is saved
+FINALIZE_TIMEOUT_S = 60
 
 '''
 This method gets the color for the sound bar depending on the input's volume level
@@ -40,13 +50,25 @@ class RecordingScreen(ctk.CTkFrame):
         self.start_time = None
         self.stream = None
         self.volume_level = 0.0
-        self.audio_data = []
+        self.recorder = None
         self.sample_rate = 44100
         self.alarm_set = False
         self.segment_duration = 10  # segundos
         self.segment_samples = self.segment_duration * self.sample_rate
-        self.segment_buffer = []
         self.segment_index = 0
+        self.ring = None
+        self.processor_thread = None
+        self.processor_stop = None
+        self.processor_reader = None
+        self.analyzer = None
+        self.journal = None
+        self.timeline = None
+        self.posture_tracker = None
+        self.tracking_fps = 1.0     # frames per second analyzed by the continuous posture tracking
+        self.event_pool = None
+        self.analysis_lag = 0.0      # seconds of captured audio waiting behind the segment being analyzed
+        self.max_analysis_lag = 0.0
+        self.analysis_overruns = 0   # segments overwritten in the ring buffer while they were being analyzed
 
         # Set dark theme
         self.configure(fg_color="#1e1e2f")
@@ -175,6 +197,18 @@ class RecordingScreen(ctk.CTkFrame):
         )
         self.sound_selector.pack(side="left", padx=5)
 
+        # Continuous posture tracking option
+        self.tracking_var = ctk.BooleanVar(value=False)
+        self.tracking_checkbox = ctk.CTkCheckBox(
+            self.alarm_frame,
+            text="Track posture",
+            variable=self.tracking_var,
+            text_color="white",
+            fg_color="#7b4fff",
+            hover_color="#a175ff"
+        )
+        self.tracking_checkbox.pack(side="left", padx=5)
+
         # Record and cancel buttons
         self.button_frame = ctk.CTkFrame(self, fg_color="transparent")
         self.button_frame.grid(row=7, column=0, pady=(10, 40))
@@ -209,13 +243,6 @@ class RecordingScreen(ctk.CTkFrame):
         )
         self.cancel_button.pack(side="left", padx=10)
 
-        # queue to save audio chunks 
-        self.q = queue.Queue()
-        self.segment_samples = self.sample_rate * 10
-        self.segment_index = 0
-        self.processor_thread = threading.Thread(target=self.segment_processor, daemon=True)
-        self.processor_thread.start()
-
     '''
     Get all available input devices
     '''
@@ -259,7 +286,49 @@ class RecordingScreen(ctk.CTkFrame):
     Modify labels and call recording methods
     '''
     def start_recording(self):
-        self.audio_data = []
+        # The microphone is opened first: if it can't be, no session service has been started yet
+        stream = self.open_audio_stream()
+        if stream is None:
+            return
+        self.recover_unsaved_session()
+        session_dir = os.path.join("data", "raw", f"Session{get_next_session_number()}")
+        os.makedirs(session_dir, exist_ok=True)
+        self.journal = SegmentJournal(os.path.join(session_dir, JOURNAL_FILE))
+        self.timeline = SessionTimeline(get_next_session_number())
+        self.timeline.clear()
+        self.analyzer = StreamingSegmentAnalyzer(input_rate=self.sample_rate)
+        # the audio models load in the background, they are first needed when the first segment is complete
+        registry.warm_up(("apnea", "treatment"))
+        # keep the camera open and warm during the session, photos are taken from its latest frame
+        camera = start_camera_service()
+        if camera is None:
+            print("[INFO]: Camera service not available, photos will open the camera on demand")
+        elif self.tracking_var.get():
+            # follow the position all night, written to the timeline as intervals
+            self.posture_tracker = ContinuousPostureTracker(camera, self.timeline, fps=self.tracking_fps)
+            self.posture_tracker.start()
+        # the sleeping position is predicted in a separate process, its models load while the session starts
+        start_pose_workers()
+        # photos are throttled by the capture policy; with continuous tracking, no photo while the posture doesn't change
+        capture_policy.reset()
+        if self.posture_tracker is not None:
+            capture_policy.posture_source = lambda: self.posture_tracker.label if self.posture_tracker else None
+        # photo, posture and alarm run on the pool so they never hold back the analysis of the next segments
+        self.event_pool = SegmentWorkerPool(workers=2, max_pending=4, on_result=self.on_breathing_event_result)
+        self.analysis_lag = 0.0
+        self.max_analysis_lag = 0.0
+        self.analysis_overruns = 0
+
+        # ring buffer for the captured audio (60 s), read by the recorder and by the segment processor
+        self.ring = AudioRingBuffer(self.segment_samples * 6)
+        self.recorder = StreamRecorder(os.path.join(session_dir, "audio.wav"), self.sample_rate)
+        self.recorder.start(reader=self.ring.reader())
+        self.segment_index = 0
+        # set when the session ends before the processor finished, so it leaves the rest of the audio unanalyzed
+        self.processor_stop = threading.Event()
+        self.processor_reader = self.ring.reader()
+        self.processor_thread = threading.Thread(target=self.segment_processor, args=(self.processor_reader, self.processor_stop), daemon=True)
+        self.processor_thread.start()
         self.recording = True
         self.timer_running = True
         self.start_time = time.time()
@@ -268,10 +337,34 @@ class RecordingScreen(ctk.CTkFrame):
         self.record_button.configure(text="Stop", fg_color="red", hover_color="#990000")
         self.title_label.configure(text="Recording Session...")
         self.update_timer()
-        self.start_audio_stream()
+        try:
+            self.stream = stream
+            self.stream.start()
+        except Exception as e:
+            CustomMessageBox(self, title="Error", message=f"Could not start the microphone:\n{e}")
+            self.cancel_recording()
+            return
         self.update_audio_level_ui()
         self.check_alarm()
 
+    '''
+    A journal left in the folder of the next session belongs to a session that was not saved (failed save or crash):
+    its rows are saved now, or kept on disk, and that session number is not used again
+    '''
+    def recover_unsaved_session(self):
+        session_number = get_next_session_number()
+        journal = SegmentJournal(os.path.join("data", "raw", f"Session{session_number}", JOURNAL_FILE))
+        rows = journal.read()
+        if rows.empty:
+            return
+        try:
+            save_session_rows(rows)
+            journal.clear()
+            print(f"[INFO] Saved {len(rows)} rows of the unsaved session {session_number}")
+        except Exception as e:
+            print(f"[ERROR] Could not save the unsaved session {session_number}, its journal is kept in {journal.path}: {e}")
+        increment_session_number()
+
     '''
     Know what input device to use
     '''
@@ -290,55 +383,131 @@ class RecordingScreen(ctk.CTkFrame):
             print(status)
         volume = np.linalg.norm(indata) / np.sqrt(len(indata))
         self.volume_level = min(volume * 5, 1.0)
-        self.audio_data.append(indata.copy())
 
-        # 🚀 En lugar de procesar aquí, mandamos el chunk a la cola
-        self.q.put(indata.copy())
+        # 🚀 En lugar de procesar aquí, copiamos el bloque al ring buffer
+        self.ring.write(indata)
 
-    def segment_processor(self):
-            """Corre en un hilo aparte: arma segmentos de 10s y los procesa"""
-            buffer = []
+    def segment_processor(self, reader, stopped):
+            """Corre en un hilo aparte: lee segmentos de 10s del ring buffer y los procesa"""
             while True:
-                chunk = self.q.get()  # Espera un bloque
-                buffer.append(chunk)
-                total_samples = sum(c.shape[0] for c in buffer)
-
-                if total_samples >= self.segment_samples:
-                    self.segment_index += 1
-                    segment_np = np.concatenate(buffer, axis=0)[:self.segment_samples]
-
-                    # Guardar archivo
-                    session_num = get_next_session_number()
-                    session_dir = os.path.join("data", "raw", f"Session{session_num}")
-                    os.makedirs(session_dir, exist_ok=True)
-                    file_path = os.path.join(session_dir, f"segment_{self.segment_index}.wav")
-                    sf.write(file_path, segment_np, self.sample_rate)
-                    print(f"[INFO] Segment {self.segment_index} saved in: {file_path}")
-
-                    # Procesar archivo
-                    try:
-                        result = process_audio_and_update_dataset(file_path, False)
-                        if result:
-                            print("[INFO]: Bad position detected, please get another one!")
-                            self.triggerEmergencyAlarm()
-                        print(f"[INFO] Processed segment: {self.segment_index}")
-                    except Exception as e:
-                        print(f"[ERROR] Failed processing segment {self.segment_index}: {e}")
-
-                    # Reiniciar buffer con muestras sobrantes
-                    remaining = np.concatenate(buffer, axis=0)[self.segment_samples:]
-                    buffer = [remaining] if remaining.size > 0 else []
-
-    '''
-    Start recordin audio
-    '''
-    def start_audio_stream(self):
+                if stopped.is_set():
+                    return
+                segment_np = reader.peek(self.segment_samples, timeout=0.5)  # Espera un segmento completo
+                if segment_np is None:
+                    if reader.ring.closed:
+                        break
+                    continue
+
+                self.segment_index += 1
+                self.analysis_lag = (reader.available() - self.segment_samples) / self.sample_rate
+                self.max_analysis_lag = max(self.max_analysis_lag, self.analysis_lag)
+                # Procesar segmento en memoria
+                try:
+                    self.analyze_segment(segment_np)
+                    print(f"[INFO] Processed segment: {self.segment_index} (lag {self.analysis_lag:.1f} s)")
+                except Exception as e:
+                    print(f"[ERROR] Failed processing segment {self.segment_index}: {e}")
+                if reader.overrun():
+                    self.on_analysis_overrun()
+                reader.advance(self.segment_samples)
+
+            # Fin de la sesión: procesar las muestras que quedan en el buffer
+            if stopped.is_set():
+                return
+            self.finish_segments(reader.peek(reader.available()))
+
+    '''
+    Called by the segment processor when the analysis fell so far behind that the audio of a segment was overwritten
+    in the ring buffer while it was being analyzed: the rows of that segment were not computed from its audio
+    '''
+    def on_analysis_overrun(self):
+        self.analysis_overruns += 1
+        print(f"[WARN] Segment {self.segment_index}: the audio was overwritten before its analysis finished "
+              f"(lag {self.analysis_lag:.1f} s)")
+        if self.analysis_overruns == 1:
+            self.after(0, lambda: self.title_label.configure(text="Recording Session... (analysis falling behind)"))
+
+    '''
+    Sends a live segment to the streaming analyzer and reacts to the breathing problems found in it
+    '''
+    def analyze_segment(self, segment_np):
+        analyzer = self.analyzer
+        if analyzer is None:
+            return
+        rows = analyzer.push(segment_np)
+        if analyzer is not self.analyzer:
+            # the session was closed while this segment was being analyzed
+            return
+        self.journal.append(rows)
+        self.timeline.append_segments(rows, self.start_time)
+        pool = self.event_pool
+        for row in rows:
+            if capture_policy.observe(row['Snoring'] or row['Has_Apnea']) and pool is not None:
+                if not pool.submit(self.segment_index, handle_breathing_event):
+                    capture_policy.cancel_capture("busy")
+                    print(f"[WARN] Segment {self.segment_index}: breathing event skipped, the capture workers are busy")
+
+    '''
+    Called by the worker pool, in segment order, when a breathing event was handled
+    '''
+    def on_breathing_event_result(self, segment_index, bad_position, error):
+        if error is not None:
+            print(f"[ERROR] Failed handling the breathing event of segment {segment_index}: {error}")
+        elif bad_position:
+            print("[INFO]: Bad position detected, please get another one!")
+            self.after(0, self.triggerEmergencyAlarm)
+
+    '''
+    Stops the continuous posture tracking, if it was running
+    '''
+    def stop_posture_tracker(self):
+        if self.posture_tracker is not None:
+            self.posture_tracker.stop()
+            self.posture_tracker = None
+
+    '''
+    Stops the worker pool of the session and reports how far behind it fell
+    '''
+    def stop_event_pool(self, wait=True):
+        if self.event_pool is None:
+            return
+        self.event_pool.shutdown(wait=wait, cancel_pending=True)
+        metrics = self.event_pool.metrics()
+        print(f"[INFO] Breathing events: {metrics['completed']} handled, {metrics['failed']} failed, "
+              f"{metrics['rejected']} skipped, {metrics['cancelled']} cancelled; "
+              f"max queue {metrics['max_queue_depth']}, max wait {metrics['max_wait_s']:.1f} s, "
+              f"mean run {metrics['mean_run_s']:.1f} s; max analysis lag {self.max_analysis_lag:.1f} s")
+        policy = capture_policy.stats()
+        print(f"[INFO] Captures: {policy['executed']} taken, suppressed {policy['suppressed']}")
+        self.event_pool = None
+
+    '''
+    Analyzes the audio not yet processed when the session ends and journals its rows
+    '''
+    def finish_segments(self, tail):
+        try:
+            analyzer = self.analyzer
+            if analyzer is not None:
+                rows = analyzer.push(tail) if tail is not None and len(tail) > 0 else []
+                rows += analyzer.flush()
+                self.journal.append(rows)
+                self.timeline.append_segments(rows, self.start_time)
+        except Exception as e:
+            print(f"[ERROR] Failed processing the last segments: {e}")
+
+    '''
+    Opens the audio stream of the selected microphone, not started yet. Returns None (and tells the user) if it can't be opened.
+    '''
+    def open_audio_stream(self):
         mic_index = self.get_selected_device_index()
         if mic_index is None:
             CustomMessageBox(self, title="Error", message="Invalid microphone selected.")
-            return
-        self.stream = sd.InputStream(callback=self.audio_callback, channels=1, samplerate=44100, device=mic_index)
-        self.stream.start()
+            return None
+        try:
+            return sd.InputStream(callback=self.audio_callback, channels=1, samplerate=44100, device=mic_index)
+        except Exception as e:
+            CustomMessageBox(self, title="Error", message=f"Could not open the microphone:\n{e}")
+            return None
 
     '''
     Update audio's volume level 
@@ -408,62 +577,86 @@ class RecordingScreen(ctk.CTkFrame):
 
             self.audio_level.set(0)
 
-            if self.get_selected_device_index() is not None:
-                self.after(100, self.save_buffered_audio)
-            else:
-                CustomMessageBox(self, title="Error", message="Invalid microphone selected.")
-                self.parent.show_frame("StartScreen")
+            # The session services are always stopped by finalize_session, whatever the selected microphone is now
+            self.after(100, self.save_buffered_audio)
 
     '''
-    Save the recorded audio
+    Save the recorded session. The session is closed and saved on a worker thread so the window keeps responding;
+    the result is shown back on the Tk thread.
     '''
     def save_buffered_audio(self):
-        # record the actual session
-        try:
-            audio_np = np.concatenate(self.audio_data, axis=0)
-            session_num = get_next_session_number()
-            session_dir = os.path.join("data", "raw", f"Session{session_num}")
-            os.makedirs(session_dir, exist_ok=True)
+        threading.Thread(target=self.finalize_session, daemon=True).start()
 
-            file_path = os.path.join(session_dir, "audio.wav")
-            sf.write(file_path, audio_np, self.sample_rate)
-
-            if not os.path.isfile(file_path):
-                raise FileNotFoundError(f"Archivo de audio no encontrado: {file_path}")
+    '''
+    Ends the session (worker thread): waits for the live analysis, stops the session services and saves the journaled
+    rows. If the analysis doesn't finish in time, the rows journaled so far are saved.
+    '''
+    def finalize_session(self):
+        warnings = []
+        try:
+            start = time.time()
+            try:
+                # End of the captured audio: the recorder and the segment processor drain what is left in the ring buffer
+                self.ring.close()
+
+                # The audio was written to disk during the session, just close the file
+                self.recorder.stop()
+                if not os.path.isfile(self.recorder.path):
+                    warnings.append(f"Archivo de audio no encontrado: {self.recorder.path}")
+
+                # Only the audio not yet analyzed by the live processing is left, then the session is saved from the journal
+                self.processor_thread.join(timeout=FINALIZE_TIMEOUT_S)
+                if self.processor_thread.is_alive():
+                    # No more rows are journaled; the segments not analyzed yet are left out of the session
+                    self.processor_stop.set()
+                    self.analyzer = None
+                    warnings.append("The live analysis did not finish in time, the last segments were not saved.")
+                if self.analysis_overruns or self.processor_reader.lost_frames:
+                    warnings.append(f"The analysis fell behind the recording: {self.analysis_overruns} segments were overwritten "
+                                    f"and {self.processor_reader.lost_frames / self.sample_rate:.0f} s of audio were not analyzed.")
+            finally:
+                self.stop_event_pool()
+                self.stop_posture_tracker()
+                stop_camera_service()
+                stop_pose_workers()
 
             processed_dir = os.path.join("data", "processed")
             os.makedirs(processed_dir, exist_ok=True)
-
-            start = time.time()
-            process_audio_and_update_dataset(file_path, True) # wav_path=file_path??
+            analyzer = self.analyzer
+            save_session_rows(self.journal.read())
+            # Saved: the journal is not needed anymore (a journal left behind is recovered by the next session)
+            self.journal.clear()
+            increment_session_number()
+            if analyzer is not None and analyzer.silence_gate:
+                print(f"[INFO] Silence gate: {analyzer.skip_rate():.0%} of the segments skipped the STFT {analyzer.gate_stats}")
+            registry.report()
+            self.analyzer = None
 
             # reset photo index to 1 for next session
             reset_photo_number()
 
-            # Delete audio segments
-            for f in os.listdir(session_dir):
-                if f.startswith("segment_") and f.endswith(".wav"):
-                    try:
-                        os.remove(os.path.join(session_dir, f))
-                        print(f"[INFO] Deleted temporal segment: {f}")
-                    except Exception as e:
-                        print(f"[WARN] Couldn't delete temporal segment {f}: {e}")
-
-
             end = time.time()
             print(f"Audio processing time: {end - start:.4f} seconds")
-            increment_session_number()
-            CustomMessageBox(self, title="Session Saved", message="This session has been saved.", on_ok=self.stop_alarm)
-        # In case there's an error saving the actual session
+            self.after(0, self.on_session_saved, None, warnings)
+        # In case there's an error saving the actual session (its journal stays on disk)
         except Exception as e:
             error_trace = traceback.format_exc()
-            CustomMessageBox(self, title="Error", message=f"Error saving session:\n{e}\n\nTraceback:\n{error_trace}")
             print(str(e) + "\n" + error_trace)
+            self.after(0, self.on_session_saved, f"Error saving session:\n{e}\n\nTraceback:\n{error_trace}", warnings)
+
+    '''
+    Shows the result of saving the session (Tk thread) and goes back to the main screen
+    '''
+    def on_session_saved(self, error, warnings):
+        if error is not None:
+            CustomMessageBox(self, title="Error", message=error)
+        else:
+            message = "\n".join(["This session has been saved."] + warnings)
+            CustomMessageBox(self, title="Session Saved", message=message, on_ok=self.stop_alarm)
         # End recording process and show main screen
-        finally:
-            self.record_button.configure(state="normal")
-            self.cancel_button.configure(state="normal")
-            self.parent.show_frame("StartScreen")
+        self.record_button.configure(state="normal")
+        self.cancel_button.configure(state="normal")
+        self.parent.show_frame("StartScreen")
 
     '''
     Confirm to end the reccording session
@@ -481,7 +674,8 @@ class RecordingScreen(ctk.CTkFrame):
         print("Action Canceled")
 
     '''
-    Cancel all recording session
+    Cancel all recording session. The session is discarded on a worker thread so the window keeps responding while the
+    analysis and the breathing events finish; the main screen is shown back on the Tk thread.
     '''
     def cancel_recording(self):
         self.recording = False
@@ -490,7 +684,51 @@ class RecordingScreen(ctk.CTkFrame):
             self.stream.stop()
             self.stream.close()
             self.stream = None
+        self.analyzer = None
         self.audio_level.set(0)
+        self.record_button.configure(state="disabled")
+        self.cancel_button.configure(state="disabled")
+        self.title_label.configure(text="Cancelling Session...")
+        threading.Thread(target=self.discard_session, daemon=True).start()
+
+    '''
+    Discards the cancelled session (worker thread): everything that writes to the journal or the timeline is stopped
+    and joined before they are removed, then the audio and rows written for the session are deleted.
+    '''
+    def discard_session(self):
+        try:
+            if self.ring:
+                self.ring.close()
+            if self.processor_stop is not None:
+                self.processor_stop.set()
+            if self.processor_thread is not None:
+                self.processor_thread.join(timeout=FINALIZE_TIMEOUT_S)
+                if self.processor_thread.is_alive():
+                    print("[WARN] The live analysis did not stop in time, the cancelled session may leave rows behind")
+                self.processor_thread = None
+            self.stop_event_pool(wait=True)
+            self.stop_posture_tracker()
+            stop_camera_service()
+            stop_pose_workers(wait=False)
+            if self.recorder:
+                self.recorder.stop()
+                if os.path.exists(self.recorder.path):
+                    os.remove(self.recorder.path)
+                self.recorder = None
+            if self.journal:
+                self.journal.clear()
+            if self.timeline:
+                self.timeline.clear()
+        except Exception as e:
+            print(f"[ERROR] Could not discard the cancelled session: {e}")
+        self.after(0, self.on_session_cancelled)
+
+    '''
+    Goes back to the main screen once the cancelled session is discarded (Tk thread)
+    '''
+    def on_session_cancelled(self):
+        self.record_button.configure(state="normal")
+        self.cancel_button.configure(state="normal")
         self.parent.show_frame("StartScreen")
 
     '''
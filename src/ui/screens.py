@@ -0,0 +1,45 @@
+"""
+This module lists the screens of the application and imports them on demand, so the heavy libraries of the recording
+and visualization screens (librosa, mediapipe, matplotlib...) don't delay the first window.
+"""
+import threading
+from utils.import_report import timed_import
+
+# Screens by name: (module in this package, class). They are imported the first time they are shown.
+SCREENS = {
+    "StartScreen": ("start_screen", "StartScreen"),
+    "ProfileForm": ("profile_form", "ProfileForm"),
+    "RecordingScreen": ("recording_screen", "RecordingScreen"),
+    "DataVisualization": ("data_visualization", "DataVisualization"),
+    "TermsAndConditionsScreen": ("terms_screen", "TermsAndConditionsScreen")
+}
+
+# Screens imported in the background once the first window is shown, and the time before they are
+PRELOADED_SCREENS = ("RecordingScreen", "DataVisualization")
+PRELOAD_DELAY_MS = 1500
+
+'''
+Returns the class of a screen, importing its module the first time
+'''
+def load_screen(container):
+    if container not in SCREENS:
+        raise ValueError(f"Unknown frame: {container}")
+    module_name, class_name = SCREENS[container]
+    # Same package this module was imported from (src.ui from main.py, ui from src/ui/app.py)
+    return getattr(timed_import(f"{__package__}.{module_name}", container), class_name)
+
+'''
+Imports the modules of the screens in a daemon thread, so they open without delay later and the window keeps answering
+meanwhile. Only the modules are imported there: the widgets are built on the Tk thread when a screen is shown.
+Returns the thread.
+'''
+def preload_screens(containers=PRELOADED_SCREENS):
+    def preload():
+        for container in containers:
+            try:
+                load_screen(container)
+            except Exception as e:
+                print(f"[WARN] Could not preload {container}: {e}")
+    thread = threading.Thread(target=preload, daemon=True)
+    thread.start()
+    return thread
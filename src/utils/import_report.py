@@ -0,0 +1,72 @@
+"""
+This module imports the application screens on demand and keeps how long each import took and which packages it
+brought in, so the cost of every screen can be seen without running the whole application with -X importtime.
+"""
+import sys
+import time
+import importlib
+import subprocess
+import threading
+
+# Import statistics by screen: seconds, number of new modules and new top-level packages
+import_times = {}
+_lock = threading.Lock()
+
+'''
+Imports a module, registering the time it took and the modules it loaded under the given label
+'''
+def timed_import(module_name, label=None):
+    label = label or module_name
+    before = set(sys.modules)
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    elapsed = time.perf_counter() - start
+    new_modules = [name for name in list(sys.modules) if name not in before]
+    if new_modules:
+        with _lock:
+            import_times[label] = {
+                "seconds": elapsed,
+                "modules": len(new_modules),
+                "packages": sorted({name.split(".")[0] for name in new_modules})
+            }
+        print(f"[INFO] {label} imported in {elapsed:.2f} s ({len(new_modules)} new modules)")
+    return module
+
+'''
+Prints and returns the import statistics of the screens loaded so far
+'''
+def import_report():
+    with _lock:
+        report = {label: dict(values) for label, values in import_times.items()}
+    for label, values in report.items():
+        print(f"[INFO] {label}: {values['seconds']:.2f} s, {values['modules']} modules, packages: {', '.join(values['packages'])}")
+    return report
+
+'''
+Runs "python -X importtime -c 'import <module_name>'" in a new interpreter and adds up the time spent in each top-level
+package. Returns (total seconds, {package: seconds}) with the packages sorted from the slowest.
+'''
+def importtime_profile(module_name, cwd=None, python=sys.executable):
+    result = subprocess.run([python, "-X", "importtime", "-c", f"import {module_name}"],
+                            cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise ImportError(f"Could not import {module_name}: {result.stderr.strip().splitlines()[-1]}")
+
+    packages = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_us = int(fields[0])
+            cumulative_us = int(fields[1])
+        except ValueError:
+            continue
+        name = fields[2].strip()
+        packages[name.split(".")[0]] = packages.get(name.split(".")[0], 0) + self_us / 1e6
+        # Modules imported directly by the command are not indented
+        if not fields[2].startswith("  "):
+            total += cumulative_us / 1e6
+    return total, dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
@@ -0,0 +1,398 @@
+"""
+This module keeps the labeled segments of every sleep session in a SQLite database (WAL mode), with an explicit session
+id, an index on (session, start time) and a session index table with the rows, times and apnea count of every session. Saving a session only inserts its own rows, so it takes the same time whatever
+the size of the history. The CSV dataset is still kept as an export: the rows of each saved session are appended to it.
+Deleting a session only marks it in the session index (a tombstone) and readers skip it at once; its rows, files and the
+CSV export are reclaimed later by a compaction that runs in the background.
+Every session has a hash of its rows in the index, so data derived from the rows (the session summaries) is kept with
+the hash it was computed from and is only recomputed when the rows change.
+"""
+import os
+import csv
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+# Database of the sessions and CSV export (same folder as the dataset)
+SESSION_DB_PATH = "data/processed/sessions.db"
+CSV_PATH = "data/processed/processed_patient_data.csv"
+
+# Columns of the dataset rows, in the order of the CSV, with their SQLite types. Sleep_Session is stored as session_id.
+SEGMENT_COLUMNS = [
+    ("Start_Time", "INTEGER"),
+    ("End_Time", "INTEGER"),
+    ("Age", "INTEGER"),
+    ("Gender", "INTEGER"),
+    ("BMI", "REAL"),
+    ("Snoring_Intensity", "REAL"),
+    ("Snoring", "INTEGER"),
+    ("Nasal_Airflow", "REAL"),
+    ("Spectral_Centroid", "REAL"),
+    ("Has_Apnea", "INTEGER"),
+    ("Treatment_Required", "INTEGER"),
+    ("Snore_Energy", "REAL"),
+    ("Decibel_Level_dB", "REAL")
+]
+BOOL_COLUMNS = ("Snoring", "Has_Apnea", "Treatment_Required")
+DATASET_COLUMNS = ["Sleep_Session"] + [name for name, _ in SEGMENT_COLUMNS]
+# Columns of the session index
+SESSION_COLUMNS = ["session_id", "first_row", "last_row", "row_count", "start_time", "end_time", "apnea_count", "saved_at"]
+# Sessions that are not deleted (tombstoned)
+LIVE_SESSIONS = "SELECT session_id FROM sessions WHERE deleted_at IS NULL"
+
+# Schema changes, applied in order; PRAGMA user_version keeps how many were applied
+MIGRATIONS = [
+    f"""
+    CREATE TABLE segments (
+        id INTEGER PRIMARY KEY,
+        session_id INTEGER NOT NULL,
+        {", ".join(f"{name} {kind}" for name, kind in SEGMENT_COLUMNS)}
+    );
+    CREATE INDEX idx_segments_session_start ON segments (session_id, Start_Time);
+    """,
+    # Session index: ids of the first and last rows, number of rows, time bounds and apnea count of every session
+    """
+    CREATE TABLE sessions (
+        session_id INTEGER PRIMARY KEY,
+        first_row INTEGER NOT NULL,
+        last_row INTEGER NOT NULL,
+        row_count INTEGER NOT NULL,
+        start_time INTEGER,
+        end_time INTEGER,
+        apnea_count INTEGER NOT NULL,
+        saved_at REAL NOT NULL
+    );
+    INSERT INTO sessions
+        SELECT session_id, MIN(id), MAX(id), COUNT(*), MIN(Start_Time), MAX(End_Time), COALESCE(SUM(Has_Apnea), 0), strftime('%s', 'now')
+        FROM segments GROUP BY session_id;
+    """,
+    # Tombstone: time a session was deleted, until compaction removes its rows
+    """
+    ALTER TABLE sessions ADD COLUMN deleted_at REAL;
+    CREATE INDEX idx_sessions_deleted ON sessions (deleted_at);
+    """,
+    # Hash of the rows of every session (filled in by _migrate) and summaries computed from them
+    """
+    ALTER TABLE sessions ADD COLUMN rows_hash TEXT;
+    CREATE TABLE session_summaries (
+        session_id INTEGER PRIMARY KEY,
+        rows_hash TEXT NOT NULL,
+        summary TEXT NOT NULL,
+        computed_at REAL NOT NULL
+    );
+    """
+]
+
+# Databases already opened (and migrated) by this process
+_ready = set()
+_ready_lock = threading.Lock()
+# Only one compaction runs at a time
+_compaction_lock = threading.Lock()
+# Appends to the CSV export and rewrites of it run one at a time, so a rewrite never drops (or repeats) saved rows
+_csv_lock = threading.Lock()
+
+'''
+Store of the labeled segments of all the sleep sessions
+'''
+class SessionStore:
+    # Store configuration
+    def __init__(self, path=SESSION_DB_PATH, csv_path=CSV_PATH):
+        self.path = path
+        self.csv_path = csv_path
+
+    '''
+    Appends the rows of a finished session (list of dicts or DataFrame with the dataset columns) to the store and to the CSV export.
+    With replace, the rows replace those already saved for their sessions, so saving a session again never duplicates it.
+    Returns the number of rows saved.
+    '''
+    def append_session(self, rows, export=True, replace=False):
+        df = pd.DataFrame(rows)
+        if df.empty:
+            return 0
+        # The rows reach the store and the CSV export together, never between the read and the replace of export_csv
+        with _csv_lock:
+            replaced = False
+            with self._connect() as con:
+                session_ids = [int(session_id) for session_id in df["Sleep_Session"].unique()]
+                for session_id in session_ids:
+                    # A deleted session saved again replaces the rows that compaction hasn't removed yet
+                    deleted = con.execute("SELECT deleted_at IS NOT NULL FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+                    if deleted is not None and (deleted[0] or replace):
+                        con.execute("DELETE FROM segments WHERE session_id = ?", (session_id,))
+                        replaced = replaced or not deleted[0]
+                self._insert(con, df)
+                for session_id in session_ids:
+                    self._index_session(con, session_id)
+            if export:
+                # Rows replaced in the store are also in the CSV export, which is then written again
+                if replaced:
+                    self._write_csv(self.csv_path)
+                else:
+                    self._append_csv(df)
+        return len(df)
+
+    '''
+    Returns the rows of one session sorted by start time (only those with apnea if apnea_only), or of every session in
+    the order they were saved. Deleted sessions have no rows.
+    '''
+    def read(self, session_id=None, apnea_only=False):
+        with self._connect() as con:
+            columns = ", ".join(["session_id"] + [name for name, _ in SEGMENT_COLUMNS])
+            if session_id is None:
+                cursor = con.execute(f"SELECT {columns} FROM segments WHERE session_id IN ({LIVE_SESSIONS}) ORDER BY id")
+            else:
+                apnea = " AND Has_Apnea = 1" if apnea_only else ""
+                cursor = con.execute(f"SELECT {columns} FROM segments WHERE session_id = ? AND session_id IN ({LIVE_SESSIONS}){apnea} "
+                                     "ORDER BY Start_Time, id", (int(session_id),))
+            return self._to_frame(cursor.fetchall())
+
+    '''
+    Returns the ids of the stored sessions (not deleted), in the order they were saved
+    '''
+    def session_ids(self):
+        with self._connect() as con:
+            return [row[0] for row in con.execute("SELECT session_id FROM sessions WHERE deleted_at IS NULL ORDER BY first_row")]
+
+    '''
+    Returns the session index as a DataFrame, one row per session (not deleted) in the order they were saved
+    '''
+    def sessions(self):
+        with self._connect() as con:
+            cursor = con.execute(f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions WHERE deleted_at IS NULL ORDER BY first_row")
+            return pd.DataFrame(cursor.fetchall(), columns=SESSION_COLUMNS)
+
+    '''
+    Deletes a session by marking it in the session index; its rows stay until compact. Returns False if the session
+    didn't exist or was already deleted.
+    '''
+    def delete_session(self, session_id):
+        with self._connect() as con:
+            return con.execute("UPDATE sessions SET deleted_at = ? WHERE session_id = ? AND deleted_at IS NULL",
+                               (time.time(), int(session_id))).rowcount > 0
+
+    '''
+    Returns the ids of the deleted sessions that compaction hasn't removed yet
+    '''
+    def deleted_session_ids(self):
+        with self._connect() as con:
+            return [row[0] for row in con.execute("SELECT session_id FROM sessions WHERE deleted_at IS NOT NULL ORDER BY deleted_at")]
+
+    '''
+    Returns the hash of the rows of a session, or None if the session doesn't exist
+    '''
+    def rows_hash(self, session_id):
+        with self._connect() as con:
+            row = con.execute("SELECT rows_hash FROM sessions WHERE session_id = ?", (int(session_id),)).fetchone()
+            return row[0] if row else None
+
+    '''
+    Returns the summary saved for a session (decoded from JSON), or None if there is none or the rows of the session
+    changed since it was computed
+    '''
+    def summary(self, session_id):
+        with self._connect() as con:
+            row = con.execute("""
+                SELECT summaries.summary FROM session_summaries summaries JOIN sessions USING (session_id)
+                WHERE session_id = ? AND summaries.rows_hash = sessions.rows_hash AND sessions.deleted_at IS NULL
+                """, (int(session_id),)).fetchone()
+            return json.loads(row[0]) if row else None
+
+    '''
+    Saves the summary (JSON serializable) of a session, computed from the rows with the given hash
+    '''
+    def save_summary(self, session_id, rows_hash, summary):
+        with self._connect() as con:
+            con.execute("""
+                INSERT INTO session_summaries (session_id, rows_hash, summary, computed_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (session_id) DO UPDATE SET rows_hash = excluded.rows_hash, summary = excluded.summary,
+                    computed_at = excluded.computed_at
+                """, (int(session_id), rows_hash, json.dumps(summary), time.time()))
+
+    '''
+    Removes the rows of the deleted sessions, one session per transaction so saving a session never waits long, calls
+    on_purge(session_id) to remove the files of each one and rewrites the CSV export once at the end.
+    Returns the ids of the removed sessions.
+    '''
+    def compact(self, on_purge=None, export=True):
+        with _compaction_lock:
+            purged = []
+            for session_id in self.deleted_session_ids():
+                with self._connect() as con:
+                    # The session may have been saved again since it was deleted
+                    if not con.execute("SELECT 1 FROM sessions WHERE session_id = ? AND deleted_at IS NOT NULL", (session_id,)).fetchone():
+                        continue
+                    con.execute("DELETE FROM segments WHERE session_id = ?", (session_id,))
+                    con.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                    con.execute("DELETE FROM session_summaries WHERE session_id = ?", (session_id,))
+                if on_purge is not None:
+                    try:
+                        on_purge(session_id)
+                    except Exception as e:
+                        print(f"[WARN] Could not remove the files of session {session_id}: {e}")
+                purged.append(session_id)
+            if purged and export:
+                self.export_csv()
+                print(f"[INFO] Compacted {len(purged)} deleted session(s) from {self.path}")
+            return purged
+
+    '''
+    Runs compact on a background thread. Returns the thread.
+    '''
+    def compact_in_background(self, on_purge=None):
+        thread = threading.Thread(target=self.compact, args=(on_purge,), daemon=True)
+        thread.start()
+        return thread
+
+    '''
+    Writes the whole store as a CSV file with the dataset columns (the CSV export by default)
+    '''
+    def export_csv(self, path=None):
+        with _csv_lock:
+            self._write_csv(path or self.csv_path)
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        con = sqlite3.connect(self.path, timeout=30)
+        # With WAL, a commit that only reaches the log is safe against application crashes
+        con.execute("PRAGMA synchronous=NORMAL")
+        with _ready_lock:
+            if self.path not in _ready:
+                self._migrate(con)
+                _ready.add(self.path)
+        return _Connection(con)
+
+    '''
+    Creates or updates the schema. A new database takes the rows of the CSV dataset, if there is one.
+    '''
+    def _migrate(self, con):
+        # WAL: readers don't block the writer and a commit only appends to the log
+        con.execute("PRAGMA journal_mode=WAL")
+        if con.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRATIONS):
+            return
+
+        # One transaction for every change, so another process never sees half of them
+        con.isolation_level = None
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            version = con.execute("PRAGMA user_version").fetchone()[0]
+            for script in MIGRATIONS[version:]:
+                for statement in script.split(";"):
+                    if statement.strip():
+                        con.execute(statement)
+            if version == 0:
+                self._import_csv(con)
+            # Sessions saved before the rows were hashed
+            for (session_id,) in con.execute("SELECT session_id FROM sessions WHERE rows_hash IS NULL").fetchall():
+                self._hash_session(con, session_id)
+            con.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        finally:
+            con.isolation_level = ""
+
+    '''
+    Imports the rows of the CSV dataset. Rows without Sleep_Session get the number of their session in the file (a new
+    session starts at every Start_Time == 0).
+    '''
+    def _import_csv(self, con):
+        if not os.path.exists(self.csv_path):
+            return
+        df = pd.read_csv(self.csv_path)
+        if df.empty:
+            return
+        inferred = df.groupby((df["Start_Time"] == 0).cumsum()).ngroup() + 1
+        sessions = df["Sleep_Session"] if "Sleep_Session" in df.columns else pd.Series(np.nan, index=df.index)
+        df["Sleep_Session"] = sessions.fillna(inferred)
+        self._insert(con, df)
+        for session_id in df["Sleep_Session"].unique():
+            self._index_session(con, int(session_id))
+        print(f"[INFO] Imported {len(df)} rows from {self.csv_path} into {self.path}")
+
+    '''
+    Updates the index entry of a session from its rows (read through the session index of the segments table)
+    '''
+    def _index_session(self, con, session_id):
+        first_row, last_row, row_count, start_time, end_time, apnea_count = con.execute(
+            "SELECT MIN(id), MAX(id), COUNT(*), MIN(Start_Time), MAX(End_Time), COALESCE(SUM(Has_Apnea), 0) "
+            "FROM segments WHERE session_id = ?", (session_id,)).fetchone()
+        con.execute("""
+            INSERT INTO sessions (session_id, first_row, last_row, row_count, start_time, end_time, apnea_count, saved_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (session_id) DO UPDATE SET first_row = excluded.first_row, last_row = excluded.last_row,
+                row_count = excluded.row_count, start_time = excluded.start_time, end_time = excluded.end_time,
+                apnea_count = excluded.apnea_count, saved_at = excluded.saved_at, deleted_at = NULL
+            """, (session_id, first_row, last_row, row_count, start_time, end_time, apnea_count, time.time()))
+        self._hash_session(con, session_id)
+
+    '''
+    Updates the hash of the rows of a session, taken in the order they are read
+    '''
+    def _hash_session(self, con, session_id):
+        digest = hashlib.sha1()
+        columns = ", ".join(name for name, _ in SEGMENT_COLUMNS)
+        for row in con.execute(f"SELECT {columns} FROM segments WHERE session_id = ? ORDER BY Start_Time, id", (session_id,)):
+            digest.update(repr(row).encode())
+        con.execute("UPDATE sessions SET rows_hash = ? WHERE session_id = ?", (digest.hexdigest(), session_id))
+
+    def _insert(self, con, df):
+        names = [name for name, _ in SEGMENT_COLUMNS]
+        values = [[int(session) for session in df["Sleep_Session"].tolist()]]
+        for name in names:
+            column = df[name] if name in df.columns else pd.Series(None, index=df.index, dtype=object)
+            # Python values (sqlite3 doesn't take numpy scalars); NaN is stored as NULL
+            values.append([None if isinstance(value, float) and np.isnan(value) else value for value in column.tolist()])
+        con.executemany(f"INSERT INTO segments (session_id, {', '.join(names)}) VALUES ({', '.join('?' * (len(names) + 1))})",
+                        zip(*values))
+
+    def _to_frame(self, rows):
+        df = pd.DataFrame(rows, columns=DATASET_COLUMNS)
+        for name, kind in SEGMENT_COLUMNS:
+            if name in BOOL_COLUMNS:
+                df[name] = df[name].astype(bool)
+            elif kind == "REAL":
+                df[name] = df[name].astype(float)
+        return df
+
+    def _write_csv(self, path):
+        tmp_path = path + ".tmp"
+        self.read().to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    '''
+    Appends rows to the CSV export, in the column order of its header. Only the header is read, not the previous rows.
+    '''
+    def _append_csv(self, df):
+        header = None
+        if os.path.exists(self.csv_path) and os.path.getsize(self.csv_path) > 0:
+            with open(self.csv_path, newline="") as f:
+                header = next(csv.reader(f), None)
+        os.makedirs(os.path.dirname(os.path.abspath(self.csv_path)), exist_ok=True)
+        with open(self.csv_path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=header or DATASET_COLUMNS, restval="", extrasaction="ignore")
+            if header is None:
+                writer.writeheader()
+            # Missing values are written empty, as pandas does
+            writer.writerows(df.astype(object).where(df.notna(), "").to_dict("records"))
+
+'''
+Connection that commits (or rolls back) and closes at the end of a with block
+'''
+class _Connection:
+    def __init__(self, con):
+        self.con = con
+
+    def __enter__(self):
+        self.con.__enter__()
+        return self.con
+
+    def __exit__(self, *exc):
+        try:
+            return self.con.__exit__(*exc)
+        finally:
+            self.con.close()
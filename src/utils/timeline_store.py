@@ -0,0 +1,207 @@
+"""
+This module keeps the timeline of each sleep session: the detected sleeping positions and the apnea/snoring flags of the
+analyzed segments, in a compact append-only file per session that can be queried by time range.
+"""
+import os
+from datetime import datetime
+import numpy as np
+from ui.paths import TIMELINE_DIR
+
+# Kinds of timeline records
+KIND_POSTURE = 0
+KIND_SEGMENT = 1
+KIND_POSTURE_INTERVAL = 2
+
+# One fixed-size record per event. Times are UNIX timestamps (seconds); a posture has t_end == t.
+# A posture record is a photo: its label is empty when no person was found on it.
+# A posture interval is a period with the same position, found by the continuous posture tracking.
+TIMELINE_RECORD = np.dtype([
+    ("t", "<f8"),
+    ("t_end", "<f8"),
+    ("kind", "u1"),
+    ("label", "S32"),
+    ("proba", "<f4"),
+    ("apnea", "?"),
+    ("snoring", "?")
+])
+
+'''
+Timeline of one sleep session
+'''
+class SessionTimeline:
+    # Timeline configuration
+    def __init__(self, session_num, timeline_dir=TIMELINE_DIR):
+        self.session_num = session_num
+        self.path = os.path.join(timeline_dir, f"session_{session_num}.bin")
+        self._records = None    # sorted records, cached until the next append
+
+    '''
+    Appends a photo taken at time t and the sleeping position detected on it (label None if no person was found)
+    '''
+    def append_posture(self, t, label, proba):
+        record = np.zeros(1, dtype=TIMELINE_RECORD)
+        record["t"] = t
+        record["t_end"] = t
+        record["kind"] = KIND_POSTURE
+        record["label"] = _encode_label(label)
+        record["proba"] = proba
+        self._append(record)
+
+    '''
+    Appends a period [t, t_end) in which the sleeping position didn't change; proba is its mean confidence
+    '''
+    def append_interval(self, t, t_end, label, proba):
+        record = np.zeros(1, dtype=TIMELINE_RECORD)
+        record["t"] = t
+        record["t_end"] = t_end
+        record["kind"] = KIND_POSTURE_INTERVAL
+        record["label"] = _encode_label(label)
+        record["proba"] = proba
+        self._append(record)
+
+    '''
+    Appends the labeled segments (dataset rows) of the session; their times are relative to session_start
+    '''
+    def append_segments(self, rows, session_start):
+        if not rows:
+            return
+        records = np.zeros(len(rows), dtype=TIMELINE_RECORD)
+        records["t"] = [session_start + row["Start_Time"] for row in rows]
+        records["t_end"] = [session_start + row["End_Time"] for row in rows]
+        records["kind"] = KIND_SEGMENT
+        records["apnea"] = [bool(row["Has_Apnea"]) for row in rows]
+        records["snoring"] = [bool(row["Snoring"]) for row in rows]
+        self._append(records)
+
+    '''
+    Returns every record of the session sorted by time (empty if the session has none)
+    '''
+    def read(self):
+        if self._records is None:
+            try:
+                # Ignore a record cut by an interrupted write
+                count = os.path.getsize(self.path) // TIMELINE_RECORD.itemsize
+                records = np.fromfile(self.path, dtype=TIMELINE_RECORD, count=count)
+            except FileNotFoundError:
+                records = np.zeros(0, dtype=TIMELINE_RECORD)
+            # Postures and segments are appended from different threads, so they may be slightly out of order
+            if len(records) > 1 and np.any(np.diff(records["t"]) < 0):
+                records = records[np.argsort(records["t"], kind="stable")]
+            self._records = records
+        return self._records
+
+    '''
+    Returns the records that start in [start, end) (None for no limit), optionally only those of one kind
+    '''
+    def query(self, start=None, end=None, kind=None):
+        records = self.read()
+        lo = 0 if start is None else np.searchsorted(records["t"], start, side="left")
+        hi = len(records) if end is None else np.searchsorted(records["t"], end, side="left")
+        records = records[lo:hi]
+        if kind is not None:
+            records = records[records["kind"] == kind]
+        return records
+
+    '''
+    Returns the detected sleeping positions in [start, end) as (date and time, position) pairs
+    '''
+    def positions(self, start=None, end=None):
+        return [(datetime.fromtimestamp(record["t"]).strftime("%Y-%m-%d %H:%M:%S"), record["label"].decode())
+                for record in self.query(start, end, KIND_POSTURE) if record["label"]]
+
+    '''
+    Returns the number of photos taken in the session, with or without a detected position
+    '''
+    def photo_count(self):
+        return len(self.query(kind=KIND_POSTURE))
+
+    '''
+    Replaces the labels and confidences of the postures taken at the given times ({t: (label, proba)}), e.g. after the
+    photos were classified again. Returns the number of records changed.
+    '''
+    def relabel_postures(self, labels):
+        records = self.read().copy()
+        changed = 0
+        for i in np.flatnonzero(records["kind"] == KIND_POSTURE):
+            new = labels.get(float(records["t"][i]))
+            if new is not None:
+                records["label"][i] = _encode_label(new[0])
+                records["proba"][i] = new[1]
+                changed += 1
+        if changed:
+            tmp_path = self.path + ".tmp"
+            records.tofile(tmp_path)
+            os.replace(tmp_path, self.path)
+            self._records = None
+        return changed
+
+    '''
+    Returns the posture intervals that overlap [start, end) (None for no limit)
+    '''
+    def intervals(self, start=None, end=None):
+        records = self.query(None, end, KIND_POSTURE_INTERVAL)
+        if start is not None:
+            records = records[records["t_end"] > start]
+        return records
+
+    '''
+    Returns the segments in [start, end) with apnea or snoring
+    '''
+    def events(self, start=None, end=None):
+        segments = self.query(start, end, KIND_SEGMENT)
+        return segments[segments["apnea"] | segments["snoring"]]
+
+    '''
+    Removes the timeline of the session
+    '''
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._records = None
+
+    def _append(self, records):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(records.tobytes())
+        self._records = None
+
+'''
+Encodes a label for a record; None is stored empty. Labels that don't fit are an error, never cut.
+'''
+def _encode_label(label):
+    encoded = b"" if label is None else str(label).encode()
+    if len(encoded) > TIMELINE_RECORD["label"].itemsize:
+        raise ValueError(f"Timeline label too long: {label}")
+    return encoded
+
+'''
+Returns the number of photos of a session. Sessions recorded before the timeline existed count their images.
+'''
+def session_photo_count(session_num, images_dir, timeline_dir=TIMELINE_DIR):
+    count = SessionTimeline(session_num, timeline_dir).photo_count()
+    if count or not os.path.isdir(images_dir):
+        return count
+    return sum(1 for f in os.listdir(images_dir) if os.path.isfile(os.path.join(images_dir, f)))
+
+'''
+Returns the sleeping positions of a session as (date and time, position) pairs. Sessions recorded before the timeline
+existed are read from the names and modification times of their images.
+'''
+def session_positions(session_num, images_dir, timeline_dir=TIMELINE_DIR):
+    timeline = SessionTimeline(session_num, timeline_dir)
+    positions = timeline.positions()
+
+    # Positions found by the continuous tracking, with their duration
+    for record in timeline.intervals():
+        minutes = (record["t_end"] - record["t"]) / 60
+        positions.append((datetime.fromtimestamp(record["t"]).strftime("%Y-%m-%d %H:%M:%S"),
+                          f"{record['label'].decode()} ({minutes:.0f} min)"))
+    positions.sort()
+
+    # Only sessions without a timeline fall back to the images
+    if len(timeline.read()) or not os.path.isdir(images_dir):
+        return positions
+
+    images = sorted(f for f in os.listdir(images_dir) if os.path.isfile(os.path.join(images_dir, f)))
+    return [(datetime.fromtimestamp(os.path.getmtime(os.path.join(images_dir, f))).strftime("%Y-%m-%d %H:%M:%S"),
+             os.path.splitext(f)[0]) for f in images]
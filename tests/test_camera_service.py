@@ -0,0 +1,58 @@
+import os
+import time
+import cv2
+import numpy as np
+import src.dataAcquisition.cameraInput as cameraInput
+from src.dataAcquisition.cameraService import CameraService, SyntheticFrameSource, DirectoryFrameSource
+
+def test_snapshot_returns_latest_frame_immediately():
+    source = SyntheticFrameSource(width=320, height=240, fps=200)
+    camera = CameraService(source, width=160, height=120, frame_rate=0, warmup_frames=3)
+    assert camera.start()
+    try:
+        first, _ = camera.snapshot(timeout=2)
+        assert first.shape == (120, 160, 3)
+
+        start = time.perf_counter()
+        frame, timestamp = camera.snapshot()
+        assert time.perf_counter() - start < 0.05
+        assert time.time() - timestamp < 1
+        # Copies, so the caller can draw on them
+        frame[:] = 0
+        assert camera.snapshot()[0].any()
+    finally:
+        camera.stop()
+    assert not source.isOpened()
+
+def test_directory_source_and_take_photo(tmp_path, monkeypatch):
+    frames_dir = tmp_path / "frames"
+    frames_dir.mkdir()
+    cv2.imwrite(str(frames_dir / "frame_0.png"), np.full((60, 80, 3), 200, dtype=np.uint8))
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cameraInput, "get_next_session_number", lambda: 7)
+    monkeypatch.setattr(cameraInput, "get_next_photo_number", lambda: 2)
+    monkeypatch.setattr(cameraInput, "increment_photo_number", lambda: None)
+
+    camera = CameraService(DirectoryFrameSource(str(frames_dir), fps=100), warmup_frames=1)
+    assert camera.start()
+    try:
+        path = cameraInput.takePhoto(camera)
+    finally:
+        camera.stop()
+    assert path == os.path.join("data", "raw", "Session7", "Images", "capture_2.jpg")
+    assert cv2.imread(path).shape == (60, 80, 3)
+
+def test_unavailable_source(tmp_path):
+    camera = CameraService(DirectoryFrameSource(str(tmp_path)))
+    assert not camera.start()
+    camera.stop()
+
+def test_snapshot_after_stop_returns_nothing():
+    service = CameraService(SyntheticFrameSource(width=64, height=48, fps=0), warmup_frames=1)
+    assert service.start()
+    assert service.snapshot(timeout=2)[0] is not None
+    service.stop()
+    # Ready again but the ring already emptied, as when snapshot races with stop
+    service.ready.set()
+    assert service.snapshot(timeout=0) == (None, None)
@@ -0,0 +1,58 @@
+from src.dataAcquisition.capturePolicy import CapturePolicy
+
+def test_hysteresis_and_cooldown():
+    policy = CapturePolicy(cooldown=60, trigger_segments=2, release_segments=2)
+    # A single flagged segment doesn't start an episode
+    assert not policy.observe(True, now=0)
+    assert not policy.observe(False, now=5)
+    assert not policy.observe(True, now=10)
+    assert policy.observe(True, now=15)
+    # Every 5 s segment of a heavy snorer, only one photo per cooldown
+    decisions = [policy.observe(True, now=t) for t in range(20, 140, 5)]
+    assert decisions.count(True) == 2 and decisions.index(True) == (75 - 20) // 5
+
+    stats = policy.stats()
+    assert stats["executed"] == 3
+    assert stats["suppressed"]["hysteresis"] == 2
+    assert stats["suppressed"]["cooldown"] == 22
+
+def test_rate_limit_and_unchanged_posture():
+    policy = CapturePolicy(cooldown=10, trigger_segments=1, max_per_hour=3, unchanged_cooldown=100)
+    assert policy.observe(True, now=0)
+    policy.record_posture("lateral")
+    assert policy.observe(True, now=10)
+    policy.record_posture("lateral")
+    # Same posture twice: the longer cooldown applies
+    assert not policy.observe(True, now=20)
+    assert policy.observe(True, now=110)
+    policy.record_posture("supine")
+    assert not policy.observe(True, now=200)
+    assert policy.stats()["suppressed"]["rate_limit"] == 1
+    assert policy.observe(True, now=3600)
+
+def test_posture_source_and_cancel():
+    policy = CapturePolicy(cooldown=0, trigger_segments=1)
+    actual = {"posture": "prone"}
+    policy.posture_source = lambda: actual["posture"]
+    assert policy.observe(True, now=0)
+    policy.record_posture("prone")
+    assert not policy.observe(True, now=1)
+    actual["posture"] = "lateral"
+    assert policy.observe(True, now=2)
+
+    policy.cancel_capture()
+    stats = policy.stats()
+    assert stats["executed"] == 1
+    assert stats["suppressed"]["busy"] == 1 and stats["suppressed"]["posture_unchanged"] == 1
+
+def test_alert_posture_is_never_short_circuited():
+    policy = CapturePolicy(cooldown=10, trigger_segments=1, unchanged_cooldown=600)
+    policy.posture_source = lambda: "supine"
+    assert policy.observe(True, now=0)
+    policy.record_posture("supine")
+    assert policy.observe(True, now=10)
+    policy.record_posture("supine")
+    # Still supine: the alarm repeats after the normal cooldown
+    assert not policy.observe(True, now=15)
+    assert policy.observe(True, now=20)
+    assert policy.stats()["suppressed"]["posture_unchanged"] == 0
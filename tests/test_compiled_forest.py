@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from src.inferenceModels.compiledForest import CompiledForest
+
+@pytest.fixture
+def apnea_data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({
+        'Age': rng.integers(20, 80, 400),
+        'Gender': rng.integers(0, 3, 400),
+        'BMI': rng.uniform(18, 40, 400),
+        'Nasal_Airflow': rng.uniform(0.2, 0.5, 400),
+        'Snoring': rng.random(400) > 0.5
+    })
+    y = (X['Nasal_Airflow'] + 0.01 * X['BMI'] + rng.normal(0, 0.05, 400) > 0.7) | (X['Snoring'] & (X['Age'] > 60))
+    return X, y
+
+def test_matches_sklearn_bit_for_bit(apnea_data):
+    X, y = apnea_data
+    forest = RandomForestClassifier(n_estimators=50, min_samples_leaf=2, random_state=0).fit(X, y)
+    compiled = CompiledForest.from_forest(forest)
+
+    # Columns in a different order are taken by name, like sklearn does
+    batch = X.sample(frac=1, random_state=1)[['Snoring', 'BMI', 'Age', 'Nasal_Airflow', 'Gender']]
+    assert np.array_equal(compiled.predict_proba(batch), forest.predict_proba(batch[X.columns]))
+    assert np.array_equal(compiled.predict(X), forest.predict(X))
+    assert compiled.predict(X.iloc[:1])[0] == forest.predict(X.iloc[:1])[0]
+
+def test_multiclass_arrays_round_trip():
+    rng = np.random.default_rng(2)
+    X = rng.random((300, 132))
+    y = np.array(["supine", "lateral", "prone"])[np.argmax(X[:, :3], axis=1)]
+    forest = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+    compiled = CompiledForest.from_arrays(CompiledForest.from_forest(forest).to_arrays())
+
+    assert np.array_equal(compiled.predict_proba(X), forest.predict_proba(X))
+    assert compiled.predict(X[0]).tolist() == forest.predict(X[:1]).tolist()
+    with pytest.raises(ValueError):
+        compiled.predict(X[:, :10])
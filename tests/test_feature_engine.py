@@ -0,0 +1,66 @@
+import pytest
+import numpy as np
+import librosa
+from src.signalProcessing.feature_engine import frame_segments, normalize_segments, compute_segment_features, compute_fast_features, silence_mask
+
+SAMPLE_RATE = 16000
+
+@pytest.fixture
+def audio():
+    # 20 seconds of a modulated tone with background noise
+    rng = np.random.default_rng(0)
+    t = np.arange(20 * SAMPLE_RATE) / SAMPLE_RATE
+    return 0.3 * np.sin(2 * np.pi * 220 * t) * (1 + np.sin(2 * np.pi * 0.2 * t)) + 0.05 * rng.standard_normal(len(t))
+
+# Reference implementation: the per-segment librosa calls used by extract_features
+def reference_features(segment, sample_rate):
+    rms = np.mean(librosa.feature.rms(y=segment))
+    zcr = np.mean(librosa.feature.zero_crossing_rate(y=segment, frame_length=512, hop_length=256))
+    spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=segment, sr=sample_rate))
+    fft = np.fft.fft(segment)
+    freqs = np.fft.fftfreq(len(fft), 1 / sample_rate)
+    snore_energy = np.sum(np.abs(fft)[(freqs >= 100) & (freqs <= 500)])
+    decibel_level = 20 * np.log10(np.sqrt(np.mean(segment ** 2)))
+    return rms, zcr, spectral_centroid, snore_energy, decibel_level
+
+def test_frame_segments_drops_incomplete_tail(audio):
+    segments = frame_segments(audio[:-10], 5 * SAMPLE_RATE)
+    assert segments.shape == (3, 5 * SAMPLE_RATE)
+    assert np.shares_memory(segments, audio)
+
+def test_features_match_librosa(audio):
+    segments = normalize_segments(frame_segments(audio, 5 * SAMPLE_RATE))
+    features = compute_segment_features(segments, SAMPLE_RATE, block_segments=3)
+
+    for idx, segment in enumerate(segments):
+        expected = reference_features(segment, SAMPLE_RATE)
+        for value, reference in zip(features, expected):
+            # librosa computes the RMS power in float32
+            assert value[idx] == pytest.approx(reference, rel=1e-6)
+
+def test_silent_segment_has_infinite_decibels():
+    segments = np.zeros((1, 5 * SAMPLE_RATE))
+    rms, zcr, spectral_centroid, snore_energy, decibel_level = compute_segment_features(segments, SAMPLE_RATE)
+    assert rms[0] == 0
+    assert snore_energy[0] == 0
+    assert decibel_level[0] == -np.inf
+
+def test_silence_mask_and_fast_features():
+    rng = np.random.default_rng(1)
+    quiet = rng.normal(0, 0.001, 5 * SAMPLE_RATE)
+    click = quiet.copy()
+    click[100] = 0.05
+    loud = rng.normal(0, 0.01, 5 * SAMPLE_RATE)
+    segments = np.vstack([quiet, click, loud])
+    assert silence_mask(segments, noise_threshold=0.001).tolist() == [True, False, False]
+
+    normalized = normalize_segments(segments)
+    rms, zcr, spectral_centroid, snore_energy, decibel_level = compute_segment_features(normalized, SAMPLE_RATE)
+    fast_rms, fast_zcr, fast_centroid, fast_energy, fast_decibel_level = compute_fast_features(normalized, SAMPLE_RATE)
+    np.testing.assert_allclose(fast_rms, rms, rtol=1e-12)
+    np.testing.assert_array_equal(fast_zcr, zcr)
+    np.testing.assert_array_equal(fast_energy, snore_energy)
+    np.testing.assert_array_equal(fast_decibel_level, decibel_level)
+    # Estimated from the whole segment, never a NaN placeholder
+    assert np.all(np.isfinite(fast_centroid))
+    np.testing.assert_allclose(fast_centroid[0], spectral_centroid[0], rtol=0.05)
@@ -0,0 +1,26 @@
+import numpy as np
+from src.signalProcessing.filters import BandpassFilter, design_bandpass_sos
+
+def test_design_is_cached_per_configuration():
+    assert design_bandpass_sos(20, 3000, 16000, 5) is design_bandpass_sos(20, 3000, 16000, 5)
+    assert design_bandpass_sos(20, 3000, 16000, 5) is not design_bandpass_sos(20, 3000, 44100, 5)
+
+def test_chunked_output_matches_one_shot():
+    rng = np.random.default_rng(0)
+    signal = rng.standard_normal(16000 * 12)
+
+    one_shot = BandpassFilter().process(signal)
+
+    chunked_filter = BandpassFilter()
+    chunks = np.array_split(signal, [1000, 16000, 16001, 90000, 150000])
+    chunked = np.concatenate([chunked_filter.process(chunk) for chunk in chunks])
+
+    np.testing.assert_allclose(chunked, one_shot, rtol=0, atol=1e-12)
+
+def test_reset_starts_from_zero_state():
+    rng = np.random.default_rng(1)
+    signal = rng.standard_normal(4000)
+    bandpass = BandpassFilter()
+    first = bandpass.process(signal)
+    bandpass.reset()
+    np.testing.assert_array_equal(bandpass.process(signal), first)
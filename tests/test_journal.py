@@ -0,0 +1,31 @@
+import numpy as np
+from src.signalProcessing.journal import SegmentJournal
+
+def make_row(start, has_apnea):
+    return {
+        'Sleep_Session': 3,
+        'Start_Time': start,
+        'End_Time': start + 5,
+        'Snoring_Intensity': 0.25,
+        'Snoring': False,
+        'Decibel_Level_dB': -np.inf,
+        'Has_Apnea': has_apnea
+    }
+
+def test_append_and_read(tmp_path):
+    journal = SegmentJournal(str(tmp_path / "segments_journal.csv"))
+    journal.append([make_row(0, False), make_row(5, True)])
+    journal.append([])
+    journal.append([make_row(10, False)])
+
+    df = journal.read()
+    assert df["Start_Time"].tolist() == [0, 5, 10]
+    assert df["Has_Apnea"].tolist() == [False, True, False]
+    assert np.isneginf(df["Decibel_Level_dB"]).all()
+
+def test_read_and_clear_missing_journal(tmp_path):
+    journal = SegmentJournal(str(tmp_path / "segments_journal.csv"))
+    assert journal.read().empty
+    journal.append([make_row(0, False)])
+    journal.clear()
+    assert journal.read().empty
@@ -0,0 +1,53 @@
+import os
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from src.imageProcessing.landmarkStore import session_store, reclassify_sessions
+from src.utils.timeline_store import SessionTimeline
+
+def make_landmarks(value):
+    return np.full((33, 4), value, dtype=np.float32)
+
+def test_append_and_read(tmp_path):
+    store = session_store(4, str(tmp_path))
+    os.makedirs(os.path.dirname(store.path))
+    assert len(store.read()) == 0
+
+    store.append(100.0, 1, 0.8, "supine", make_landmarks(0.1))
+    store.append(200.0, 2, 0.6, "lateral", make_landmarks(0.9).ravel())
+    records = store.read()
+
+    assert records["photo_index"].tolist() == [1, 2]
+    assert records["label"].tolist() == [b"supine", b"lateral"]
+    np.testing.assert_array_equal(records["landmarks"][1], make_landmarks(0.9))
+    # Labels are never cut
+    with pytest.raises(ValueError):
+        store.append(300.0, 3, 0.5, "x" * 33, make_landmarks(0.5))
+
+    # A record cut by an interrupted write is ignored
+    with open(store.path, "ab") as f:
+        f.write(b"\0" * 10)
+    assert len(store.read()) == 2
+
+def test_reclassify_sessions(tmp_path):
+    # New classifier: low values are supine, high values are lateral
+    X = np.vstack([np.full(132, 0.1), np.full(132, 0.9)])
+    clf = RandomForestClassifier(n_estimators=5, bootstrap=False, random_state=0).fit(X, ["supine", "lateral"])
+
+    for session, values in [(1, [0.1, 0.9]), (2, [0.9])]:
+        store = session_store(session, str(tmp_path))
+        os.makedirs(os.path.join(os.path.dirname(store.path), "Images"))
+        for index, value in enumerate(values, start=1):
+            store.append(index, index, 0.5, "prone", make_landmarks(value))
+            SessionTimeline(session, str(tmp_path / "timeline")).append_posture(index, "prone", 0.5)
+            open(os.path.join(os.path.dirname(store.path), "Images", f"prone_{index}.jpg"), "w").close()
+
+    results = reclassify_sessions([1, 2], clf, raw_dir=str(tmp_path), apply=True, timeline_dir=str(tmp_path / "timeline"))
+    assert results[1][1].tolist() == ["supine", "lateral"]
+    assert results[2][1].tolist() == ["lateral"]
+    assert np.array_equal(results[1][1], clf.predict(results[1][0]["landmarks"].reshape(2, -1)))
+
+    assert sorted(os.listdir(tmp_path / "Session1" / "Images")) == ["lateral_2.jpg", "supine_1.jpg"]
+    assert session_store(2, str(tmp_path)).read()["label"].tolist() == [b"lateral"]
+    # The reports read the new labels from the timeline
+    assert [p for _, p in SessionTimeline(1, str(tmp_path / "timeline")).positions()] == ["supine", "lateral"]
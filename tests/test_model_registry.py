@@ -0,0 +1,45 @@
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from src.inferenceModels.modelRegistry import ModelRegistry
+
+def test_forest_is_compiled_cached_and_memory_mapped(tmp_path):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({'Age': rng.integers(20, 80, 200), 'BMI': rng.uniform(18, 40, 200)})
+    y = pd.Series(np.where(X['BMI'] > 30, "yes", "no"), dtype=object)
+    forest = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    path = tmp_path / "model.pkl"
+    joblib.dump(forest, path)
+
+    registry = ModelRegistry({"apnea": str(path)}, compiled_dir=str(tmp_path / "compiled"))
+    assert not registry.is_loaded("apnea")
+    model = registry.get("apnea")
+    assert type(model).__name__ == "CompiledForest"
+    assert registry.get("apnea") is model
+    assert np.array_equal(model.predict_proba(X), forest.predict_proba(X))
+    assert registry.report()["apnea"]["source"] == "compiled"
+
+    # A new process reads the cache instead of the pickle, with the node arrays mapped from the files
+    other = ModelRegistry({"apnea": str(path)}, compiled_dir=str(tmp_path / "compiled"))
+    other.warm_up(background=True).join()
+    cached = other.get("apnea")
+    assert other.report()["apnea"]["source"] == "compiled cache"
+    assert isinstance(cached.value, np.memmap)
+    assert cached.predict(X).tolist() == forest.predict(X).tolist()
+
+    # A retrained model replaces the cache
+    joblib.dump(RandomForestClassifier(n_estimators=3, random_state=1).fit(X, y), path)
+    os.utime(path, ns=(0, 0))
+    assert len(ModelRegistry({"apnea": str(path)}, compiled_dir=str(tmp_path / "compiled")).get("apnea").roots) == 3
+
+def test_other_models_are_loaded_as_pickles(tmp_path):
+    X = np.random.default_rng(1).random((50, 3))
+    joblib.dump(LogisticRegression().fit(X, X[:, 0] > 0.5), tmp_path / "model.pkl")
+    registry = ModelRegistry({"treatment": str(tmp_path / "model.pkl")}, compiled_dir=str(tmp_path / "compiled"))
+
+    assert isinstance(registry.get("treatment"), LogisticRegression)
+    assert registry.report()["treatment"]["mapped_bytes"] == 0
+    assert not os.path.exists(tmp_path / "compiled")
@@ -0,0 +1,24 @@
+import numpy as np
+from src.signalProcessing.filters import BandpassFilter
+from src.signalProcessing.feature_engine import frame_segments, normalize_segments, compute_segment_features
+from src.signalProcessing.parallel_features import parallel_segment_features, chunk_bounds
+
+def test_chunk_bounds_follow_segments():
+    assert chunk_bounds(10 * 100 + 42, 100, 4) == [(0, 300), (300, 600), (600, 900), (900, 1000)]
+    assert chunk_bounds(10 * 100 + 42, 100, 4, block=4) == [(0, 400), (400, 800), (800, 1000)]
+    assert chunk_bounds(99, 100, 4) == []
+
+def test_parallel_features_match_serial():
+    sample_rate, samples_per_segment = 16000, 8192
+    rng = np.random.default_rng(0)
+    t = np.arange(100 * samples_per_segment + 1234) / sample_rate
+    # Noise with loud low-frequency bursts (snoring-like), so the filter state matters at the chunk boundaries
+    audio = (0.01 * rng.standard_normal(len(t)) + 0.5 * np.sin(2 * np.pi * 150 * t) * (np.sin(2 * np.pi * 0.4 * t) > 0.5)).astype(np.float32)
+
+    filtered = BandpassFilter(20, 3000, sample_rate).process(audio)
+    serial = compute_segment_features(normalize_segments(frame_segments(filtered, samples_per_segment)), sample_rate)
+    parallel = parallel_segment_features(audio, sample_rate, samples_per_segment, workers=2)
+
+    assert len(parallel[0]) == 100
+    for serial_values, parallel_values in zip(serial, parallel):
+        assert np.array_equal(serial_values, parallel_values, equal_nan=True)
@@ -0,0 +1,87 @@
+import cv2
+import numpy as np
+import pytest
+import src.imageProcessing.ImageProcessingModule as ipm
+
+@pytest.fixture
+def image_path(tmp_path):
+    path = str(tmp_path / "capture_1.jpg")
+    cv2.imwrite(path, np.zeros((480, 640, 3), dtype=np.uint8))
+    return path
+
+@pytest.fixture
+def fake_classifier(monkeypatch):
+    # Confidence and answer of each MediaPipe complexity, and the image sizes it received
+    answers = {}
+    calls = []
+
+    def classify_image(image, complexity):
+        calls.append((complexity, image.shape))
+        pred, confidence = answers[complexity]
+        proba = None if confidence is None else np.array([confidence, 1 - confidence])
+        landmarks = None if proba is None else np.full((33, 4), complexity, dtype=np.float32)
+        return pred, proba, landmarks, {"pose": 0.01}
+
+    monkeypatch.setattr(ipm, "classify_image", classify_image)
+    monkeypatch.setattr(ipm, "tier_costs", {})
+    monkeypatch.setattr(ipm, "warm_graphs", {1, 2})
+    return answers, calls
+
+def test_confident_first_tier_answers_on_reduced_image(image_path, fake_classifier):
+    answers, calls = fake_classifier
+    answers.update({1: ("lateral", 0.9), 2: ("supine", 0.95)})
+    result = ipm.predict_posture_tiered(image_path)
+
+    assert calls == [(1, (240, 320, 3))]
+    assert result["prediction"] == "lateral" and result["tier"] == 0
+    assert set(result["timings"]) == {"tier0_decode", "tier0_pose", "total"}
+
+def test_escalates_on_low_confidence_or_missing_joints(image_path, fake_classifier):
+    answers, calls = fake_classifier
+    answers.update({1: ("lateral", 0.55), 2: ("supine", 0.8)})
+    result = ipm.predict_posture_tiered(image_path)
+    assert [c for c, _ in calls] == [1, 2]
+    assert calls[1][1] == (480, 640, 3)
+    assert (result["prediction"], result["tier"], result["complexity"]) == ("supine", 1, 2)
+    assert (result["landmarks"] == 2).all()
+
+    answers.update({1: (ipm.NO_JOINTS, None)})
+    assert ipm.predict_posture_tiered(image_path)["tier"] == 1
+
+def test_budget_keeps_the_cheap_answer(image_path, fake_classifier, monkeypatch):
+    answers, calls = fake_classifier
+    answers.update({1: ("lateral", 0.55), 2: ("supine", 0.8)})
+    monkeypatch.setattr(ipm, "tier_costs", {1: 10.0})
+    result = ipm.predict_posture_tiered(image_path, budget=1.0)
+
+    assert [c for c, _ in calls] == [1]
+    assert result["budget_exceeded"]
+    assert (result["prediction"], result["tier"]) == ("lateral", 0)
+
+def test_slow_first_tier_without_estimates_keeps_its_answer(image_path, fake_classifier):
+    answers, calls = fake_classifier
+    answers.update({1: ("lateral", 0.55), 2: ("supine", 0.8)})
+    # Tier 0 alone goes over the budget (cold graph) and no tier has an estimate yet
+    result = ipm.predict_posture_tiered(image_path, budget=0.0)
+
+    assert [c for c, _ in calls] == [1]
+    assert result["budget_exceeded"]
+    assert (result["prediction"], result["tier"]) == ("lateral", 0)
+    assert 1 not in ipm.tier_costs
+
+def test_tier_estimate_skips_warm_up_and_recovers(image_path, fake_classifier, monkeypatch):
+    answers, calls = fake_classifier
+    answers.update({1: ("lateral", 0.55), 2: ("supine", 0.8)})
+    monkeypatch.setattr(ipm, "warm_graphs", set())
+    ipm.predict_posture_tiered(image_path, budget=1.0)
+    # First run of each graph: not measured
+    assert ipm.tier_costs == {}
+
+    # A slow run keeps the tier out only until its estimate ages below the budget
+    ipm.tier_costs[1] = 2.0
+    runs = []
+    for _ in range(5):
+        calls.clear()
+        ipm.predict_posture_tiered(image_path, budget=1.0)
+        runs.append(len(calls) == 2)
+    assert runs[:3] == [False, False, False] and runs[-1]
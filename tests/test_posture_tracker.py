@@ -0,0 +1,18 @@
+from src.imageProcessing.postureTracker import ContinuousPostureTracker
+from src.utils.timeline_store import SessionTimeline
+
+def test_position_changes_become_intervals(tmp_path):
+    timeline = SessionTimeline(1, str(tmp_path))
+    tracker = ContinuousPostureTracker(camera=None, timeline=timeline, stable_frames=2)
+    frames = [("supine", 0.9), ("supine", 0.7), ("lateral", 0.8),    # a single different frame is ignored
+              ("supine", 0.8), ("lateral", 0.6), ("lateral", 0.8), ("lateral", 1.0),
+              (None, 0.0), (None, 0.0), ("prone", 0.5)]
+    for t, (label, confidence) in enumerate(frames):
+        tracker.update(float(t), label, confidence)
+    tracker._close_interval(tracker.last_seen)
+
+    intervals = timeline.intervals()
+    assert [(r["t"], r["t_end"], r["label"].decode()) for r in intervals] == [
+        (0.0, 4.0, "supine"), (4.0, 7.0, "lateral"), (9.0, 9.0, "prone")]
+    assert abs(intervals["proba"][0] - 0.8) < 1e-6
+    assert len(timeline.intervals(5.0, 6.0)) == 1
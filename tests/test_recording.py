@@ -3,6 +3,7 @@ import os
 import numpy as np
 from unittest.mock import patch, MagicMock
 from src.ui.recording_screen import RecordingScreen, get_volume_color
+from src.dataAcquisition.ringBuffer import AudioRingBuffer
 
 # ---- Test for the standalone function get_volume_color ----
 @pytest.mark.parametrize("volume,expected_color", [
@@ -57,11 +58,12 @@ def test_get_selected_device_index_not_found():
         index = screen.get_selected_device_index()
         assert index is None  # MicX not found
 
-def test_audio_callback_sets_volume_and_appends_data():
+def test_audio_callback_sets_volume_and_buffers_data():
     screen = RecordingScreen(parent=MagicMock())
+    screen.ring = AudioRingBuffer(1024)
     indata = np.array([[0.1], [0.1], [0.1]])
-    screen.audio_callback(indata, None)
-    assert len(screen.audio_data) == 1
+    screen.audio_callback(indata, len(indata), None, None)
+    assert screen.ring.write_position == 3
     assert isinstance(screen.volume_level, float)
     assert screen.volume_level >= 0
 
@@ -40,27 +40,40 @@ def dummy_df():
 @patch("src.reportGeneration.reportGenerator.generate_recommendations", return_value=["Rec 1", "Rec 2"])
 @patch("builtins.open", new_callable=mock_open, read_data='{"patient": {"name": "John Doe"}}')
 @patch("os.path.exists", return_value=True)
-@patch("pandas.read_csv")
+@patch("src.reportGeneration.reportGenerator.SessionStore")
 @patch("tkinter.filedialog.asksaveasfilename", return_value="/fake/path/report.pdf")
 @patch("reportlab.platypus.SimpleDocTemplate.build")
-def test_generate_report(mock_build, mock_dialog, mock_read_csv, mock_exists, mock_open_file, mock_recommendations, dummy_df, dummy_patient_data):
-    mock_read_csv.return_value = dummy_df
+@patch("src.reportGeneration.reportGenerator.session_fragment")
+def test_generate_report(mock_fragment, mock_build, mock_dialog, mock_store, mock_exists, mock_open_file, mock_recommendations, dummy_df, dummy_patient_data):
+    mock_fragment.return_value = {
+        "summary_data": [["Duration\n(h)"], [0.1]], "descriptive_data": [["index", "Snoring\nIntensity"], ["mean", 0.4]],
+        "signal_chart": "Session1/sleep_session_summary.png", "pie_chart": "Session1/apnea_pie_chart.png"
+    }
     mock_open_file.return_value.__enter__.return_value.read.return_value = '{"patient": {"name": "John Doe"}}'
     with patch("json.load", return_value=dummy_patient_data):
         reportGen.generate_report(1)
 
+    mock_fragment.assert_called_once_with(1, mock_store.return_value)
     mock_dialog.assert_called_once()
     mock_build.assert_called_once()
     mock_recommendations.assert_called_once()
+    # The charts of the session fragment, not files in the working directory
+    charts = [element.filename for element in mock_build.call_args.args[0] if hasattr(element, "filename")]
+    assert charts == ["Session1/apnea_pie_chart.png", "Session1/sleep_session_summary.png"]
 
 @patch("src.reportGeneration.reportGenerator.generate_recommendations", return_value=["Rec A", "Rec B"])
 @patch("builtins.open", new_callable=mock_open, read_data='{"patient": {"name": "John Doe"}}')
 @patch("os.path.exists", return_value=True)
-@patch("pandas.read_csv")
+@patch("src.reportGeneration.reportGenerator.SessionStore")
 @patch("tkinter.filedialog.asksaveasfilename", return_value="/fake/path/full_report.pdf")
 @patch("reportlab.platypus.SimpleDocTemplate.build")
-def test_generate_full_report(mock_build, mock_dialog, mock_read_csv, mock_exists, mock_open_file, mock_recommendations, dummy_df, dummy_patient_data):
-    mock_read_csv.return_value = dummy_df
+@patch("src.reportGeneration.reportGenerator.session_fragment")
+def test_generate_full_report(mock_fragment, mock_build, mock_dialog, mock_store, mock_exists, mock_open_file, mock_recommendations, dummy_df, dummy_patient_data):
+    mock_store.return_value.session_ids.return_value = [1, 2]
+    mock_fragment.side_effect = lambda session_id, store: {
+        "summary_data": [["Duration\n(h)"], [0.1]], "descriptive_data": [["index", "Snoring\nIntensity"], ["mean", 0.4]],
+        "signal_chart": f"Session{session_id}/sleep_session_summary.png", "pie_chart": f"Session{session_id}/apnea_pie_chart.png"
+    }
     mock_open_file.return_value.__enter__.return_value.read.return_value = '{"patient": {"name": "John Doe"}}'
     with patch("json.load", return_value=dummy_patient_data):
         reportGen.generate_full_report()
@@ -68,3 +81,8 @@ def test_generate_full_report(mock_build, mock_dialog, mock_read_csv, mock_exist
     mock_dialog.assert_called_once()
     mock_build.assert_called_once()
     mock_recommendations.assert_called_once()
+    # One fragment per session, each with its own charts
+    assert [c.args[0] for c in mock_fragment.call_args_list] == [1, 2]
+    charts = [element.filename for element in mock_build.call_args.args[0] if hasattr(element, "filename")]
+    assert charts == ["Session1/apnea_pie_chart.png", "Session1/sleep_session_summary.png",
+                      "Session2/apnea_pie_chart.png", "Session2/sleep_session_summary.png"]
@@ -0,0 +1,43 @@
+import os
+from src.utils.session_store import SessionStore
+from src.reportGeneration import reportFragments
+from src.reportGeneration.reportFragments import session_fragment, remove_fragment
+
+def make_rows(session, n, first=0):
+    return [{
+        'Sleep_Session': session, 'Start_Time': 5 * i, 'End_Time': 5 * i + 5, 'Age': 40, 'Gender': 0, 'BMI': 27.5,
+        'Snoring_Intensity': 0.05 * (i % 9), 'Snoring': i % 3 == 0, 'Nasal_Airflow': 0.3,
+        'Spectral_Centroid': 900.0 + i, 'Snore_Energy': 0.2, 'Decibel_Level_dB': -30.0 - i % 5,
+        'Has_Apnea': i % 7 == 0, 'Treatment_Required': False
+    } for i in range(first, first + n)]
+
+def test_fragments_are_rendered_once_per_session(tmp_path, monkeypatch):
+    store = SessionStore(str(tmp_path / "sessions.db"), str(tmp_path / "export.csv"))
+    store.append_session(make_rows(1, 24))
+    store.append_session(make_rows(2, 36))
+    fragments = {session_id: session_fragment(session_id, store, str(tmp_path / "fragments")) for session_id in (1, 2)}
+
+    # Every session has its own charts
+    charts = [fragment[chart] for fragment in fragments.values() for chart in ("signal_chart", "pie_chart")]
+    assert len(set(charts)) == 4 and all(os.path.exists(chart) for chart in charts)
+    assert fragments[1]["summary_data"][1][1] == 4
+    assert fragments[2]["descriptive_data"][0][1] == "Snoring\nIntensity"
+
+    def no_plot(*args, **kwargs):
+        raise AssertionError("the session was rendered again")
+    monkeypatch.setattr(reportFragments, "plot_sleep_session", no_plot)
+    assert session_fragment(1, store, str(tmp_path / "fragments")) == fragments[1]
+
+def test_fragment_is_rendered_again_when_the_rows_change(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), str(tmp_path / "export.csv"))
+    store.append_session(make_rows(1, 24))
+    before = session_fragment(1, store, str(tmp_path / "fragments"))
+
+    store.append_session(make_rows(1, 12, first=24))
+    after = session_fragment(1, store, str(tmp_path / "fragments"))
+    assert after["rows_hash"] != before["rows_hash"]
+    assert after["summary_data"][1][0] == round(36 * 5 / 3600, 2)
+    assert session_fragment(3, store, str(tmp_path / "fragments")) is None
+
+    remove_fragment(1, str(tmp_path / "fragments"))
+    assert not os.path.exists(tmp_path / "fragments" / "Session1")
@@ -0,0 +1,78 @@
+import threading
+import numpy as np
+from src.dataAcquisition.ringBuffer import AudioRingBuffer
+
+def blocks_of(signal, size):
+    return [signal[i:i + size] for i in range(0, len(signal), size)]
+
+def test_windows_across_the_wrap_are_contiguous_views():
+    ring = AudioRingBuffer(1000)
+    reader = ring.reader()
+    signal = np.arange(3500, dtype=np.float32).reshape(-1, 1)
+
+    read = []
+    for block in blocks_of(signal, 300):
+        ring.write(block)
+        while reader.available() >= 700:
+            window = reader.peek(700)
+            assert np.shares_memory(window, ring.data)
+            read.append(window.copy())
+            reader.advance(700)
+
+    np.testing.assert_array_equal(np.concatenate(read), signal[:3500])
+
+def test_readers_are_independent():
+    ring = AudioRingBuffer(100)
+    first, second = ring.reader(), ring.reader()
+    ring.write(np.ones((60, 1), dtype=np.float32))
+    first.advance(60)
+    assert first.available() == 0
+    assert second.available() == 60
+
+def test_overrun_skips_lost_frames():
+    ring = AudioRingBuffer(100)
+    reader = ring.reader()
+    ring.write(np.arange(250, dtype=np.float32).reshape(-1, 1))
+    window = reader.peek_available(1000)
+    assert reader.lost_frames == 150
+    np.testing.assert_array_equal(window.ravel(), np.arange(150, 250))
+
+def test_overrun_of_a_peeked_view_is_detected():
+    ring = AudioRingBuffer(100)
+    reader = ring.reader()
+    ring.write(np.zeros((80, 1), dtype=np.float32))
+    view = reader.peek(80)
+    assert not reader.overrun()
+    # The writer laps the view while it is still being used
+    ring.write(np.ones((30, 1), dtype=np.float32))
+    assert reader.overrun()
+    assert view[0, 0] == 1
+
+def test_tail_after_an_overrun_keeps_the_last_frames():
+    ring = AudioRingBuffer(100)
+    reader = ring.reader()
+    ring.write(np.zeros((60, 1), dtype=np.float32))
+    ring.write(np.ones((90, 1), dtype=np.float32))
+    ring.close()
+
+    tail = reader.peek(reader.available())
+    assert len(tail) == 100 and reader.lost_frames == 50
+    assert tail[-90:, 0].tolist() == [1.0] * 90
+
+def test_close_wakes_up_readers_and_returns_tail():
+    ring = AudioRingBuffer(100)
+    reader = ring.reader()
+    result = {}
+
+    def consume():
+        result["segment"] = reader.peek(80)
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    ring.write(np.ones((30, 1), dtype=np.float32))
+    ring.close()
+    consumer.join(timeout=2)
+
+    assert result["segment"] is None
+    assert len(reader.peek(reader.available())) == 30
+    reader.advance(30)
+    assert reader.finished()
@@ -0,0 +1,47 @@
+import time
+import threading
+from src.signalProcessing.segment_pool import SegmentWorkerPool
+
+def test_results_delivered_in_submission_order():
+    delivered = []
+    pool = SegmentWorkerPool(workers=3, max_pending=8, on_result=lambda i, r, e: delivered.append((i, r)))
+    # The first tasks are the slowest, so they finish last
+    for index, delay in enumerate([0.3, 0.2, 0.1, 0.0]):
+        assert pool.submit(index, lambda d=delay, i=index: time.sleep(d) or i * 10)
+    pool.shutdown()
+
+    assert delivered == [(0, 0), (1, 10), (2, 20), (3, 30)]
+    metrics = pool.metrics()
+    assert metrics["completed"] == 4 and metrics["queue_depth"] == 0
+
+def test_full_queue_rejects_without_blocking():
+    release = threading.Event()
+    pool = SegmentWorkerPool(workers=1, max_pending=1)
+    assert pool.submit(0, release.wait)
+    time.sleep(0.1)     # the worker takes the first task
+    assert pool.submit(1, release.wait)
+
+    start = time.monotonic()
+    assert not pool.submit(2, release.wait)
+    assert time.monotonic() - start < 0.1
+
+    release.set()
+    pool.shutdown()
+    metrics = pool.metrics()
+    assert metrics["rejected"] == 1 and metrics["completed"] == 2
+
+def test_errors_and_cancelled_tasks_keep_the_order():
+    delivered = []
+    release = threading.Event()
+    pool = SegmentWorkerPool(workers=1, max_pending=4, on_result=lambda i, r, e: delivered.append((i, r, type(e))))
+    pool.submit(0, release.wait)
+    time.sleep(0.1)
+    pool.submit(1, lambda: 1 / 0)
+    pool.submit(2, lambda: "queued")
+    release.set()
+    pool.shutdown(cancel_pending=True)
+
+    # Task 0 ran; the queued ones may have been cancelled, but never delivered out of order
+    assert delivered[0] == (0, True, type(None))
+    assert [i for i, _, _ in delivered] == sorted(i for i, _, _ in delivered)
+    assert pool.metrics()["cancelled"] + len(delivered) == 3
@@ -0,0 +1,126 @@
+import time
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from src.utils.session_store import SessionStore
+
+def make_rows(session, n, apnea_at=()):
+    return [{
+        'Sleep_Session': session, 'Start_Time': 5 * i, 'End_Time': 5 * i + 5, 'Age': 40, 'Gender': 0, 'BMI': 27.5,
+        'Snoring_Intensity': 0.1 * i, 'Snoring': i % 2 == 0, 'Nasal_Airflow': 0.3,
+        'Spectral_Centroid': np.nan if i == 0 else 900.0, 'Snore_Energy': 0.2, 'Decibel_Level_dB': -30.0,
+        'Has_Apnea': i in apnea_at, 'Treatment_Required': False
+    } for i in range(n)]
+
+def test_legacy_csv_is_imported_and_sessions_are_appended(tmp_path):
+    csv_path = tmp_path / "processed_patient_data.csv"
+    # Header of the old dataset (other column order, trailing empty column), one session without Sleep_Session
+    legacy = pd.DataFrame(make_rows(1, 3) + make_rows(np.nan, 2))
+    legacy[["Sleep_Session", "Start_Time", "End_Time", "Age", "Gender", "BMI", "Snoring_Intensity", "Snoring", "Nasal_Airflow",
+            "Spectral_Centroid", "Has_Apnea", "Treatment_Required", "Snore_Energy", "Decibel_Level_dB"]].assign(**{"": ""}).to_csv(csv_path, index=False)
+
+    store = SessionStore(str(tmp_path / "sessions.db"), str(csv_path))
+    assert store.session_ids() == [1, 2]
+    assert store.append_session(make_rows(3, 4, apnea_at=(2,))) == 4
+
+    session = store.read(3)
+    assert session["Start_Time"].tolist() == [0, 5, 10, 15]
+    assert session["Has_Apnea"].tolist() == [False, False, True, False]
+    assert np.isnan(session["Spectral_Centroid"].iloc[0])
+    assert store.session_ids() == [1, 2, 3]
+
+    # The CSV export got the new rows in its own column order
+    exported = pd.read_csv(csv_path)
+    assert len(exported) == 9
+    assert exported["Sleep_Session"].tolist()[-4:] == [3, 3, 3, 3]
+    assert exported["Has_Apnea"].tolist()[-4:] == [False, False, True, False]
+
+    store.export_csv(str(tmp_path / "export.csv"))
+    assert len(pd.read_csv(tmp_path / "export.csv")) == 9
+
+def test_wal_mode_and_session_index(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), str(tmp_path / "export.csv"))
+    store.append_session(make_rows(7, 2))
+
+    con = sqlite3.connect(tmp_path / "sessions.db")
+    assert con.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    plan = " ".join(row[-1] for row in con.execute("EXPLAIN QUERY PLAN SELECT * FROM segments WHERE session_id = 7 ORDER BY Start_Time, id"))
+    assert "idx_segments_session_start" in plan
+    assert "TEMP B-TREE" not in plan
+    con.close()
+
+def test_session_index(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), str(tmp_path / "export.csv"))
+    store.append_session(make_rows(5, 3, apnea_at=(1, 2)))
+    store.append_session(make_rows(2, 4))
+
+    index = store.sessions()
+    assert index["session_id"].tolist() == [5, 2]
+    assert index["row_count"].tolist() == [3, 4]
+    assert index["apnea_count"].tolist() == [2, 0]
+    assert index[["start_time", "end_time"]].values.tolist() == [[0, 15], [0, 20]]
+    assert index["first_row"].tolist() == [1, 4]
+    assert store.read(5, apnea_only=True)["Start_Time"].tolist() == [5, 10]
+
+def test_delete_is_a_tombstone_until_compaction(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), str(tmp_path / "export.csv"))
+    store.append_session(make_rows(5, 3, apnea_at=(1, 2)))
+    store.append_session(make_rows(2, 4))
+    store.append_session(make_rows(8, 2))
+
+    assert store.delete_session(5)
+    assert not store.delete_session(5)
+    # Readers skip the session at once, but its rows are still there
+    assert store.session_ids() == [2, 8]
+    assert store.read(5).empty
+    assert len(store.read()) == 6
+    assert store.deleted_session_ids() == [5]
+    con = sqlite3.connect(tmp_path / "sessions.db")
+    assert con.execute("SELECT COUNT(*) FROM segments WHERE session_id = 5").fetchone()[0] == 3
+    con.close()
+
+    # A deleted session saved again only keeps its new rows
+    store.delete_session(8)
+    store.append_session(make_rows(8, 1))
+    assert store.read(8)["Start_Time"].tolist() == [0]
+
+    purged = []
+    assert store.compact(on_purge=purged.append) == [5]
+    assert purged == [5]
+    assert store.deleted_session_ids() == []
+    con = sqlite3.connect(tmp_path / "sessions.db")
+    assert con.execute("SELECT COUNT(*) FROM segments WHERE session_id = 5").fetchone()[0] == 0
+    con.close()
+    assert pd.read_csv(tmp_path / "export.csv")["Sleep_Session"].tolist() == [2, 2, 2, 2, 8]
+
+def test_session_saved_during_export_reaches_the_csv(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), str(tmp_path / "export.csv"))
+    store.append_session(make_rows(1, 2))
+
+    # The export reads the store and waits before replacing the CSV, while another session is saved
+    reading = threading.Event()
+    read = store.read
+    def slow_read(*args, **kwargs):
+        df = read(*args, **kwargs)
+        reading.set()
+        time.sleep(0.2)
+        return df
+    store.read = slow_read
+    export = threading.Thread(target=store.export_csv)
+    export.start()
+    assert reading.wait(5)
+    SessionStore(str(tmp_path / "sessions.db"), str(tmp_path / "export.csv")).append_session(make_rows(2, 3))
+    export.join()
+
+    assert pd.read_csv(tmp_path / "export.csv")["Sleep_Session"].tolist() == [1, 1, 2, 2, 2]
+
+def test_saving_a_session_again_replaces_its_rows(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), str(tmp_path / "export.csv"))
+    store.append_session(make_rows(1, 2))
+    store.append_session(make_rows(2, 3), replace=True)
+    # e.g. the session is recovered from its journal after the summary failed
+    assert store.append_session(make_rows(2, 3), replace=True) == 3
+
+    assert store.sessions()["row_count"].tolist() == [2, 3]
+    assert pd.read_csv(tmp_path / "export.csv")["Sleep_Session"].tolist() == [1, 1, 2, 2, 2]
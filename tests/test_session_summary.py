@@ -0,0 +1,50 @@
+import pandas as pd
+from src.utils.session_store import SessionStore
+from src.reportGeneration.sessionSummary import summarize_session, materialize_summary, load_summary
+
+def make_rows(session, n, first=0):
+    return [{
+        'Sleep_Session': session, 'Start_Time': 5 * i, 'End_Time': 5 * i + 5, 'Age': 40, 'Gender': 0, 'BMI': 27.5,
+        'Snoring_Intensity': 0.05 * (i % 9), 'Snoring': i % 3 == 0, 'Nasal_Airflow': 0.3 + 0.01 * (i % 4),
+        'Spectral_Centroid': 900.0 + i, 'Snore_Energy': 0.2, 'Decibel_Level_dB': -30.0 - i % 5,
+        'Has_Apnea': i % 7 == 0, 'Treatment_Required': i == 20
+    } for i in range(first, first + n)]
+
+def assert_same_summary(saved, computed):
+    for name in ("interval_summary", "descriptive_table", "session_summary_row"):
+        pd.testing.assert_frame_equal(saved[name], computed[name], check_dtype=False)
+    assert saved["session_stats"] == computed["session_stats"]
+
+def test_saved_summary_is_read_without_the_rows(tmp_path, monkeypatch):
+    store = SessionStore(str(tmp_path / "sessions.db"), str(tmp_path / "export.csv"))
+    store.append_session(make_rows(1, 30))
+    computed = materialize_summary(1, store)
+    assert_same_summary(computed, summarize_session(store.read(1)))
+
+    def no_read(*args, **kwargs):
+        raise AssertionError("the rows were read")
+    monkeypatch.setattr(store, "read", no_read)
+    assert_same_summary(load_summary(1, store), computed)
+
+def test_summary_is_computed_again_only_when_the_rows_change(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), str(tmp_path / "export.csv"))
+    store.append_session(make_rows(1, 30))
+    store.append_session(make_rows(2, 12))
+    materialize_summary(1, store)
+    materialize_summary(2, store)
+
+    store.append_session(make_rows(1, 6, first=30))
+    assert store.summary(1) is None
+    assert store.summary(2) is not None
+    assert load_summary(1, store)["session_stats"]["segments"] == 36
+    assert store.summary(1) is not None
+
+    store.delete_session(2)
+    assert store.summary(2) is None
+    assert load_summary(3, store) is None
+
+def test_summary_row_has_the_session_id(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), str(tmp_path / "export.csv"))
+    store.append_session(make_rows(4, 12))
+    assert materialize_summary(4, store)["session_summary_row"]["Sleep_Session"].tolist() == [4]
+    assert load_summary(4, store)["session_summary_row"]["Sleep_Session"].tolist() == [4]
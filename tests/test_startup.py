@@ -0,0 +1,35 @@
+import os
+import sys
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+def test_app_import_defers_heavy_libraries():
+    code = ("import sys, ui.app; print(','.join(m for m in "
+            "('librosa', 'mediapipe', 'cv2', 'matplotlib', 'pandas', 'sounddevice', 'pygame') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=SRC_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+def test_timed_import_records_screen(monkeypatch):
+    from src.utils import import_report
+    monkeypatch.setattr(import_report, "import_times", {})
+    monkeypatch.delitem(sys.modules, "src.ui.terms_screen", raising=False)
+
+    module = import_report.timed_import("src.ui.terms_screen", "TermsAndConditionsScreen")
+    assert hasattr(module, "TermsAndConditionsScreen")
+    report = import_report.import_report()
+    assert report["TermsAndConditionsScreen"]["modules"] >= 1
+    assert "src" in report["TermsAndConditionsScreen"]["packages"]
+
+def test_preload_imports_screen_modules_in_the_background(monkeypatch):
+    import threading
+    from src.ui import screens
+    imported = []
+    monkeypatch.setattr(screens, "timed_import",
+                        lambda module_name, label: imported.append((module_name, threading.current_thread())) or sys.modules[__name__])
+    monkeypatch.setitem(screens.SCREENS, "Fake", ("fake_screen", "test_timed_import_records_screen"))
+
+    screens.preload_screens(("Fake",)).join(5)
+    assert [name for name, _ in imported] == ["src.ui.fake_screen"]
+    assert imported[0][1] is not threading.main_thread()
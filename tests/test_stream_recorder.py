@@ -0,0 +1,23 @@
+import numpy as np
+import soundfile as sf
+from src.dataAcquisition.ringBuffer import AudioRingBuffer
+from src.dataAcquisition.streamRecorder import StreamRecorder
+
+def test_ring_audio_is_written_in_order(tmp_path):
+    path = str(tmp_path / "audio.wav")
+    ring = AudioRingBuffer(4096)
+    recorder = StreamRecorder(path, 44100)
+    recorder.start(ring.reader())
+
+    blocks = [np.full((512, 1), value, dtype=np.float32) for value in (0.1, -0.2, 0.3)]
+    for block in blocks:
+        ring.write(block)
+    ring.close()
+    recorder.stop()
+
+    audio, samplerate = sf.read(path, dtype="float32")
+    assert samplerate == 44100
+    assert recorder.frames_written == 3 * 512
+    assert recorder.overruns == 0
+    np.testing.assert_allclose(audio, np.concatenate(blocks).ravel(), atol=1 / 32768)
+    assert sf.info(path).subtype == "PCM_16"
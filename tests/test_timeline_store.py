@@ -0,0 +1,46 @@
+import os
+import numpy as np
+import pytest
+from src.utils.timeline_store import SessionTimeline, session_positions, session_photo_count, KIND_SEGMENT
+
+def make_row(start, apnea=False, snoring=False):
+    return {'Start_Time': start, 'End_Time': start + 5, 'Has_Apnea': apnea, 'Snoring': snoring}
+
+def test_query_by_time_range(tmp_path):
+    timeline = SessionTimeline(2, str(tmp_path))
+    session_start = 1000.0
+    timeline.append_segments([make_row(0), make_row(5, snoring=True)], session_start)
+    # The photo of the snoring segment is appended before the next segments, with a later time
+    timeline.append_posture(1012.0, "supine", 0.9)
+    timeline.append_segments([make_row(10, apnea=True), make_row(15)], session_start)
+
+    records = timeline.read()
+    assert np.all(np.diff(records["t"]) >= 0)
+    assert len(timeline.query(1005, 1015)) == 3
+    assert timeline.query(1005, 1015, KIND_SEGMENT)["t"].tolist() == [1005, 1010]
+    assert timeline.events()["t"].tolist() == [1005, 1010]
+    assert [p for _, p in timeline.positions(1010, 1020)] == ["supine"]
+    assert timeline.positions(1013) == []
+
+    timeline.clear()
+    assert len(timeline.read()) == 0
+
+def test_session_positions_falls_back_to_images(tmp_path):
+    images_dir = tmp_path / "Images"
+    images_dir.mkdir()
+    (images_dir / "lateral_1.jpg").write_bytes(b"")
+    assert [p for _, p in session_positions(5, str(images_dir), str(tmp_path))] == ["lateral_1"]
+
+    SessionTimeline(5, str(tmp_path)).append_posture(0.0, "prone", 0.7)
+    assert [p for _, p in session_positions(5, str(images_dir), str(tmp_path))] == ["prone"]
+    assert session_positions(6, str(tmp_path / "missing"), str(tmp_path)) == []
+
+def test_photos_without_joints(tmp_path):
+    timeline = SessionTimeline(3, str(tmp_path))
+    timeline.append_posture(10.0, "No se detectaron joints", 0.0)
+    timeline.append_posture(20.0, None, 0.0)
+    timeline.append_posture(30.0, "lateral", 0.8)
+    assert [p for _, p in timeline.positions()] == ["No se detectaron joints", "lateral"]
+    assert session_photo_count(3, str(tmp_path / "Images"), str(tmp_path)) == 3
+    with pytest.raises(ValueError):
+        timeline.append_posture(40.0, "x" * 33, 0.0)
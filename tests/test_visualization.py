@@ -29,26 +29,22 @@ def test_load_patient_info(mock_exists, mock_open, data_viz):
 
 # --- Test load_sleep_sessions ---
 
-@patch("os.path.exists", return_value=True)
-@patch("pandas.read_csv")
-def test_load_sleep_sessions(mock_read_csv, mock_exists, data_viz):
-    # DataFrame simulado con dos sesiones y apnea event
-    df = pd.DataFrame({
-        "Start_Time": [0, 100, 0, 100],
-        "End_Time": [99, 199, 99, 199],
-        "Has_Apnea": [True, False, False, False],
-        "Snoring": [True, False, False, False],
-        "Treatment_Required": [False, False, False, False]
-    })
-
-    mock_read_csv.return_value = df
+@patch("os.path.exists", return_value=False)
+@patch("src.ui.data_visualization.SessionStore")
+def test_load_sleep_sessions(mock_store, mock_exists, data_viz):
+    # Dos sesiones, solo la primera con apnea: se leen solo las filas con apnea de cada sesión
+    apnea_rows = {
+        3: pd.DataFrame({"Start_Time": [0], "End_Time": [5], "Has_Apnea": [True], "Snoring": [True], "Treatment_Required": [False]}),
+        4: pd.DataFrame({"Start_Time": [], "End_Time": [], "Has_Apnea": [], "Snoring": [], "Treatment_Required": []})
+    }
+    mock_store.return_value.session_ids.return_value = [3, 4]
+    mock_store.return_value.read.side_effect = lambda session_id, apnea_only=False: apnea_rows[session_id]
 
     # Parcheamos métodos que crean UI para no crear UI real
     with patch('customtkinter.CTkFrame'), patch('customtkinter.CTkLabel'), patch('customtkinter.CTkButton'):
         data_viz.load_sleep_sessions()
 
-    mock_exists.assert_called_once_with(data_viz.CSV_PATH)
-    mock_read_csv.assert_called_once_with(data_viz.CSV_PATH)
+    mock_store.return_value.read.assert_has_calls([call(3, apnea_only=True), call(4, apnea_only=True)])
 
 # --- Test toggle_audio ---
 
@@ -81,25 +77,20 @@ def test_toggle_audio_play_and_stop(mock_wavefile, data_viz):
 
 @patch('tkinter.messagebox.askyesno', return_value=True)
 @patch('tkinter.messagebox.showinfo')
-@patch('pandas.read_csv')
-@patch('pandas.DataFrame.to_csv')
+@patch('src.ui.data_visualization.SessionStore')
 @patch('shutil.rmtree')
 @patch('os.path.exists', return_value=True)
-def test_delete_session(mock_exists, mock_rmtree, mock_to_csv, mock_read_csv, mock_showinfo, mock_askyesno, data_viz):
-    df = pd.DataFrame({
-        "Start_Time": [0, 100, 0, 100],
-        "End_Time": [99, 199, 99, 199]
-    })
-    mock_read_csv.return_value = df
-
+def test_delete_session(mock_exists, mock_rmtree, mock_store, mock_showinfo, mock_askyesno, data_viz):
     data_viz.on_show = MagicMock()
 
     data_viz.delete_session(1)
 
+    # Only the tombstone is written here; the rows, files and CSV export are compacted in the background
     mock_askyesno.assert_called_once()
-    mock_read_csv.assert_called_once()
-    mock_to_csv.assert_called_once()
-    mock_rmtree.assert_called_once()
+    mock_store.return_value.delete_session.assert_called_once_with(1)
+    mock_store.return_value.compact_in_background.assert_called_once()
+    mock_store.return_value.export_csv.assert_not_called()
+    mock_rmtree.assert_not_called()
     mock_showinfo.assert_called_once()
     data_viz.on_show.assert_called_once()
 